@@ -0,0 +1,214 @@
+# common/tracing.py
+"""
+Lightweight per-update tracing.
+
+A trace is opened at each entry point (Telegram update, webhook, scheduler,
+sync) with `trace()`. Nested `span()` blocks build a tree, and every external
+call (Google Sheets, TiendaNube, Telegram) is timed with `traced_call()` /
+`record_call()` and aggregated by name into the innermost span. Aggregating
+keeps the cost per call at a dict update, so tracing can stay on in
+production. When the trace closes, a single JSON line goes to stdout so
+CloudWatch Logs Insights can query its fields directly.
+"""
+import json
+import logging
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, Optional
+from urllib.parse import unquote
+
+from telegram.request import HTTPXRequest
+
+from config import TRACING_ENABLED
+
+trace_logger = logging.getLogger("pombot.trace")
+trace_logger.propagate = False
+if not trace_logger.handlers:
+    _handler = logging.StreamHandler(sys.stdout)
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    trace_logger.addHandler(_handler)
+trace_logger.setLevel(logging.INFO)
+
+
+class Span:
+    """Nodo del árbol: duración propia, hijos y llamadas externas agregadas por nombre."""
+
+    __slots__ = ("name", "attrs", "start", "duration_ms", "children", "calls", "root", "_lock")
+
+    def __init__(self, name: str, attrs: Dict[str, Any], root: Optional["Span"] = None):
+        self.name = name
+        self.attrs = attrs
+        self.start = time.perf_counter()
+        self.duration_ms: Optional[float] = None
+        self.children = []
+        self.calls: Dict[str, list] = {}
+        self.root = root or self
+        self._lock = root._lock if root else threading.Lock()
+
+    def finish(self) -> None:
+        self.duration_ms = round((time.perf_counter() - self.start) * 1000, 2)
+
+    def add_call(self, name: str, seconds: float) -> None:
+        with self._lock:
+            entry = self.calls.get(name)
+            if entry is None:
+                self.calls[name] = [1, seconds]
+            else:
+                entry[0] += 1
+                entry[1] += seconds
+
+    def to_dict(self) -> Dict[str, Any]:
+        node: Dict[str, Any] = {"name": self.name, "duration_ms": self.duration_ms}
+        if self.attrs:
+            node["attrs"] = self.attrs
+        if self.calls:
+            node["calls"] = {
+                name: {"count": count, "ms": round(seconds * 1000, 2)}
+                for name, (count, seconds) in self.calls.items()
+            }
+        if self.children:
+            node["children"] = [child.to_dict() for child in self.children]
+        return node
+
+    def totals(self) -> Dict[str, Dict[str, float]]:
+        """Llamadas externas del subárbol agregadas por categoría ('sheets', 'tiendanube', ...)."""
+        totals: Dict[str, Dict[str, float]] = {}
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            stack.extend(node.children)
+            for name, (count, seconds) in node.calls.items():
+                category = name.split(".", 1)[0]
+                entry = totals.setdefault(category, {"count": 0, "ms": 0.0})
+                entry["count"] += count
+                entry["ms"] = round(entry["ms"] + seconds * 1000, 2)
+        return totals
+
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("pombot_current_span", default=None)
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+@contextmanager
+def trace(name: str, **attrs: Any) -> Iterator[Optional[Span]]:
+    """
+    Abre la traza de una unidad de trabajo y emite su árbol al cerrarla.
+    Si ya hay una traza activa se comporta como span().
+    """
+    if not TRACING_ENABLED:
+        yield None
+        return
+    if _current_span.get() is not None:
+        with span(name, **attrs) as child:
+            yield child
+        return
+    root = Span(name, attrs)
+    token = _current_span.set(root)
+    try:
+        yield root
+    except BaseException as e:
+        root.attrs["error"] = type(e).__name__
+        raise
+    finally:
+        _current_span.reset(token)
+        root.finish()
+        emit(root)
+
+
+@contextmanager
+def span(name: str, **attrs: Any) -> Iterator[Optional[Span]]:
+    """Sección anidada dentro de la traza activa; sin traza no hace nada."""
+    parent = _current_span.get()
+    if parent is None:
+        yield None
+        return
+    child = Span(name, attrs, parent.root)
+    with parent._lock:
+        parent.children.append(child)
+    token = _current_span.set(child)
+    try:
+        yield child
+    finally:
+        _current_span.reset(token)
+        child.finish()
+
+
+def record_call(name: str, seconds: float) -> None:
+    """Suma una llamada externa ('categoria.operacion') al span activo."""
+    active = _current_span.get()
+    if active is not None:
+        active.add_call(name, seconds)
+
+
+@contextmanager
+def traced_call(name: str) -> Iterator[None]:
+    """Mide una llamada externa y la agrega al span activo."""
+    if _current_span.get() is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_call(name, time.perf_counter() - start)
+
+
+def emit(root: Span) -> None:
+    payload = {
+        "type": "trace",
+        "trace_id": uuid.uuid4().hex[:16],
+        "name": root.name,
+        "duration_ms": root.duration_ms,
+        "calls": root.totals(),
+        "span": root.to_dict(),
+    }
+    try:
+        trace_logger.info(json.dumps(payload, default=str, ensure_ascii=False))
+    except Exception:
+        logging.getLogger(__name__).debug("No se pudo emitir la traza.", exc_info=True)
+
+
+def sheets_operation(method: str, url: str) -> str:
+    """
+    Nombre estable para una llamada HTTP de gspread: 'sheets.values.get Ventas Enero 2026',
+    'sheets.values.append Deudas', 'sheets.batchUpdate', 'sheets.metadata'...
+    """
+    _, _, rest = url.partition("/spreadsheets/")
+    _, _, path = rest.partition("/")
+    path = unquote(path.split("?", 1)[0])
+    if not path:
+        return "sheets.batchUpdate" if rest.endswith(":batchUpdate") else "sheets.metadata"
+    if path.startswith("values:"):
+        return f"sheets.values.{path.split(':', 1)[1]}"
+    if path.startswith("values/"):
+        range_name, _, action = path[len("values/"):].rpartition(":")
+        if action not in ("append", "clear"):
+            range_name, action = path[len("values/"):], ""
+        sheet_title = range_name.rsplit("!", 1)[0].strip("'") if "!" in range_name else range_name.strip("'")
+        return f"sheets.values.{action or method.lower()} {sheet_title}"
+    return f"sheets.{path.split('/', 1)[0]}"
+
+
+class TracedHTTPXRequest(HTTPXRequest):
+    """Transporte de python-telegram-bot que registra cada llamada a la Bot API como 'telegram.<método>'."""
+
+    async def do_request(self, url: str, method: str, *args: Any, **kwargs: Any):
+        if _current_span.get() is None:
+            return await super().do_request(url, method, *args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return await super().do_request(url, method, *args, **kwargs)
+        finally:
+            record_call(f"telegram.{url.rsplit('/', 1)[-1]}", time.perf_counter() - start)
+
+
+def traced_request(**kwargs: Any) -> HTTPXRequest:
+    """HTTPXRequest instrumentado para Application.builder().request(...) o Bot(request=...)."""
+    return TracedHTTPXRequest(**kwargs)
@@ -31,6 +31,11 @@ PRODUCTOS_HEADERS = ["Producto", "ID Producto", "ID Variante", "SKU", "Opción 1
 DEBTS_HEADERS = ["ID Deuda", "Nombre", "Monto Inicial", "Monto Pagado", "Saldo Pendiente", "Estado", "Fecha Creación", "Fecha Último Pago"]
 WHOLESALE_HEADERS = ["Fecha", "Nombre", "Producto", "Cantidad", "Monto Total", "Monto Pagado", "Monto Restante", "Categoría"]
 PROCESSED_EVENTS_HEADERS = ["EventID", "Timestamp"]
+WEBHOOK_LOGS_HEADERS = ["EventID", "EventType", "OrderID", "Timestamp"]
+
+# TiendaNube reintenta un webhook fallido durante como máximo 48 horas;
+# las particiones mensuales de Webhook_Logs fuera de esa ventana se pueden borrar.
+WEBHOOK_RETRY_WINDOW_HOURS = 48
 
 CHECKS_HEADERS = ["ID", "Fecha Cobro", "Entidad", "Monto Inicial", "Impuesto", "Comision", "Monto Final", "Estado"]
 FUTURE_PAYMENTS_HEADERS = ["ID", "Fecha Cobro", "Entidad", "Producto", "Cantidad", "Monto Inicial", "Comision", "Monto Final", "Estado"]
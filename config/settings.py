@@ -40,6 +40,33 @@ TIENDANUBE_STORE_ID_STR = CONFIG.get("TIENDANUBE_STORE_ID", "0")
 TIENDANUBE_ACCESS_TOKEN = CONFIG.get("TIENDANUBE_ACCESS_TOKEN")
 TIENDANUBE_USER_AGENT = CONFIG.get("TIENDANUBE_USER_AGENT", "Pombot/1.0")
 TIENDANUBE_API_BASE_URL = "https://api.tiendanube.com/v1/"
+# Sync incremental (updated_at_min); cada tanto una pasada completa detecta productos borrados
+TIENDANUBE_FULL_SYNC_INTERVAL_SECONDS = int(CONFIG.get("TIENDANUBE_FULL_SYNC_INTERVAL_SECONDS", 86400))
+# Descarga del catálogo: páginas pedidas en paralelo (acotado) sobre una sesión keep-alive
+TIENDANUBE_MAX_CONCURRENCY = int(CONFIG.get("TIENDANUBE_MAX_CONCURRENCY", 4))
+
+# --- Local cache (persists across warm Lambda invocations) ---
+CACHE_DIR = CONFIG.get("CACHE_DIR", "/tmp/pombot_cache")
+
+# --- Storage backend ("sheets": directo a Google Sheets, "sqlite": local-first con replicación) ---
+STORAGE_BACKEND = CONFIG.get("STORAGE_BACKEND", "sheets")
+# Persistente y compartido por todas las funciones (p. ej. EFS): guarda el outbox de escrituras ya confirmadas
+LOCAL_DB_PATH = CONFIG.get("LOCAL_DB_PATH", "/mnt/pombot/pombot.sqlite3")
+LOCAL_PULL_INTERVAL_SECONDS = int(CONFIG.get("LOCAL_PULL_INTERVAL_SECONDS", 300))
+
+# --- Outbox de stock hacia TiendaNube (se envía fuera del paso de confirmación de la venta) ---
+# Por contenedor: sólo lo vacía la Lambda del bot, y lo pendiente se pierde si se recicla el contenedor
+STOCK_OUTBOX_DB_PATH = CONFIG.get("STOCK_OUTBOX_DB_PATH", os.path.join(CACHE_DIR, "stock_outbox.sqlite3"))
+# Antigüedad a partir de la cual una variación sin enviar se reporta como error en cada flush
+STOCK_OUTBOX_ALERT_AGE_SECONDS = int(CONFIG.get("STOCK_OUTBOX_ALERT_AGE_SECONDS", 3600))
+
+# --- Tracing (una línea JSON por update con el árbol de spans y las llamadas externas) ---
+TRACING_ENABLED = str(CONFIG.get("TRACING_ENABLED", "true")).lower() in ("1", "true", "yes")
+
+# --- Google Sheets API quota (per-minute token bucket + backoff) ---
+SHEETS_REQUESTS_PER_MINUTE = int(CONFIG.get("SHEETS_REQUESTS_PER_MINUTE", 60))
+SHEETS_BACKGROUND_RESERVE = float(CONFIG.get("SHEETS_BACKGROUND_RESERVE", 0.25))
+SHEETS_MAX_RETRIES = int(CONFIG.get("SHEETS_MAX_RETRIES", 5))
 
 # --- Processed values ---
 try:
@@ -1,7 +1,8 @@
 # handlers/balance.py
+import asyncio
 import logging
 from datetime import datetime
-from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, InputFile
+from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
 
 from constants import *
@@ -89,18 +90,17 @@ async def process_and_display_balance(update: Update, context: ContextTypes.DEFA
         await query.edit_message_text(f"⏳ Generando reporte en PDF para {month_name} {year}...")
         
     try:
-        # Hacemos el trabajo pesado de forma secuencial (esperamos a que termine)
-        balance_data = get_net_balance_for_month(year, month)
-        pdf_path = generate_balance_pdf(balance_data)
+        # El trabajo pesado (Sheets + PDF) corre en un hilo para no bloquear el event loop
+        balance_data = await asyncio.to_thread(get_net_balance_for_month, year, month)
+        pdf_buffer = await asyncio.to_thread(generate_balance_pdf, balance_data)
 
-        if pdf_path and update.effective_chat:
-            with open(pdf_path, 'rb') as pdf_file:
-                await context.bot.send_document(
-                    chat_id=update.effective_chat.id,
-                    document=InputFile(pdf_file),
-                    filename=pdf_path.split('/')[-1],
-                    caption=f"Aquí tienes tu reporte de balance para {month_name} {year}."
-                )
+        if pdf_buffer and update.effective_chat:
+            await context.bot.send_document(
+                chat_id=update.effective_chat.id,
+                document=pdf_buffer,
+                filename=pdf_buffer.name,
+                caption=f"Aquí tienes tu reporte de balance para {month_name} {year}."
+            )
             if query:
                 await query.delete_message()
         else:
@@ -2,8 +2,7 @@ import logging
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, ReplyKeyboardMarkup
 from telegram.ext import ContextTypes, ConversationHandler
 from config import ALLOWED_USER_IDS
-from sheet import IS_SHEET_CONNECTED, is_connected, update_products_from_tiendanube
-from services.tiendanube_service import get_tiendanube_products
+from sheet import IS_SHEET_CONNECTED, is_connected, sync_products_from_tiendanube
 from constants import MAIN_MENU, BTN_NEW_SALE, BTN_NEW_WHOLESALE, BTN_NEW_EXPENSE, BTN_DEBTS, BTN_BALANCE
 
 logger = logging.getLogger(__name__)
@@ -143,8 +142,8 @@ async def sync_products_command(update: Update, context: ContextTypes.DEFAULT_TY
     if not await is_allowed_user(update) or not update.message: return
     await update.message.reply_text("⚙️ Iniciando sincronización de variantes...")
     try:
-        tiendanube_data = get_tiendanube_products()
-        success, message = update_products_from_tiendanube(tiendanube_data)
+        # Pasada completa por diff: si TiendaNube falla a mitad de camino, Productos no queda vacía
+        success, message = sync_products_from_tiendanube(full=True)
         final_message = f"✅ ¡Sincronización completada! {message}" if success else f"⚠️ Error en la sincronización: {message}"
         await update.message.reply_text(final_message)
     except Exception as e:
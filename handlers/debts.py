@@ -14,6 +14,8 @@ logger = logging.getLogger(__name__)
 
 async def start_debt_menu(update: Update, context: ContextTypes.DEFAULT_TYPE, send_as_new: bool = False) -> int:
     """Muestra el submenú de opciones de Deudas, editando o enviando un nuevo mensaje."""
+    # Volver al submenú cierra cualquier pago en curso (atrás, error o reintento duplicado)
+    context.user_data.pop('pay_debts', None)
     buttons = [
         ("➕ Crear Nueva Deuda", "debt_create"),
         ("💵 Registrar Pago Deuda", "debt_pay"),
@@ -98,7 +100,8 @@ async def start_pay_debt(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     if not active_debts:
         await query.edit_message_text("👍 ¡No hay deudas activas para registrar pagos!")
         return await start_debt_menu(update, context)
-    
+
+    context.user_data['pay_debts'] = active_debts
     buttons = []
     for debt in active_debts:
         debt_id = debt.get('ID Deuda')
@@ -123,9 +126,14 @@ async def pay_debt_choose_debt(update: Update, context: ContextTypes.DEFAULT_TYP
         
     debt_id = query.data.replace("pay_debt_id_", "")
     
-    # Encontrar los detalles de la deuda seleccionada
-    active_debts = get_active_debts()
-    selected_debt = next((d for d in active_debts if d.get('ID Deuda') == debt_id), None)
+    # Encontrar los detalles de la deuda seleccionada (ya leídas al mostrar el menú);
+    # la lista sólo sirve para este paso, así que se descarta al elegir.
+    stored_debts = context.user_data.pop('pay_debts', [])
+    selected_debt = next((d for d in stored_debts if d.get('ID Deuda') == debt_id), None)
+
+    if not selected_debt:
+        active_debts = get_active_debts()
+        selected_debt = next((d for d in active_debts if d.get('ID Deuda') == debt_id), None)
     
     if not selected_debt:
          await query.edit_message_text("⚠️ Error: No se encontró la deuda seleccionada.")
@@ -158,7 +166,7 @@ async def pay_debt_get_amount(update: Update, context: ContextTypes.DEFAULT_TYPE
         return PAY_DEBT_GET_AMOUNT
         
     updated_debt = register_debt_payment(selected_debt.get('ID Deuda'), payment_amount)
-    
+
     if updated_debt:
         new_pending = updated_debt.get('Saldo Pendiente')
         if new_pending <= 0:
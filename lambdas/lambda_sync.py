@@ -5,8 +5,11 @@ from config import ( # Assuming config.py can be packaged or its values set as e
     BOT_TOKEN, ALLOWED_USER_IDS # These might be needed if you want Lambda to send a Telegram notification
 )
 import asyncio
-from services.tiendanube_service import get_tiendanube_products
-from sheet import update_products_from_tiendanube, IS_SHEET_CONNECTED, connect_globally_to_sheets
+from sheet import (
+    sync_products_from_tiendanube, IS_SHEET_CONNECTED, connect_globally_to_sheets, flush_local_storage,
+)
+from services.request_scheduler import background_priority
+from common.tracing import trace, span, traced_request
 from telegram import Bot # For optional notifications
 
 # --- Lambda Specific Logging ---
@@ -39,7 +42,7 @@ async def send_telegram_notification(message: str, chat_id_to_notify: str | int
         return
         
     try:
-        bot = Bot(token=BOT_TOKEN)
+        bot = Bot(token=BOT_TOKEN, request=traced_request())
         # Usamos await para ejecutar la función asíncrona
         await bot.send_message(chat_id=int(chat_id_to_notify), text=message)
         logger.info(f"Notification sent to {chat_id_to_notify}.")
@@ -71,13 +74,13 @@ def lambda_handler(event, context):
     user_to_notify = str(ALLOWED_USER_IDS[0]) if ALLOWED_USER_IDS else None
 
     try:
-        logger.info("Lambda: Iniciando obtención de productos desde TiendaNube...")
-        tiendanube_products_data = get_tiendanube_products()
-        logger.info(f"Lambda: Se obtuvieron {len(tiendanube_products_data)} productos de TiendaNube.")
-
-        # update_products_from_tiendanube handles empty product list message internally
-        logger.info("Lambda: Actualizando hoja 'Productos' en Google Sheets...")
-        success, message = update_products_from_tiendanube(tiendanube_products_data)
+        with trace("sync_products"):
+            # Incremental: solo los productos modificados desde la última corrida, aplicados como diff
+            logger.info("Lambda: Sincronizando hoja 'Productos' con TiendaNube...")
+            with background_priority():
+                success, message = sync_products_from_tiendanube()
+                with span("flush_local_storage"):
+                    flush_local_storage()
         
         final_message = ""
         if success:
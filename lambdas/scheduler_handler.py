@@ -4,9 +4,13 @@ from telegram import Bot
 from sheet import (
     connect_globally_to_sheets, get_items_due_in_x_days, 
     update_past_due_statuses, get_items_due_today,
-    add_expense, add_wholesale_record, update_item_status
+    add_expense, add_wholesale_record, update_item_status,
+    compact_webhook_logs, flush_local_storage
 )
 from common.utils import parse_float
+from services.request_scheduler import background_priority
+from services.unit_of_work import unit_of_work
+from common.tracing import trace, span, traced_request
 from datetime import datetime
 from config import BOT_TOKEN, CHAT_ID, CHECKS_SHEET_NAME, FUTURE_PAYMENTS_SHEET_NAME
 
@@ -18,7 +22,7 @@ async def send_alerts():
         logger.error("BOT_TOKEN o CHAT_ID no encontrados.")
         return
 
-    bot = Bot(token=BOT_TOKEN)
+    bot = Bot(token=BOT_TOKEN, request=traced_request())
     if not connect_globally_to_sheets():
         logger.error("No se pudo conectar a Google Sheets para el scheduler.")
         return
@@ -72,7 +76,7 @@ async def daily_tasks():
         logger.error("BOT_TOKEN o CHAT_ID no encontrados.")
         return
 
-    bot = Bot(token=BOT_TOKEN)
+    bot = Bot(token=BOT_TOKEN, request=traced_request())
     if not connect_globally_to_sheets():
         logger.error("No se pudo conectar a Google Sheets para el scheduler.")
         return
@@ -80,6 +84,9 @@ async def daily_tasks():
     # --- Tarea 1: Actualizar estados de vencidos a "PAGO" ---
     update_past_due_statuses()
 
+    # --- Mantenimiento: borrar particiones de Webhook_Logs fuera de la ventana de reintentos ---
+    compact_webhook_logs()
+
     # --- Tarea 2: Procesar los items que vencen hoy y registrarlos ---
     items_to_record = get_items_due_today()
     recorded_items = []
@@ -139,6 +146,11 @@ async def daily_tasks():
 
 def lambda_handler(event, context):
     logger.info("Iniciando ejecución de tareas diarias de Pombot...")
-    asyncio.run(daily_tasks())
+    # Tareas en segundo plano: ceden la cuota de Sheets al tráfico interactivo del bot
+    # Una unidad de trabajo por ejecución: Cheques y Pagos Futuros se leen una sola vez
+    with background_priority(), trace("scheduler.daily_tasks"), unit_of_work():
+        asyncio.run(daily_tasks())
+        with span("flush_local_storage"):
+            flush_local_storage()
     logger.info("Finalizada ejecución de tareas diarias de Pombot.")
     return {'status': 200, 'body': 'Scheduler executed'}
\ No newline at end of file
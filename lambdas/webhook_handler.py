@@ -5,15 +5,18 @@ from datetime import datetime
 import requests
 
 from config import (
-    TIENDANUBE_API_BASE_URL, TIENDANUBE_STORE_ID, TIENDANUBE_ACCESS_TOKEN, 
-    TIENDANUBE_USER_AGENT, SALES_SHEET_BASE_NAME, SALES_HEADERS,
+    SALES_SHEET_BASE_NAME, SALES_HEADERS,
     EXPENSES_SHEET_BASE_NAME, EXPENSES_HEADERS
 )
 from sheet import (
     connect_globally_to_sheets, get_or_create_monthly_sheet,
-    add_sale, add_expense, log_webhook_event, invalidate_products_cache
+    add_sale, add_expense, log_webhook_event,
+    flush_local_storage
 )
 from common.utils import parse_float
+from services.unit_of_work import unit_of_work
+from services.tiendanube_client import get_tiendanube_client
+from common.tracing import trace, span
 
 logger = logging.getLogger("webhook_handler")
 logger.setLevel(logging.INFO)
@@ -22,16 +25,8 @@ def get_full_order_details(order_id: int) -> dict:
     """Obtiene los detalles completos de una orden, incluyendo productos y transacciones."""
     if not order_id: return {}
     
-    url = f"{TIENDANUBE_API_BASE_URL}{TIENDANUBE_STORE_ID}/orders/{order_id}"
-    headers = {
-        "Authentication": f"bearer {TIENDANUBE_ACCESS_TOKEN}",
-        "User-Agent": TIENDANUBE_USER_AGENT
-    }
-    
     try:
-        response = requests.get(url, headers=headers, timeout=15)
-        response.raise_for_status()
-        return response.json()
+        return get_tiendanube_client().get(f"orders/{order_id}", "GET /orders").json()
     except requests.exceptions.RequestException as e:
         logger.error(f"Error al obtener los detalles de la orden {order_id}: {e}")
         return {}
@@ -77,10 +72,9 @@ def process_order_paid(order_data: dict):
         quantity=sum(p.get('quantity', 0) for p in order_data.get('products', [])),
         client_name=customer_name
     )
-    
-    # Inmediatamente después de una venta online, invalidamos el caché de productos
-    # para que el bot tenga el stock más actualizado posible.
-    invalidate_products_cache()
+
+    # No se invalida la caché de productos: esta venta no escribe en Productos
+    # (row_number -1), y update_product_stock ya parchea la caché cuando sí lo hace.
     
     logger.info(f"Venta online de la orden #{order_id} registrada por un total de ${total_paid}.")
 
@@ -121,7 +115,11 @@ def lambda_handler(event, context):
         
     try:
         webhook_body = json.loads(event.get('body', '{}'))
-        process_webhook_event(webhook_body)
+        with trace("tiendanube_webhook", event=webhook_body.get('event'), order_id=webhook_body.get('id')):
+            with unit_of_work():
+                process_webhook_event(webhook_body)
+            with span("flush_local_storage"):
+                flush_local_storage()
         
         return {'statusCode': 200, 'body': json.dumps('Webhook procesado')}
     except Exception as e:
@@ -10,7 +10,12 @@ from telegram.ext import (
     PicklePersistence
 )
 from config import BOT_TOKEN
-from sheet import IS_SHEET_CONNECTED, is_connected, connect_globally_to_sheets
+from sheet import (
+    IS_SHEET_CONNECTED, is_connected, connect_globally_to_sheets, flush_local_storage,
+    start_stock_push_worker, flush_stock_outbox,
+)
+from services.unit_of_work import unit_of_work
+from common.tracing import trace, span, traced_request
 from handlers.core import unknown_command, sync_products_command
 from handlers.conversation import conv_handler
 
@@ -21,7 +26,7 @@ if not is_connected():
     connect_globally_to_sheets()
 
 persistence = PicklePersistence(filepath="/tmp/pombot_persistence")
-application = Application.builder().token(BOT_TOKEN).persistence(persistence).build()
+application = Application.builder().token(BOT_TOKEN).persistence(persistence).request(traced_request()).build()
 
 application.add_handler(conv_handler)
 application.add_handler(CommandHandler("sync_products", sync_products_command))
@@ -71,7 +76,17 @@ def lambda_handler(event, context):
              logger.warning("El evento recibido no parece ser un Update de Telegram válido (falta update_id).")
              return {'statusCode': 400, 'body': 'Invalid Update Format: Missing update_id'}
 
-        asyncio.run(process_telegram_update(update_json))
+        with trace("telegram_update", update_id=update_json.get('update_id')):
+            # El stock vendido se envía a TiendaNube en segundo plano mientras se responde
+            start_stock_push_worker()
+            # Las lecturas repetidas dentro del mismo update se sirven desde memoria
+            with unit_of_work():
+                asyncio.run(process_telegram_update(update_json))
+            # La respuesta ya se envió al usuario: replicar ahora no suma latencia visible
+            with span("flush_stock_outbox"):
+                flush_stock_outbox()
+            with span("flush_local_storage"):
+                flush_local_storage()
         return {
             'statusCode': 200,
             'body': json.dumps('Update procesado')
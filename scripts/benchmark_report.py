@@ -0,0 +1,56 @@
+# scripts/benchmark_report.py
+"""
+Mide el costo de generar el PDF de balance: por documento, por página y por fila
+de detalle mayorista. Uso: python scripts/benchmark_report.py [filas] [repeticiones]
+"""
+import os
+import sys
+import time
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.report_generator import generate_balance_pdf
+
+
+def build_balance_data(rows: int) -> dict:
+    details = [
+        {"client": f"Cliente {i % 25}", "product": f"Producto {i}", "quantity": i % 7 + 1, "amount": 1000.0 + i}
+        for i in range(rows)
+    ]
+    return {
+        "month_name": "Enero", "year": 2026,
+        "sales_summary": {"total": 100000.0, "by_category": {f"CAT {i}": 1000.0 * i for i in range(20)}},
+        "wholesale_summary": {"total": sum(d["amount"] for d in details), "details": details, "by_client": {}},
+        "gastos_pg_summary": {"total": 30000.0, "by_category": {"INSUMOS": 20000.0, "MARKETING": 10000.0}},
+        "gastos_personales_summary": {"total": 15000.0, "by_category": {"ALQUILER": 15000.0}},
+        "saldo_pg": 120000.0, "saldo_neto": 105000.0,
+    }
+
+
+def measure(rows: int, repeats: int) -> tuple[float, int]:
+    data = build_balance_data(rows)
+    generate_balance_pdf(data)  # calentamiento: decodifica el logo y carga fuentes
+    start = time.perf_counter()
+    for _ in range(repeats):
+        buffer = generate_balance_pdf(data)
+    elapsed = (time.perf_counter() - start) / repeats
+    pages = buffer.getvalue().count(b"/Type /Page\n") or buffer.getvalue().count(b"/Type /Page")
+    return elapsed, pages
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    # El gráfico se mide aparte; aquí interesa el layout del PDF.
+    with patch("services.report_generator._create_bar_chart"):
+        base_time, base_pages = measure(0, repeats)
+        full_time, full_pages = measure(rows, repeats)
+    print(f"Documento sin detalle: {base_time * 1000:.1f} ms ({base_pages} páginas)")
+    print(f"Documento con {rows} filas: {full_time * 1000:.1f} ms ({full_pages} páginas)")
+    print(f"Por página: {full_time / max(full_pages, 1) * 1000:.2f} ms")
+    print(f"Por fila de detalle: {(full_time - base_time) / max(rows, 1) * 1e6:.1f} µs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+# scripts/benchmark_services.py
+"""
+Mide llamadas a la API de Sheets y tiempo de pared de los flujos de servicio
+contra el spreadsheet en memoria de tests/helpers, con latencia inyectada por
+llamada. Uso: python scripts/benchmark_services.py [latencia_ms]
+"""
+import os
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import (
+    DEBTS_SHEET_NAME, DEBTS_HEADERS, EXPENSES_SHEET_BASE_NAME, EXPENSES_HEADERS,
+    SALES_SHEET_BASE_NAME, SALES_HEADERS, WHOLESALE_SHEET_BASE_NAME, WHOLESALE_HEADERS,
+    get_sheet_name_for_month,
+)
+from services import (
+    add_expense, register_debt_payment, modify_wholesale_payment, get_net_balance_for_month,
+)
+from tests.helpers.fake_spreadsheet import FakeSpreadsheet
+
+
+def seed(fake: FakeSpreadsheet, now: datetime) -> None:
+    month = lambda base: get_sheet_name_for_month(base, now.year, now.month)
+    fake.seed(month(SALES_SHEET_BASE_NAME), [SALES_HEADERS] + [
+        [f"{now:%Y-%m-%d}", f"Producto {i}", "", "Cliente", "REMERAS", 1, 5000, 0, 0, 5000] for i in range(200)
+    ])
+    fake.seed(month(EXPENSES_SHEET_BASE_NAME), [EXPENSES_HEADERS] + [
+        [f"{now:%Y-%m-%d}", "INSUMOS", "TELA", "Tela", "", 1200] for _ in range(100)
+    ])
+    fake.seed(month(WHOLESALE_SHEET_BASE_NAME), [WHOLESALE_HEADERS] + [
+        [f"{now:%Y-%m-%d}", f"Mayorista {i}", "Buzos", 10, 50000, 10000, 40000, "Seña"] for i in range(20)
+    ])
+    fake.seed(DEBTS_SHEET_NAME, [DEBTS_HEADERS] + [
+        [f"D{i}", f"Cliente {i}", 1000, 0, 1000, "Activa", "2026-01-01", "2026-01-01"] for i in range(50)
+    ])
+
+
+def main():
+    latency = float(sys.argv[1]) / 1000 if len(sys.argv) > 1 else 0.15
+    now = datetime.now()
+    flows = [
+        ("Gasto", lambda: add_expense("INSUMOS", "TELA", "Tela", "", 1500.0)),
+        ("Pago de deuda", lambda: register_debt_payment("D25", 300.0)),
+        ("Pago mayorista", lambda: modify_wholesale_payment(5, 10000.0)),
+        ("Balance neto", lambda: get_net_balance_for_month(now.year, now.month)),
+    ]
+    print(f"Latencia inyectada por llamada: {latency * 1000:.0f} ms")
+    for name, flow in flows:
+        fake = FakeSpreadsheet(default_latency=latency)
+        seed(fake, now)
+        with fake.installed():
+            start = time.perf_counter()
+            flow()
+            elapsed = time.perf_counter() - start
+        detail = ", ".join(f"{method}={count}" for method, count in sorted(fake.calls.items()))
+        print(f"{name:<16} {elapsed * 1000:8.1f} ms  {fake.total_calls:3d} llamadas  ({detail})")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,7 @@
 # Reemplaza el contenido completo de create_webhooks.py con esta versión
 import requests
 import logging
-from config import (
-    TIENDANUBE_API_BASE_URL,
-    TIENDANUBE_STORE_ID,
-    TIENDANUBE_ACCESS_TOKEN,
-    TIENDANUBE_USER_AGENT
-)
+from services.tiendanube_client import get_tiendanube_client
 
 # --- Configuración ---
 # Pega aquí la URL completa de tu API Gateway que apunta a Pombot-Webhook-Processor
@@ -27,20 +22,11 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(
 def create_webhook(event: str, url: str):
     """Hace la llamada a la API para crear un webhook para un evento específico."""
     
-    api_url = f"{TIENDANUBE_API_BASE_URL}{TIENDANUBE_STORE_ID}/webhooks"
-    
-    headers = {
-        "Authentication": f"bearer {TIENDANUBE_ACCESS_TOKEN}",
-        "User-Agent": TIENDANUBE_USER_AGENT,
-        "Content-Type": "application/json"
-    }
-    
     payload = { "event": event, "url": url }
     
     try:
         logging.info(f"Intentando crear webhook para el evento: '{event}'...")
-        response = requests.post(api_url, headers=headers, json=payload, timeout=15)
-        response.raise_for_status()
+        response = get_tiendanube_client().post("webhooks", "POST /webhooks", json=payload)
         
         logging.info(f"✅ ¡Éxito! Webhook para '{event}' creado. ID: {response.json().get('id')}")
         return True
@@ -9,17 +9,23 @@ from services.sheets_connection import (
     connect_globally_to_sheets,
     IS_SHEET_CONNECTED,
     get_value_from_dict_insensitive,
+    HeaderIndex,
     apply_table_formatting,
     _get_or_create_worksheet,
     get_or_create_monthly_sheet,
     find_column_index, safe_row_value,
+    read_rows, patch_row,
+    find_worksheet, list_worksheets, invalidate_worksheet_cache, get_sheet_month_index,
     check_and_set_event_processed,
     log_webhook_event,
+    compact_webhook_logs,
+    flush_local_storage,
 )
 
 # --- products_service ---
 from services.products_service import (
     invalidate_products_cache,
+    patch_cached_stock,
     get_product_sheet,
     get_all_products_data_cached,
     get_product_categories,
@@ -28,6 +34,15 @@ from services.products_service import (
     get_variant_details,
     update_product_stock,
     update_products_from_tiendanube,
+    apply_product_changes,
+    sync_products_from_tiendanube,
+)
+
+# --- stock_outbox ---
+from services.stock_outbox import (
+    enqueue_stock_push,
+    flush_stock_outbox,
+    start_stock_push_worker,
 )
 
 # --- sales_service ---
@@ -74,5 +89,7 @@ from services.checks_service import (
 from services.balance_service import (
     get_monthly_summary,
     get_net_balance_for_month,
+    get_expenses_breakdown,
+    invalidate_balance_snapshot,
     get_available_sheet_months_years,
 )
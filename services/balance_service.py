@@ -5,107 +5,148 @@ and available sheet months discovery.
 """
 import gspread
 import logging
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 from typing import Optional, List, Dict, Any
 
 from config import (
     SALES_SHEET_BASE_NAME, EXPENSES_SHEET_BASE_NAME,
     WHOLESALE_SHEET_BASE_NAME, SPANISH_MONTHS,
-    get_sheet_name_for_month
+    get_sheet_name_for_month, CACHE_DIR
 )
 from common.utils import parse_float
 from services.sheets_connection import (
     is_connected, get_spreadsheet,
-    get_value_from_dict_insensitive
+    HeaderIndex, find_worksheet, get_sheet_month_index, list_worksheets
 )
 from services.wholesale_service import get_wholesale_summary
+from services.snapshot_store import LocalFileSnapshotStore
+from services.unit_of_work import cached_read
 
 logger = logging.getLogger(__name__)
 
 
-def get_monthly_summary(sheet_base_name: str, year: int, month: int) -> dict:
-    """Calculates totals and category breakdown for a given monthly sheet."""
+CATEGORY_CANDIDATES = ["Categoría", "Categoria", "CategorA-a"]
+EXPENSE_AMOUNT_CANDIDATES = ["Monto", "Monto Final"]
+SALES_AMOUNT_CANDIDATES = ["Precio Total", "Monto Total", "Precio Final"]
+
+# Ventas, Mayoristas y Gastos se descargan en paralelo: una hoja por worker.
+BALANCE_FETCH_WORKERS = 3
+
+# Balances de meses cerrados materializados, validados contra la huella de sus hojas.
+BALANCE_SNAPSHOT_PREFIX = "balance"
+balance_snapshot_store = LocalFileSnapshotStore(CACHE_DIR)
+
+
+@cached_read(tags=lambda sheet_base_name, year, month: [get_sheet_name_for_month(sheet_base_name, year, month)])
+def _get_monthly_records(sheet_base_name: str, year: int, month: int) -> Optional[List[Dict[str, Any]]]:
+    """Downloads all records of a monthly sheet, or None if the sheet does not exist."""
     if not is_connected():
         raise ConnectionError("No hay conexion a Google Sheets.")
-    
+
     spreadsheet = get_spreadsheet()
     if not spreadsheet:
         raise ConnectionError("Objeto Spreadsheet no inicializado.")
 
     target_sheet_name = get_sheet_name_for_month(sheet_base_name, year, month)
     try:
-        worksheet = spreadsheet.worksheet(target_sheet_name)
+        worksheet = find_worksheet(target_sheet_name, spreadsheet)
     except gspread.exceptions.WorksheetNotFound:
-        return {"total": 0.0, "count": 0, "by_category": {}, "message": f"La hoja '{target_sheet_name}' no existe."}
-    all_records = worksheet.get_all_records()
-    total_amount, count, by_category = 0.0, 0, {}
-    category_candidates = ["Categoría", "Categoria", "CategorA-a"]
-    if sheet_base_name == EXPENSES_SHEET_BASE_NAME:
-        amount_candidates = ["Monto", "Monto Final"]
-    else:
-        amount_candidates = ["Precio Total", "Monto Total", "Precio Final"]
+        return None
+    return worksheet.get_all_records()
+
+
+def _iter_category_amounts(all_records: List[Dict[str, Any]], amount_candidates: List[str]):
+    """Yields (category, amount, record) per row, resolving the header columns once."""
+    index = HeaderIndex.from_records(all_records)
+    category_keys = [k for k in (index.key(c) for c in CATEGORY_CANDIDATES) if k is not None]
+    amount_keys = [k for k in (index.key(c) for c in amount_candidates) if k is not None]
     for record in all_records:
         category_val = None
-        for cand in category_candidates:
-            category_val = get_value_from_dict_insensitive(record, cand)
+        for key in category_keys:
+            category_val = record.get(key)
             if category_val is not None and str(category_val).strip():
                 break
         category = str(category_val or "Sin Categoria").strip()
         amount_val = None
-        for cand in amount_candidates:
-            amount_val = get_value_from_dict_insensitive(record, cand)
+        for key in amount_keys:
+            amount_val = record.get(key)
             if amount_val is not None:
                 break
         amount = parse_float(str(amount_val or "0")) or 0.0
+        yield category, amount, record
+
+
+def get_monthly_summary(sheet_base_name: str, year: int, month: int) -> dict:
+    """Calculates totals and category breakdown for a given monthly sheet."""
+    all_records = _get_monthly_records(sheet_base_name, year, month)
+    if all_records is None:
+        target_sheet_name = get_sheet_name_for_month(sheet_base_name, year, month)
+        return {"total": 0.0, "count": 0, "by_category": {}, "message": f"La hoja '{target_sheet_name}' no existe."}
+    if sheet_base_name == EXPENSES_SHEET_BASE_NAME:
+        amount_candidates = EXPENSE_AMOUNT_CANDIDATES
+    else:
+        amount_candidates = SALES_AMOUNT_CANDIDATES
+    total_amount, count, by_category = 0.0, 0, {}
+    for category, amount, _ in _iter_category_amounts(all_records, amount_candidates):
         total_amount += amount
         count += 1
         by_category[category] = by_category.get(category, 0.0) + amount
     return {"total": round(total_amount, 2), "count": count, "by_category": {c: round(v, 2) for c, v in by_category.items()}}
 
 
-def get_net_balance_for_month(year: int, month: int) -> dict:
-    """Calcula y devuelve una estructura de balance detallada, separando CANJES."""
-    sales_summary = get_monthly_summary(SALES_SHEET_BASE_NAME, year, month)
-    wholesale_summary = get_wholesale_summary(year, month)
-    all_expenses_summary = get_monthly_summary(EXPENSES_SHEET_BASE_NAME, year, month)
-    
-    spreadsheet = get_spreadsheet() # Need spreadsheet access for detailed expense breakdown
-    
-    gastos_pg_total = 0
-    gastos_personales_by_cat = {}
-    gastos_pg_by_cat = {}
-    canjes_summary = {"total": 0.0, "by_category": {}}
-    if all_expenses_summary.get("by_category"):
-        for category, total in all_expenses_summary["by_category"].items():
-            if category == "PERSONALES":
-                if spreadsheet:
-                    target_sheet_name = get_sheet_name_for_month(EXPENSES_SHEET_BASE_NAME, year, month)
-                    try:
-                        worksheet = spreadsheet.worksheet(target_sheet_name)
-                        all_expense_records = worksheet.get_all_records()
-                        for record in all_expense_records:
-                            if get_value_from_dict_insensitive(record, "Categoría") == "PERSONALES":
-                                subcategory = get_value_from_dict_insensitive(record, "Subcategoría") or "General"
-                                amount = parse_float(str(get_value_from_dict_insensitive(record, "Monto") or '0')) or 0.0
-                                gastos_personales_by_cat[subcategory] = gastos_personales_by_cat.get(subcategory, 0.0) + amount
-                    except gspread.exceptions.WorksheetNotFound:
-                        pass
-            elif category == "CANJES":
-                canjes_summary["total"] += total
-                if spreadsheet:
-                    target_sheet_name = get_sheet_name_for_month(EXPENSES_SHEET_BASE_NAME, year, month)
-                    try:
-                        worksheet = spreadsheet.worksheet(target_sheet_name)
-                        all_expense_records = worksheet.get_all_records()
-                        for record in all_expense_records:
-                            if get_value_from_dict_insensitive(record, "Categoría") == "CANJES":
-                                subcategory = get_value_from_dict_insensitive(record, "Subcategoría") or "N/A"
-                                amount = parse_float(str(get_value_from_dict_insensitive(record, "Monto") or '0')) or 0.0
-                                canjes_summary["by_category"][subcategory] = canjes_summary["by_category"].get(subcategory, 0.0) + amount
-                    except gspread.exceptions.WorksheetNotFound:
-                        pass
-            else:
-                gastos_pg_total += total
-                gastos_pg_by_cat[category] = total
+def get_expenses_breakdown(year: int, month: int) -> dict:
+    """
+    Single pass over the monthly Gastos sheet: total and by-category amounts plus
+    the PERSONALES and CANJES subcategory breakdowns used by the balance report.
+    """
+    empty = {"total": 0.0, "count": 0, "by_category": {}, "personales_by_subcategory": {}, "canjes_by_subcategory": {}}
+    all_records = _get_monthly_records(EXPENSES_SHEET_BASE_NAME, year, month)
+    if not all_records:
+        return empty
+    subcategory_key = HeaderIndex.from_records(all_records).key("Subcategoría")
+    total_amount, count = 0.0, 0
+    by_category: Dict[str, float] = {}
+    personales: Dict[str, float] = {}
+    canjes: Dict[str, float] = {}
+    for category, amount, record in _iter_category_amounts(all_records, EXPENSE_AMOUNT_CANDIDATES):
+        total_amount += amount
+        count += 1
+        by_category[category] = by_category.get(category, 0.0) + amount
+        if category == "PERSONALES":
+            subcategory = record.get(subcategory_key) or "General"
+            personales[subcategory] = personales.get(subcategory, 0.0) + amount
+        elif category == "CANJES":
+            subcategory = record.get(subcategory_key) or "N/A"
+            canjes[subcategory] = canjes.get(subcategory, 0.0) + amount
+    return {
+        "total": round(total_amount, 2),
+        "count": count,
+        "by_category": {c: round(v, 2) for c, v in by_category.items()},
+        "personales_by_subcategory": personales,
+        "canjes_by_subcategory": canjes,
+    }
+
+
+def _compute_net_balance(year: int, month: int) -> dict:
+    """
+    Calcula la estructura de balance detallada desde las hojas, separando CANJES.
+    Las tres hojas mensuales se leen en paralelo, así que la latencia es la de la más lenta.
+    """
+    with ThreadPoolExecutor(max_workers=BALANCE_FETCH_WORKERS) as executor:
+        # Cada hilo corre en una copia del contexto: conserva la prioridad de cuota y el span activo.
+        sales_future = executor.submit(contextvars.copy_context().run, get_monthly_summary, SALES_SHEET_BASE_NAME, year, month)
+        wholesale_future = executor.submit(contextvars.copy_context().run, get_wholesale_summary, year, month)
+        expenses_future = executor.submit(contextvars.copy_context().run, get_expenses_breakdown, year, month)
+        sales_summary = sales_future.result()
+        wholesale_summary = wholesale_future.result()
+        expenses = expenses_future.result()
+
+    gastos_pg_by_cat = {c: t for c, t in expenses["by_category"].items() if c not in ("PERSONALES", "CANJES")}
+    gastos_pg_total = sum(gastos_pg_by_cat.values())
+    gastos_personales_by_cat = expenses["personales_by_subcategory"]
+    canjes_summary = {"total": expenses["by_category"].get("CANJES", 0.0), "by_category": expenses["canjes_by_subcategory"]}
     gastos_personales_total = sum(gastos_personales_by_cat.values())
     saldo_pg = (sales_summary.get('total', 0.0) + wholesale_summary.get('total', 0.0)) - gastos_pg_total
     saldo_neto = saldo_pg - gastos_personales_total
@@ -122,6 +163,71 @@ def get_net_balance_for_month(year: int, month: int) -> dict:
     }
 
 
+def _balance_snapshot_key(year: int, month: int) -> str:
+    return f"{BALANCE_SNAPSHOT_PREFIX}_{year}_{month:02d}"
+
+
+def _is_closed_month(year: int, month: int) -> bool:
+    now = datetime.now()
+    return (year, month) < (now.year, now.month)
+
+
+def _balance_fingerprint(year: int, month: int) -> Optional[Dict[str, Any]]:
+    """
+    Huella barata de las tres hojas del mes: la fecha de modificación del
+    spreadsheet en Drive más el id y la cantidad de filas de cada hoja según la
+    caché de metadatos. No lee valores; cualquier edición (también las
+    correcciones a mano) mueve la fecha de Drive. Devuelve None si no se puede
+    obtener.
+    """
+    spreadsheet = get_spreadsheet()
+    if not is_connected() or not spreadsheet:
+        return None
+    try:
+        modified = spreadsheet.get_lastUpdateTime()
+        worksheets = {ws.title: ws for ws in list_worksheets(spreadsheet)}
+    except Exception as e:
+        logger.warning(f"No se pudo leer la huella del balance: {e}")
+        return None
+    sheet_names = [get_sheet_name_for_month(base_name, year, month)
+                   for base_name in (SALES_SHEET_BASE_NAME, WHOLESALE_SHEET_BASE_NAME, EXPENSES_SHEET_BASE_NAME)]
+    sheets = [[name, worksheets[name].id, worksheets[name].row_count] if name in worksheets else [name, None, None]
+              for name in sheet_names]
+    return {"modified": modified, "sheets": sheets}
+
+
+def invalidate_balance_snapshot(year: int, month: int) -> None:
+    """Descarta el balance materializado de un mes (p. ej. tras corregir filas a mano)."""
+    balance_snapshot_store.bump_version(_balance_snapshot_key(year, month))
+
+
+def get_net_balance_for_month(year: int, month: int) -> dict:
+    """
+    Calcula y devuelve una estructura de balance detallada, separando CANJES.
+    Los meses cerrados se sirven desde su snapshot mientras la huella de sus hojas
+    no cambie; el mes en curso siempre se recalcula en vivo.
+    """
+    if not _is_closed_month(year, month):
+        return _compute_net_balance(year, month)
+
+    key = _balance_snapshot_key(year, month)
+    fingerprint = _balance_fingerprint(year, month)
+    if fingerprint is None:
+        return _compute_net_balance(year, month)
+
+    version = balance_snapshot_store.get_version(key)
+    snapshot = balance_snapshot_store.load(key)
+    if snapshot and snapshot.get("version") == version:
+        data = snapshot.get("data") or {}
+        if data.get("fingerprint") == fingerprint:
+            logger.info(f"Usando balance materializado para {month}/{year}.")
+            return data["balance"]
+
+    balance = _compute_net_balance(year, month)
+    balance_snapshot_store.save(key, version, {"fingerprint": fingerprint, "balance": balance})
+    return balance
+
+
 def get_available_sheet_months_years() -> list[tuple[int, int]]:
     """Discovers which (year, month) combinations have data in the spreadsheet."""
     if not is_connected():
@@ -131,20 +237,8 @@ def get_available_sheet_months_years() -> list[tuple[int, int]]:
     if not spreadsheet:
         return []
 
-    sheet_titles = [sh.title for sh in spreadsheet.worksheets()]
-    logger.info(f"Hojas encontradas: {sheet_titles}")
-    available = set()
-    months_map_spanish = {v: k for k, v in SPANISH_MONTHS.items()}
-    for title in sheet_titles:
-        parts = title.split()
-        if len(parts) >= 3:
-            base_name = " ".join(parts[:-2])
-            month_name_str, year_str = parts[-2], parts[-1]
-            if base_name in [SALES_SHEET_BASE_NAME, EXPENSES_SHEET_BASE_NAME, WHOLESALE_SHEET_BASE_NAME]:
-                try:
-                    month_num = months_map_spanish.get(month_name_str.capitalize())
-                    if month_num:
-                        available.add((int(year_str), month_num))
-                except (ValueError, KeyError):
-                    continue
+    month_index = get_sheet_month_index(spreadsheet)
+    logger.info(f"Hojas mensuales encontradas: {len(month_index)}")
+    base_names = (SALES_SHEET_BASE_NAME, EXPENSES_SHEET_BASE_NAME, WHOLESALE_SHEET_BASE_NAME)
+    available = {(year, month) for base_name, year, month in month_index if base_name in base_names}
     return sorted(list(available), key=lambda x: (x[0], x[1]), reverse=True)
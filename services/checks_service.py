@@ -15,6 +15,7 @@ from config import (
 from services.sheets_connection import (
     _get_or_create_worksheet, apply_table_formatting
 )
+from services.unit_of_work import cached_read, invalidate_sheet
 
 logger = logging.getLogger(__name__)
 
@@ -30,15 +31,23 @@ def add_check(entity: str, initial_amount: float, commission: float, due_date: s
     tax = initial_amount * 0.012
     final_amount = initial_amount + commission + tax
     row_data = [check_id, due_date, entity, initial_amount, tax, commission, final_amount, "Pendiente"]
+    invalidate_sheet(CHECKS_SHEET_NAME)
     sheet.append_row(row_data, value_input_option='USER_ENTERED')
 
 
-def get_pending_checks() -> List[Dict[str, Any]]:
-    """Returns all checks with status 'Pendiente'."""
-    sheet = _get_or_create_worksheet(CHECKS_SHEET_NAME, CHECKS_HEADERS)
+@cached_read(tags=lambda sheet_name: [sheet_name])
+def _get_all_records(sheet_name: str) -> List[Dict[str, Any]]:
+    """Lee todos los registros de Cheques o Pagos Futuros; memoizado dentro de la unidad de trabajo."""
+    headers = CHECKS_HEADERS if sheet_name == CHECKS_SHEET_NAME else FUTURE_PAYMENTS_HEADERS
+    sheet = _get_or_create_worksheet(sheet_name, headers)
     if not sheet:
         return []
-    all_records = sheet.get_all_records()
+    return sheet.get_all_records()
+
+
+def get_pending_checks() -> List[Dict[str, Any]]:
+    """Returns all checks with status 'Pendiente'."""
+    all_records = _get_all_records(CHECKS_SHEET_NAME)
     return [r for r in all_records if r.get("Estado") == "Pendiente"]
 
 
@@ -59,15 +68,13 @@ def add_future_payment(entity: str, product: str, quantity: int, initial_amount:
     payment_id = f"FP-{int(datetime.now().timestamp())}"
     final_amount = initial_amount - commission
     row_data = [payment_id, due_date, entity, product, quantity, initial_amount, commission, final_amount, "Pendiente"]
+    invalidate_sheet(FUTURE_PAYMENTS_SHEET_NAME)
     sheet.append_row(row_data, value_input_option='USER_ENTERED')
 
 
 def get_pending_future_payments() -> List[Dict[str, Any]]:
     """Returns all future payments with status 'Pendiente'."""
-    sheet = _get_or_create_worksheet(FUTURE_PAYMENTS_SHEET_NAME, FUTURE_PAYMENTS_HEADERS)
-    if not sheet:
-        return []
-    all_records = sheet.get_all_records()
+    all_records = _get_all_records(FUTURE_PAYMENTS_SHEET_NAME)
     return [r for r in all_records if r.get("Estado") == "Pendiente"]
 
 
@@ -112,6 +119,7 @@ def update_past_due_statuses() -> None:
                     due_date = datetime.strptime(due_date_str, "%d/%m/%Y")
                     if due_date < today:
                         status_col_index = headers.index("Estado") + 1
+                        invalidate_sheet(sheet_name)
                         sheet.update_cell(row_num, status_col_index, "PAGO")
                         updated_count += 1
                         logger.info(f"Fila {row_num} en '{sheet_name}' actualizada a PAGO.")
@@ -128,11 +136,11 @@ def get_items_due_today() -> Dict[str, List]:
     """Busca en Cheques y Pagos Futuros los items cuyo estado es 'PAGO' y vencen hoy."""
     today_str = datetime.now().strftime("%d/%m/%Y")
     results = {"cheques": [], "pagos_futuros": []}
-    all_checks = _get_or_create_worksheet(CHECKS_SHEET_NAME, CHECKS_HEADERS).get_all_records()
+    all_checks = _get_all_records(CHECKS_SHEET_NAME)
     for check in all_checks:
         if check.get("Estado") == "PAGO" and check.get("Fecha Cobro") == today_str:
             results["cheques"].append(check)
-    all_fps = _get_or_create_worksheet(FUTURE_PAYMENTS_SHEET_NAME, FUTURE_PAYMENTS_HEADERS).get_all_records()
+    all_fps = _get_all_records(FUTURE_PAYMENTS_SHEET_NAME)
     for fp in all_fps:
         if fp.get("Estado") == "PAGO" and fp.get("Fecha Cobro") == today_str:
             results["pagos_futuros"].append(fp)
@@ -148,6 +156,7 @@ def update_item_status(sheet_name: str, item_id: str, new_status: str) -> bool:
     try:
         existing_headers = sheet.row_values(1)
         if existing_headers != headers:
+            invalidate_sheet(sheet_name)
             sheet.update('1:1', [headers])
             apply_table_formatting(sheet, len(headers))
     except Exception as e:
@@ -158,6 +167,7 @@ def update_item_status(sheet_name: str, item_id: str, new_status: str) -> bool:
             logger.warning(f"No se encontro el item con ID {item_id} en la hoja {sheet_name}.")
             return False
         status_col_index = headers.index("Estado") + 1
+        invalidate_sheet(sheet_name)
         sheet.update_cell(cell.row, status_col_index, new_status)
         logger.info(f"Item {item_id} en hoja {sheet_name} actualizado a estado '{new_status}'.")
         return True
@@ -10,9 +10,10 @@ from typing import Optional, List, Dict, Any
 from config import DEBTS_SHEET_NAME, DEBTS_HEADERS
 from common.utils import parse_float
 from services.sheets_connection import (
-    _get_or_create_worksheet, get_value_from_dict_insensitive,
-    find_column_index, safe_row_value
+    _get_or_create_worksheet, HeaderIndex,
+    find_column_index, safe_row_value, read_rows, patch_row
 )
+from services.unit_of_work import cached_read, invalidate_sheet
 
 logger = logging.getLogger(__name__)
 
@@ -32,6 +33,7 @@ def add_new_debt(name: str, amount: float) -> Optional[Dict[str, Any]]:
     date_str = timestamp.strftime("%Y-%m-%d %H:%M:%S")
     row_data = [debt_id, name, amount, 0.0, amount, "Activa", date_str, date_str]
     try:
+        invalidate_sheet(DEBTS_SHEET_NAME)
         debts_sheet.append_row(row_data, value_input_option='USER_ENTERED')
         logger.info(f"Nueva deuda creada: {row_data}")
         return {
@@ -42,6 +44,7 @@ def add_new_debt(name: str, amount: float) -> Optional[Dict[str, Any]]:
         return None
 
 
+@cached_read(tags=lambda: [DEBTS_SHEET_NAME])
 def get_active_debts() -> List[Dict[str, Any]]:
     """Obtiene todas las deudas con saldo pendiente > 0."""
     debts_sheet = get_or_create_debts_sheet()
@@ -49,9 +52,10 @@ def get_active_debts() -> List[Dict[str, Any]]:
         return []
     try:
         all_debts = debts_sheet.get_all_records()
+        pending_key = HeaderIndex.from_records(all_debts).key("Saldo Pendiente")
         active_debts = []
         for i, debt in enumerate(all_debts):
-            pending_balance = parse_float(str(get_value_from_dict_insensitive(debt, "Saldo Pendiente") or '0'))
+            pending_balance = parse_float(str(debt.get(pending_key) or '0'))
             if pending_balance is not None and pending_balance > 0:
                 debt['row_number'] = i + 2
                 active_debts.append(debt)
@@ -72,8 +76,7 @@ def register_debt_payment(debt_id: str, payment_amount: float) -> Optional[Dict[
             logger.error(f"No se encontro la deuda con ID {debt_id} para registrar el pago.")
             return None
         row_number = cell.row
-        row_values = debts_sheet.row_values(row_number)
-        headers = debts_sheet.row_values(1)
+        headers, row_values = read_rows(debts_sheet, 1, row_number)
 
         paid_col = find_column_index(headers, "Monto Pagado")
         pending_col = find_column_index(headers, "Saldo Pendiente")
@@ -91,10 +94,12 @@ def register_debt_payment(debt_id: str, payment_amount: float) -> Optional[Dict[
         new_status = "Activa" if new_pending > 0 else "Saldada"
         update_timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
-        debts_sheet.update_cell(row_number, paid_col, new_paid)
-        debts_sheet.update_cell(row_number, pending_col, new_pending)
-        debts_sheet.update_cell(row_number, status_col, new_status)
-        debts_sheet.update_cell(row_number, last_paid_col, update_timestamp)
+        patch_row(debts_sheet, row_number, {
+            paid_col: new_paid,
+            pending_col: new_pending,
+            status_col: new_status,
+            last_paid_col: update_timestamp,
+        })
         logger.info(f"Pago registrado para deuda {debt_id}. Nuevo saldo pendiente: {new_pending}")
 
         name_col = find_column_index(headers, "Nombre")
@@ -120,8 +125,7 @@ def increase_debt_amount(debt_id: str, increase_amount: float) -> Optional[Dict[
             logger.error(f"No se encontró la deuda con ID {debt_id} para incrementar.")
             return None
         row_number = cell.row
-        headers = debts_sheet.row_values(1)
-        row_values = debts_sheet.row_values(row_number)
+        headers, row_values = read_rows(debts_sheet, 1, row_number)
 
         initial_col = find_column_index(headers, "Monto Inicial")
         pending_col = find_column_index(headers, "Saldo Pendiente")
@@ -138,10 +142,12 @@ def increase_debt_amount(debt_id: str, increase_amount: float) -> Optional[Dict[
         new_initial = current_initial + increase_amount
         new_pending = current_pending + increase_amount
 
-        debts_sheet.update_cell(row_number, initial_col, new_initial)
-        debts_sheet.update_cell(row_number, pending_col, new_pending)
-        debts_sheet.update_cell(row_number, status_col, "Activa")
-        debts_sheet.update_cell(row_number, last_paid_col, datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+        patch_row(debts_sheet, row_number, {
+            initial_col: new_initial,
+            pending_col: new_pending,
+            status_col: "Activa",
+            last_paid_col: datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        })
 
         debt_name = safe_row_value(row_values, name_col)
         logger.info(f"Deuda {debt_id} incrementada en {increase_amount}. Nuevo saldo: {new_pending}.")
@@ -7,6 +7,7 @@ from datetime import datetime
 
 from config import EXPENSES_SHEET_BASE_NAME, EXPENSES_HEADERS
 from services.sheets_connection import get_or_create_monthly_sheet
+from services.unit_of_work import invalidate_sheet
 
 logger = logging.getLogger(__name__)
 
@@ -19,6 +20,7 @@ def add_expense(category: str, subcategory: str, description: str, details: str,
     if not worksheet:
         raise ConnectionError(f"Hoja para '{EXPENSES_SHEET_BASE_NAME}' no disponible.")
     row_data = [timestamp, category, subcategory, description, details, amount]
+    invalidate_sheet(worksheet.title)
     worksheet.append_row(row_data, value_input_option='USER_ENTERED')
     return {
         "timestamp": timestamp, "category": category, "subcategory": subcategory,
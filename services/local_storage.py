@@ -0,0 +1,833 @@
+# services/local_storage.py
+"""
+Local-first storage engine for the business tables.
+
+A SQLite database mirrors the Ventas/Gastos/Mayoristas/Deudas/Cheques/
+Pagos Futuros/Productos sheets. `LocalFirstSpreadsheet` exposes the same
+subset of the gspread API the services use, so installing it as the global
+`spreadsheet` keeps every function re-exported by `sheet.py` unchanged:
+reads and writes are served locally and every write is appended to an
+outbox. `SheetsReplicator` pushes the outbox to Google Sheets in batches
+and pulls back edits made by hand in the spreadsheet.
+
+The database must live on durable storage shared by every function (e.g. an
+EFS mount, see LOCAL_DB_PATH): the outbox holds writes the user was already
+told about, so it has to outlive the container. Writes are replayed by row
+key rather than by local row number, because a manual edit in the
+spreadsheet can shift rows between pulls; an update whose row or amounts
+changed remotely is set aside instead of overwriting newer data.
+
+Sheets outside the business tables (Processed_Events, Webhook_Logs, ...)
+keep going straight to Google Sheets.
+"""
+import json
+import logging
+import re
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, List, Optional
+
+import gspread
+from gspread.cell import Cell
+from gspread.utils import a1_to_rowcol, numericise, rowcol_to_a1
+
+from common.utils import normalize_text, parse_float
+from config import (
+    SALES_SHEET_BASE_NAME, EXPENSES_SHEET_BASE_NAME, WHOLESALE_SHEET_BASE_NAME,
+    DEBTS_SHEET_NAME, CHECKS_SHEET_NAME, FUTURE_PAYMENTS_SHEET_NAME, PRODUCTOS_SHEET_NAME,
+    SPANISH_MONTHS,
+)
+
+logger = logging.getLogger(__name__)
+
+LOCAL_MONTHLY_TABLES = (SALES_SHEET_BASE_NAME, EXPENSES_SHEET_BASE_NAME, WHOLESALE_SHEET_BASE_NAME)
+LOCAL_FIXED_TABLES = (DEBTS_SHEET_NAME, CHECKS_SHEET_NAME, FUTURE_PAYMENTS_SHEET_NAME, PRODUCTOS_SHEET_NAME)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sheets (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    title TEXT UNIQUE NOT NULL,
+    col_count INTEGER NOT NULL DEFAULT 26
+);
+CREATE TABLE IF NOT EXISTS rows (
+    sheet_id INTEGER NOT NULL,
+    row_number INTEGER NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (sheet_id, row_number)
+);
+CREATE TABLE IF NOT EXISTS outbox (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    title TEXT NOT NULL,
+    op TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS outbox_failed (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    title TEXT NOT NULL,
+    op TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    error TEXT,
+    failed_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+_ROW_RANGE = re.compile(r"^(\d+):(\d+)$")
+_COLUMN_TAIL_RANGE = re.compile(r"^([A-Z]+)(\d+):([A-Z]+)$")
+_MONTH_NAMES = set(SPANISH_MONTHS.values())
+
+# Columnas que identifican una fila al replicarla: la fila destino se busca en
+# el remoto por estos valores. Las tablas sin entrada usan las celdas que la
+# escritura no toca.
+_ROW_KEY_HEADERS = {
+    DEBTS_SHEET_NAME: ("ID Deuda",),
+    CHECKS_SHEET_NAME: ("ID",),
+    FUTURE_PAYMENTS_SHEET_NAME: ("ID",),
+    PRODUCTOS_SHEET_NAME: ("ID Variante",),
+    WHOLESALE_SHEET_BASE_NAME: ("Nombre", "Producto", "Cantidad", "Monto Total"),
+}
+
+# Reintentos de una operación del outbox antes de apartarla en outbox_failed.
+MAX_PUSH_ATTEMPTS = 5
+# Un solo contenedor replica a la vez; el lease vence solo si el dueño muere a mitad de camino.
+PUSH_LEASE_SECONDS = 120
+_PUSH_LEASE = "push_lease"
+
+
+def is_local_table(title: str) -> bool:
+    """Indica si la hoja pertenece a las tablas de negocio servidas localmente."""
+    if title in LOCAL_FIXED_TABLES:
+        return True
+    parts = title.rsplit(" ", 2)
+    return (
+        len(parts) == 3 and parts[0] in LOCAL_MONTHLY_TABLES
+        and parts[1] in _MONTH_NAMES and parts[2].isdigit()
+    )
+
+
+def _cell_text(value: Any) -> str:
+    """Convierte un valor de Python al texto que devolvería Sheets al leer la celda."""
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "TRUE" if value else "FALSE"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def _column_index(letters: str) -> int:
+    return a1_to_rowcol(f"{letters}1")[1]
+
+
+def _as_number(text: str) -> Optional[float]:
+    return parse_float(str(text).replace("$", "").replace(" ", ""))
+
+
+def _comparable(text: str) -> Any:
+    """Normaliza una celda para comparar la copia local (texto crudo) con el remoto (texto formateado)."""
+    number = _as_number(text)
+    return round(number, 2) if number is not None else normalize_text(str(text))
+
+
+def _row_key(values: List[str], columns: Iterable[int]) -> tuple:
+    return tuple(_comparable(values[c - 1] if c <= len(values) else "") for c in columns)
+
+
+def _row_key_headers(title: str) -> tuple:
+    return _ROW_KEY_HEADERS.get(title) or _ROW_KEY_HEADERS.get(title.rsplit(" ", 2)[0], ())
+
+
+def _descending_runs(rows: Iterable[int]) -> List[tuple]:
+    """Agrupa filas en rangos contiguos (inicio, fin), del último al primero."""
+    runs: List[list] = []
+    for row in sorted(rows, reverse=True):
+        if runs and runs[-1][0] == row + 1:
+            runs[-1][0] = row
+        else:
+            runs.append([row, row])
+    return [tuple(run) for run in runs]
+
+
+class LocalStore:
+    """SQLite tables holding sheet rows plus the outbox of pending writes."""
+
+    def __init__(self, path: str):
+        self.path = path
+        # Varios contenedores comparten el archivo: esperan el lock en vez de fallar enseguida
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._lock = threading.RLock()
+        with self._lock:
+            self._conn.executescript(_SCHEMA)
+
+    # --- sheets ---
+
+    def titles(self) -> List[str]:
+        with self._lock:
+            return [r[0] for r in self._conn.execute("SELECT title FROM sheets ORDER BY id")]
+
+    def sheet_info(self, title: str) -> Optional[tuple]:
+        with self._lock:
+            return self._conn.execute("SELECT id, col_count FROM sheets WHERE title = ?", (title,)).fetchone()
+
+    def create_sheet(self, title: str, col_count: int) -> int:
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO sheets (title, col_count) VALUES (?, ?)", (title, col_count)
+            )
+            return cursor.lastrowid
+
+    def drop_sheet(self, title: str) -> None:
+        with self._lock:
+            info = self.sheet_info(title)
+            if info:
+                self._conn.execute("DELETE FROM rows WHERE sheet_id = ?", (info[0],))
+                self._conn.execute("DELETE FROM sheets WHERE id = ?", (info[0],))
+
+    # --- rows ---
+
+    def read(self, sheet_id: int) -> List[List[str]]:
+        """Devuelve todas las filas hasta la última no vacía, como lo hace la API."""
+        with self._lock:
+            stored = dict(self._conn.execute(
+                "SELECT row_number, data FROM rows WHERE sheet_id = ?", (sheet_id,)
+            ))
+        if not stored:
+            return []
+        return [json.loads(stored[n]) if n in stored else [] for n in range(1, max(stored) + 1)]
+
+    def row_count(self, sheet_id: int) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COALESCE(MAX(row_number), 0) FROM rows WHERE sheet_id = ?", (sheet_id,)
+            ).fetchone()[0]
+
+    def write_rows(self, sheet_id: int, rows: Dict[int, List[str]]) -> None:
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO rows (sheet_id, row_number, data) VALUES (?, ?, ?)",
+                [(sheet_id, n, json.dumps(values)) for n, values in rows.items()],
+            )
+
+    def replace_rows(self, sheet_id: int, values: List[List[str]]) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM rows WHERE sheet_id = ?", (sheet_id,))
+            self.write_rows(sheet_id, {n: row for n, row in enumerate(values, start=1)})
+
+    # --- outbox ---
+
+    def enqueue(self, title: str, op: str, payload: Any) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO outbox (title, op, payload) VALUES (?, ?, ?)",
+                (title, op, json.dumps(payload)),
+            )
+
+    def pending(self) -> List[tuple]:
+        with self._lock:
+            return [
+                (seq, title, op, json.loads(payload))
+                for seq, title, op, payload in self._conn.execute(
+                    "SELECT seq, title, op, payload FROM outbox ORDER BY seq"
+                )
+            ]
+
+    def pending_titles(self) -> set:
+        with self._lock:
+            return {r[0] for r in self._conn.execute("SELECT DISTINCT title FROM outbox")}
+
+    def acknowledge(self, seqs: Iterable[int]) -> None:
+        with self._lock:
+            self._conn.executemany("DELETE FROM outbox WHERE seq = ?", [(s,) for s in seqs])
+
+    def record_failure(self, seqs: List[int], error: str, max_attempts: int) -> bool:
+        """
+        Suma un intento fallido a las operaciones. Las que llegan a max_attempts
+        pasan a outbox_failed; devuelve True si se apartó alguna.
+        """
+        marks = ",".join("?" * len(seqs))
+        with self.transaction():
+            self._conn.execute(f"UPDATE outbox SET attempts = attempts + 1 WHERE seq IN ({marks})", seqs)
+            exhausted = [r[0] for r in self._conn.execute(
+                f"SELECT seq FROM outbox WHERE seq IN ({marks}) AND attempts >= ?", (*seqs, max_attempts)
+            )]
+            if not exhausted:
+                return False
+            marks = ",".join("?" * len(exhausted))
+            self._conn.execute(
+                f"INSERT INTO outbox_failed (title, op, payload, error) "
+                f"SELECT title, op, payload, ? FROM outbox WHERE seq IN ({marks})",
+                (error, *exhausted),
+            )
+            self._conn.execute(f"DELETE FROM outbox WHERE seq IN ({marks})", exhausted)
+            return True
+
+    def set_aside(self, title: str, op: str, payload: Any, error: str) -> None:
+        """Guarda en outbox_failed una escritura que no se pudo replicar, para revisarla a mano."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO outbox_failed (title, op, payload, error) VALUES (?, ?, ?, ?)",
+                (title, op, json.dumps(payload), error),
+            )
+
+    def failed(self) -> List[tuple]:
+        with self._lock:
+            return [
+                (title, op, json.loads(payload), error)
+                for title, op, payload, error in self._conn.execute(
+                    "SELECT title, op, payload, error FROM outbox_failed ORDER BY id"
+                )
+            ]
+
+    # --- meta ---
+
+    def get_meta(self, key: str, default: Optional[str] = None) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def set_meta(self, key: str, value: str) -> None:
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def acquire_lease(self, name: str, owner: str, ttl: float, now: float) -> bool:
+        """Toma o renueva un lease guardado en meta; False si otro dueño lo tiene vigente."""
+        with self.transaction():
+            row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (name,)).fetchone()
+            if row:
+                holder, expires_at = json.loads(row[0])
+                if holder != owner and expires_at > now:
+                    return False
+            self._conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (name, json.dumps([owner, now + ttl]))
+            )
+            return True
+
+    def release_lease(self, name: str, owner: str) -> None:
+        with self.transaction():
+            row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (name,)).fetchone()
+            if row and json.loads(row[0])[0] == owner:
+                self._conn.execute("DELETE FROM meta WHERE key = ?", (name,))
+
+    @contextmanager
+    def transaction(self):
+        """Agrupa escrituras locales y su entrada en el outbox en una sola transacción."""
+        with self._lock:
+            # IMMEDIATE: toma el lock de escritura al empezar, así dos contenedores no se bloquean mutuamente
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+
+class LocalWorksheet:
+    """
+    Hoja respaldada por SQLite con el subconjunto de gspread.Worksheet que
+    usan los servicios. Los valores se guardan como el texto que devolvería
+    Sheets, así las lecturas locales y remotas se comportan igual.
+    """
+
+    def __init__(self, store: LocalStore, title: str, sheet_id: int):
+        self.store = store
+        self.title = title
+        self.id = sheet_id
+
+    def __repr__(self) -> str:
+        return f"<LocalWorksheet {self.title!r} id:{self.id}>"
+
+    @property
+    def row_count(self) -> int:
+        return self.store.row_count(self.id)
+
+    @property
+    def col_count(self) -> int:
+        info = self.store.sheet_info(self.title)
+        return info[1] if info else 0
+
+    # --- lecturas ---
+
+    def get_all_values(self, **_: Any) -> List[List[str]]:
+        return self.store.read(self.id)
+
+    def get_all_records(self, head: int = 1, default_blank: Any = "", **_: Any) -> List[Dict[str, Any]]:
+        values = self.get_all_values()
+        if len(values) < head:
+            return []
+        headers = values[head - 1]
+        records = []
+        for row in values[head:]:
+            padded = list(row) + [""] * (len(headers) - len(row))
+            records.append({
+                key: numericise(value, default_blank=default_blank)
+                for key, value in zip(headers, padded)
+            })
+        return records
+
+    def row_values(self, row: int, **_: Any) -> List[str]:
+        values = self.get_all_values()
+        return list(values[row - 1]) if row <= len(values) else []
+
+    def col_values(self, col: int, **_: Any) -> List[str]:
+        column = [row[col - 1] if len(row) >= col else "" for row in self.get_all_values()]
+        while column and column[-1] == "":
+            column.pop()
+        return column
+
+    def get(self, range_name: str, **_: Any) -> List[List[str]]:
+        values = self.get_all_values()
+        match = _ROW_RANGE.match(range_name)
+        if match:
+            first, last = int(match.group(1)), int(match.group(2))
+            return [list(row) for row in values[first - 1:last] if row]
+        match = _COLUMN_TAIL_RANGE.match(range_name)
+        if match and match.group(1) == match.group(3):
+            col, first = _column_index(match.group(1)), int(match.group(2))
+            tail = [[row[col - 1]] if len(row) >= col and row[col - 1] != "" else [] for row in values[first - 1:]]
+            while tail and not tail[-1]:
+                tail.pop()
+            return tail
+        row, col = a1_to_rowcol(range_name)
+        if row <= len(values) and col <= len(values[row - 1]):
+            return [[values[row - 1][col - 1]]]
+        return []
+
+    def batch_get(self, ranges: List[str], **_: Any) -> List[List[List[str]]]:
+        return [self.get(range_name) for range_name in ranges]
+
+    def find(self, query: str, in_row: Optional[int] = None, in_column: Optional[int] = None, **_: Any) -> Optional[Cell]:
+        query = _cell_text(query)
+        for row_number, row in enumerate(self.get_all_values(), start=1):
+            if in_row is not None and row_number != in_row:
+                continue
+            for col_number, value in enumerate(row, start=1):
+                if in_column is not None and col_number != in_column:
+                    continue
+                if value == query:
+                    return Cell(row_number, col_number, value)
+        return None
+
+    # --- escrituras (locales + outbox) ---
+
+    def _set_cells(self, cells: Dict[tuple, Any]) -> List[Dict[str, Any]]:
+        """
+        Escribe las celdas y devuelve una entrada de outbox por fila: la fila
+        previa ("before", para ubicarla en el remoto) y [col, anterior, nuevo].
+        """
+        values = self.get_all_values()
+        touched: Dict[int, List[str]] = {}
+        entries: Dict[int, Dict[str, Any]] = {}
+        for (row, col), value in cells.items():
+            if row not in touched:
+                before = list(values[row - 1]) if row <= len(values) else []
+                touched[row] = list(before)
+                entries[row] = {"row": row, "before": before, "cells": []}
+            current = touched[row]
+            current.extend([""] * (col - len(current)))
+            entries[row]["cells"].append([col, current[col - 1], _cell_text(value)])
+            current[col - 1] = _cell_text(value)
+        self.store.write_rows(self.id, touched)
+        return list(entries.values())
+
+    def append_rows(self, values: List[List[Any]], value_input_option: str = "RAW", **_: Any) -> None:
+        rows = [[_cell_text(v) for v in row] for row in values]
+        with self.store.transaction():
+            start = self.store.row_count(self.id) + 1
+            self.store.write_rows(self.id, {start + i: row for i, row in enumerate(rows)})
+            self.store.enqueue(self.title, "append_rows", rows)
+
+    def append_row(self, values: List[Any], value_input_option: str = "RAW", **kwargs: Any) -> None:
+        self.append_rows([values], value_input_option, **kwargs)
+
+    def update_cell(self, row: int, col: int, value: Any) -> None:
+        self.batch_update([{"range": rowcol_to_a1(row, col), "values": [[value]]}])
+
+    def batch_update(self, data: List[Dict[str, Any]], **_: Any) -> None:
+        cells = {}
+        for entry in data:
+            top, left = a1_to_rowcol(entry["range"].split(":")[0])
+            for r, row in enumerate(entry["values"]):
+                for c, value in enumerate(row):
+                    cells[(top + r, left + c)] = value
+        with self.store.transaction():
+            self.store.enqueue(self.title, "update_cells", self._set_cells(cells))
+
+    def update(self, range_name: Any = None, values: Any = None, **kwargs: Any) -> None:
+        # Admite tanto update(range, values) como update(values, range_name=...).
+        if isinstance(range_name, list):
+            range_name, values = values or kwargs.get("range_name"), range_name
+        match = _ROW_RANGE.match(range_name)
+        anchor = f"A{match.group(1)}" if match else range_name.split(":")[0]
+        self.batch_update([{"range": anchor, "values": values}])
+
+    def delete_rows(self, start_index: int, end_index: Optional[int] = None) -> None:
+        end_index = end_index or start_index
+        with self.store.transaction():
+            values = self.store.read(self.id)
+            removed = values[start_index - 1:end_index]
+            del values[start_index - 1:end_index]
+            self.store.replace_rows(self.id, values)
+            self.store.enqueue(self.title, "delete_rows", {"start": start_index, "rows": removed})
+
+    def clear(self) -> None:
+        with self.store.transaction():
+            self.store.replace_rows(self.id, [])
+            self.store.enqueue(self.title, "clear", None)
+
+    def format(self, ranges: str, format: Dict[str, Any]) -> None:
+        self.store.enqueue(self.title, "format", {"range": ranges, "format": format})
+
+    def set_basic_filter(self, *args: Any, **kwargs: Any) -> None:
+        self.store.enqueue(self.title, "basic_filter", None)
+
+
+class LocalFirstSpreadsheet:
+    """
+    Drop-in para gspread.Spreadsheet: las tablas de negocio se sirven desde
+    SQLite y el resto de las hojas se delega al spreadsheet remoto.
+    """
+
+    def __init__(self, store: LocalStore, remote: gspread.Spreadsheet):
+        self.store = store
+        self.remote = remote
+        self._sheets: Dict[str, LocalWorksheet] = {}
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.remote, name)
+
+    def _local(self, title: str) -> Optional[LocalWorksheet]:
+        info = self.store.sheet_info(title)
+        if not info:
+            self._sheets.pop(title, None)
+            return None
+        cached = self._sheets.get(title)
+        if cached is None or cached.id != info[0]:
+            cached = self._sheets[title] = LocalWorksheet(self.store, title, info[0])
+        return cached
+
+    def worksheets(self, *args: Any, **kwargs: Any) -> List[Any]:
+        local = [self._local(title) for title in self.store.titles()]
+        remote = [ws for ws in self.remote.worksheets(*args, **kwargs) if not is_local_table(ws.title)]
+        return local + remote
+
+    def worksheet(self, title: str) -> Any:
+        if not is_local_table(title):
+            return self.remote.worksheet(title)
+        worksheet = self._local(title)
+        if worksheet is None:
+            raise gspread.exceptions.WorksheetNotFound(title)
+        return worksheet
+
+    def add_worksheet(self, title: str, rows: Any = 1, cols: Any = 26, **kwargs: Any) -> Any:
+        if not is_local_table(title):
+            return self.remote.add_worksheet(title=title, rows=rows, cols=cols, **kwargs)
+        with self.store.transaction():
+            self.store.create_sheet(title, int(cols))
+            self.store.enqueue(title, "add_sheet", {"rows": int(rows), "cols": int(cols)})
+        return self._local(title)
+
+    def del_worksheet(self, worksheet: Any) -> None:
+        if not isinstance(worksheet, LocalWorksheet):
+            return self.remote.del_worksheet(worksheet)
+        with self.store.transaction():
+            self.store.drop_sheet(worksheet.title)
+            self.store.enqueue(worksheet.title, "del_sheet", None)
+        self._sheets.pop(worksheet.title, None)
+
+
+# Operaciones consecutivas del mismo tipo sobre la misma hoja que se fusionan en una llamada.
+_MERGEABLE_OPS = ("append_rows", "update_cells")
+
+
+class _RemoteTable:
+    """
+    Copia de trabajo de una hoja remota durante un push. Ubica las filas del
+    outbox por su clave en lugar de por el número de fila local, que puede
+    haber quedado viejo, y se mantiene al día con lo que el push va escribiendo.
+    """
+
+    def __init__(self, title: str, worksheet: Any, values: Optional[List[List[str]]] = None):
+        self.title = title
+        self.worksheet = worksheet
+        self._values = values
+        self._indexes: Dict[tuple, Dict[tuple, List[int]]] = {}
+
+    @property
+    def values(self) -> List[List[str]]:
+        if self._values is None:
+            self._values = [[_cell_text(v) for v in row] for row in self.worksheet.get_all_values()]
+        return self._values
+
+    def key_columns(self, before: List[str], written: Iterable[int] = ()) -> tuple:
+        headers = self.values[0] if self.values else []
+        names = _row_key_headers(self.title)
+        if names and all(name in headers for name in names):
+            return tuple(headers.index(name) + 1 for name in names)
+        return tuple(c for c in range(1, len(before) + 1) if c not in written)
+
+    def _index(self, columns: tuple) -> Dict[tuple, List[int]]:
+        index = self._indexes.get(columns)
+        if index is None:
+            index = self._indexes[columns] = {}
+            for number, values in enumerate(self.values[1:], start=2):
+                index.setdefault(_row_key(values, columns), []).append(number)
+        return index
+
+    def locate(self, row: int, before: List[str], written: Iterable[int] = (), exclude: Iterable[int] = ()) -> Optional[int]:
+        """Fila remota con la misma clave que `before` (la más cercana a `row`); None si ya no está."""
+        if row == 1 or not any(before):
+            return row
+        columns = self.key_columns(before, written)
+        candidates = [n for n in self._index(columns).get(_row_key(before, columns), []) if n not in exclude]
+        return min(candidates, key=lambda n: abs(n - row)) if candidates else None
+
+    def resolve_update(self, entry: Dict[str, Any]) -> Optional[int]:
+        """
+        Fila remota donde aplicar una entrada de update_cells, o None si hay
+        conflicto: la fila ya no está o un monto que la escritura daba por
+        sabido cambió en el remoto (otra instancia o una edición manual).
+        """
+        written = {col for col, _, _ in entry["cells"]}
+        row = self.locate(entry["row"], entry["before"], written)
+        if row is None or written & set(self.key_columns(entry["before"], written)):
+            # Si la escritura pisa la clave, reemplaza la fila entera: no hay montos previos que cuidar
+            return row
+        current = self.values[row - 1] if row <= len(self.values) else []
+        for col, old, new in entry["cells"]:
+            remote = _comparable(current[col - 1] if col <= len(current) else "")
+            if _as_number(old) is not None and remote not in (_comparable(old), _comparable(new)):
+                return None
+        return row
+
+    def set_cells(self, row: int, cells: Dict[int, str]) -> None:
+        values = self.values
+        while len(values) < row:
+            values.append([])
+        current = values[row - 1]
+        if row == 1:
+            self._indexes.clear()
+        affected = [columns for columns in self._indexes if set(columns) & cells.keys()]
+        for columns in affected:
+            self._indexes[columns][_row_key(current, columns)].remove(row)
+        for col, value in cells.items():
+            current.extend([""] * (col - len(current)))
+            current[col - 1] = value
+        for columns in affected:
+            self._indexes[columns].setdefault(_row_key(current, columns), []).append(row)
+
+    def appended(self, rows: List[List[str]]) -> None:
+        if self._values is not None:
+            self._values.extend(list(row) for row in rows)
+        self._indexes.clear()
+
+    def deleted(self, rows: Iterable[int]) -> None:
+        for row in sorted(rows, reverse=True):
+            if row <= len(self.values):
+                del self.values[row - 1]
+        self._indexes.clear()
+
+    def cleared(self) -> None:
+        self._values = []
+        self._indexes.clear()
+
+
+class SheetsReplicator:
+    """Replica el outbox local hacia Google Sheets y trae las ediciones manuales."""
+
+    def __init__(self, store: LocalStore, remote: gspread.Spreadsheet, clock=time.time):
+        self.store = store
+        self.remote = remote
+        self.clock = clock
+        self.owner = uuid.uuid4().hex
+        self._lock = threading.Lock()
+
+    def _coalesce(self, entries: List[tuple]) -> List[tuple]:
+        batches: List[tuple] = []
+        for seq, title, op, payload in entries:
+            last = batches[-1] if batches else None
+            if last and op in _MERGEABLE_OPS and last[1] == title and last[2] == op:
+                last[0].append(seq)
+                last[3].extend(payload)
+            else:
+                batches.append(([seq], title, op, list(payload) if op in _MERGEABLE_OPS else payload))
+        return batches
+
+    # --- operaciones: cada una devuelve las entradas que quedaron en conflicto ---
+
+    def _push_append_rows(self, table: _RemoteTable, rows: List[List[str]]) -> list:
+        table.worksheet.append_rows(rows, value_input_option="USER_ENTERED")
+        table.appended(rows)
+        return []
+
+    def _push_update_cells(self, table: _RemoteTable, entries: List[Dict[str, Any]]) -> list:
+        data, conflicts = [], []
+        for entry in entries:
+            row = table.resolve_update(entry)
+            if row is None:
+                conflicts.append(entry)
+                continue
+            data.extend({"range": rowcol_to_a1(row, col), "values": [[new]]} for col, _, new in entry["cells"])
+            table.set_cells(row, {col: new for col, _, new in entry["cells"]})
+        if data:
+            table.worksheet.batch_update(data, value_input_option="USER_ENTERED")
+        return conflicts
+
+    def _push_delete_rows(self, table: _RemoteTable, payload: Dict[str, Any]) -> list:
+        # Las filas que ya no están en el remoto no hay que borrarlas
+        targets: set = set()
+        for offset, before in enumerate(payload["rows"]):
+            row = table.locate(payload["start"] + offset, before, exclude=targets)
+            if row is not None:
+                targets.add(row)
+        for start, end in _descending_runs(targets):
+            table.worksheet.delete_rows(start, end)
+        table.deleted(targets)
+        return []
+
+    def _push_clear(self, table: _RemoteTable, payload: Any) -> list:
+        table.worksheet.clear()
+        table.cleared()
+        return []
+
+    def _push_format(self, table: _RemoteTable, payload: Dict[str, Any]) -> list:
+        table.worksheet.format(payload["range"], payload["format"])
+        return []
+
+    def _push_basic_filter(self, table: _RemoteTable, payload: Any) -> list:
+        table.worksheet.set_basic_filter()
+        return []
+
+    def _push_del_sheet(self, table: _RemoteTable, payload: Any) -> list:
+        self.remote.del_worksheet(table.worksheet)
+        return []
+
+    _OPERATIONS = {
+        "append_rows": _push_append_rows,
+        "update_cells": _push_update_cells,
+        "delete_rows": _push_delete_rows,
+        "clear": _push_clear,
+        "format": _push_format,
+        "basic_filter": _push_basic_filter,
+        "del_sheet": _push_del_sheet,
+    }
+
+    def _open_table(self, tables: Dict[str, _RemoteTable], title: str, op: str, payload: Any) -> _RemoteTable:
+        if op != "add_sheet":
+            if title not in tables:
+                tables[title] = _RemoteTable(title, self.remote.worksheet(title))
+            return tables[title]
+        try:
+            tables[title] = _RemoteTable(title, self.remote.worksheet(title))
+        except gspread.exceptions.WorksheetNotFound:
+            worksheet = self.remote.add_worksheet(title=title, rows=payload["rows"], cols=payload["cols"])
+            tables[title] = _RemoteTable(title, worksheet, values=[])
+        return tables[title]
+
+    def _apply(self, tables: Dict[str, _RemoteTable], title: str, op: str, payload: Any) -> list:
+        table = self._open_table(tables, title, op, payload)
+        if op == "add_sheet":
+            return []
+        conflicts = self._OPERATIONS[op](self, table, payload)
+        if op == "del_sheet":
+            tables.pop(title, None)
+        return conflicts
+
+    def _push_batch(self, tables: Dict[str, _RemoteTable], seqs: List[int], title: str, op: str, payload: Any) -> bool:
+        """Aplica un lote del outbox. False si falló y la hoja tiene que esperar al próximo push."""
+        try:
+            conflicts = self._apply(tables, title, op, payload)
+        except Exception as e:
+            tables.pop(title, None)
+            if self.store.record_failure(seqs, str(e), MAX_PUSH_ATTEMPTS):
+                logger.error(f"'{op}' en la hoja '{title}' falló {MAX_PUSH_ATTEMPTS} veces; "
+                             f"se aparta a outbox_failed: {e}", exc_info=True)
+            else:
+                logger.error(f"Error replicando '{op}' en la hoja '{title}': {e}. Se reintentará.", exc_info=True)
+            return False
+        for entry in conflicts:
+            logger.warning(f"La fila {entry['row']} de '{title}' cambió en Google Sheets; "
+                           f"la escritura local se aparta a outbox_failed sin pisar el remoto.")
+            self.store.set_aside(title, op, entry, "conflicto: la fila cambió en el remoto")
+        if conflicts:
+            # La copia local quedó distinta del remoto: el próximo sync hace pull sin esperar el intervalo
+            self.store.set_meta("last_pull", "0")
+        self.store.acknowledge(seqs)
+        return True
+
+    def push(self) -> int:
+        """
+        Envía el outbox en lotes. Devuelve cuántas operaciones se replicaron. Si
+        una operación falla, las siguientes de esa hoja esperan al próximo push
+        (el orden importa); las de otras hojas siguen.
+        """
+        with self._lock:
+            if not self.store.acquire_lease(_PUSH_LEASE, self.owner, PUSH_LEASE_SECONDS, self.clock()):
+                logger.info("Otro contenedor está replicando el outbox; se deja para el próximo push.")
+                return 0
+            try:
+                pushed = 0
+                tables: Dict[str, _RemoteTable] = {}
+                blocked: set = set()
+                for seqs, title, op, payload in self._coalesce(self.store.pending()):
+                    if title in blocked:
+                        continue
+                    if self._push_batch(tables, seqs, title, op, payload):
+                        pushed += len(seqs)
+                    else:
+                        blocked.add(title)
+            finally:
+                self.store.release_lease(_PUSH_LEASE, self.owner)
+            if pushed:
+                logger.info(f"Replicadas {pushed} operaciones locales hacia Google Sheets.")
+            return pushed
+
+    def pull(self) -> int:
+        """
+        Trae el contenido remoto de las tablas de negocio con una sola lectura.
+        Las hojas con escrituras locales pendientes no se pisan.
+        """
+        with self._lock:
+            pending = self.store.pending_titles()
+            remote_sheets = [ws for ws in self.remote.worksheets() if is_local_table(ws.title)]
+            targets = [ws for ws in remote_sheets if ws.title not in pending]
+            value_ranges = []
+            if targets:
+                response = self.remote.values_batch_get([f"'{ws.title}'" for ws in targets])
+                value_ranges = response.get("valueRanges", [])
+            remote_titles = {ws.title for ws in remote_sheets}
+            with self.store.transaction():
+                for ws, value_range in zip(targets, value_ranges):
+                    info = self.store.sheet_info(ws.title)
+                    sheet_id = info[0] if info else self.store.create_sheet(ws.title, ws.col_count)
+                    values = [[_cell_text(v) for v in row] for row in value_range.get("values", [])]
+                    self.store.replace_rows(sheet_id, values)
+                for title in self.store.titles():
+                    if title not in remote_titles and title not in pending:
+                        self.store.drop_sheet(title)
+                self.store.set_meta("last_pull", str(self.clock()))
+            logger.info(f"Sincronizadas {len(targets)} hojas desde Google Sheets hacia el almacenamiento local.")
+            return len(targets)
+
+    def last_pull(self) -> Optional[float]:
+        value = self.store.get_meta("last_pull")
+        return float(value) if value is not None else None
+
+    def sync(self, pull_interval: Optional[float] = None) -> tuple:
+        """
+        Push del outbox y, si venció el intervalo, pull de las ediciones manuales.
+        Devuelve (operaciones replicadas, hojas sincronizadas).
+        """
+        pushed = self.push()
+        last = self.last_pull()
+        if pull_interval is None or last is None or self.clock() - last >= pull_interval:
+            return pushed, self.pull()
+        return pushed, 0
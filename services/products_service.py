@@ -4,16 +4,24 @@ Product data management: caching, querying categories/variants, stock updates,
 and TiendaNube synchronization.
 """
 import logging
-from datetime import datetime
-from typing import Optional, List, Dict, Any, Tuple
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from itertools import combinations, chain, islice
+from typing import Optional, List, Dict, Any, Tuple, Iterable, Iterator
 
-from config import PRODUCTOS_SHEET_NAME, PRODUCTOS_HEADERS
+from gspread.utils import rowcol_to_a1, ValueRenderOption
+
+from config import PRODUCTOS_SHEET_NAME, PRODUCTOS_HEADERS, CACHE_DIR, TIENDANUBE_FULL_SYNC_INTERVAL_SECONDS
 from common.utils import normalize_text, parse_float
-from services.tiendanube_service import update_tiendanube_stock
+from services.snapshot_store import LocalFileSnapshotStore
+from services.tiendanube_service import (
+    update_tiendanube_stock, iter_tiendanube_products, get_tiendanube_products_updated_since
+)
 from services.sheets_connection import (
     is_connected,
     _get_or_create_worksheet, apply_table_formatting,
-    get_value_from_dict_insensitive
+    HeaderIndex
 )
 
 logger = logging.getLogger(__name__)
@@ -21,12 +29,142 @@ logger = logging.getLogger(__name__)
 # --- Product cache ---
 products_cache: Dict[str, Any] = {'data': None, 'timestamp': None}
 CACHE_TTL_SECONDS = 60
+OPTION_LEVELS = (1, 2, 3)
+
+# --- Incremental TiendaNube sync state (watermark for updated_at_min) ---
+products_snapshot_store = LocalFileSnapshotStore(CACHE_DIR)
+SYNC_STATE_KEY = "tiendanube_sync"
+# Filas por escritura al volcar el catálogo en streaming (append_rows / batch_update)
+PRODUCTS_WRITE_CHUNK_ROWS = 1000
+
+
+class ProductCatalog:
+    """
+    In-memory index over the cached Productos records, built once per cache refresh:
+    category -> products, and (product, option selections) -> matching variants for
+    every combination of Opción 1/2/3 values. Each step of the sale flow becomes a
+    dict lookup instead of a full scan with per-row text normalization. Groups hold
+    the cached record dicts themselves, so patching a record in place (see
+    patch_cached_stock) is visible through every index.
+    """
+    __slots__ = ("records", "categories", "products_by_category", "by_row", "_index", "_groups", "_options",
+                 "_level_by_header")
+
+    def __init__(self, records: List[Dict[str, Any]]):
+        self.records = records
+        self._index = HeaderIndex.from_records(records)
+        self._level_by_header = {normalize_text(f"Opción {level}: Valor"): level for level in OPTION_LEVELS}
+        self._options: Dict[Tuple, Tuple[str, List[str]]] = {}
+        category_key, product_key = self._index.key("Categoría"), self._index.key("Producto")
+        value_keys = {level: self._index.key(f"Opción {level}: Valor") for level in OPTION_LEVELS}
+        categories = set()
+        products_by_category = defaultdict(set)
+        groups = defaultdict(list)
+        self.by_row = {record['row_number']: record for record in records if 'row_number' in record}
+        for record in records:
+            category_value = record.get(category_key)
+            product_name = record.get(product_key)
+            if category_value is not None:
+                category_str = str(category_value).strip()
+                if category_str:
+                    categories.add(category_str)
+                if product_name and str(product_name).strip():
+                    products_by_category[normalize_text(str(category_value))].add(str(product_name).strip())
+            product_norm = normalize_text(str(product_name or ''))
+            pairs = [(level, normalize_text(str(record.get(value_keys[level]) or ''))) for level in OPTION_LEVELS]
+            for size in range(len(pairs) + 1):
+                for subset in combinations(pairs, size):
+                    groups[(product_norm, frozenset(subset))].append(record)
+        self.categories = sorted(categories)
+        self.products_by_category = {c: sorted(names) for c, names in products_by_category.items()}
+        self._groups = dict(groups)
+
+    def _select(self, product_name: str, selections: Optional[Dict[str, str]]) -> Tuple[Optional[Tuple], List[Dict[str, Any]]]:
+        """Returns the group key (None if not cacheable) and the variants matching the selections."""
+        pairs, extra = [], []
+        for key, value in (selections or {}).items():
+            level = self._level_by_header.get(normalize_text(key))
+            if level is not None:
+                pairs.append((level, normalize_text(value)))
+            else:
+                extra.append((self._index.key(key), normalize_text(value)))
+        group_key = (normalize_text(product_name), frozenset(pairs))
+        variants = self._groups.get(group_key, [])
+        if not extra:
+            return group_key, variants
+        # Selections on columns other than Opción N: Valor fall back to filtering the product's variants.
+        filtered = [r for r in variants if all(normalize_text(str(r.get(k) or '')) == v for k, v in extra)]
+        return None, filtered
+
+    def options(self, product_name: str, option_number: int, prior_selections: Optional[Dict[str, str]]) -> Tuple[str, List[str]]:
+        group_key, variants = self._select(product_name, prior_selections)
+        cache_key = (group_key, option_number)
+        if group_key is not None and cache_key in self._options:
+            option_name, values = self._options[cache_key]
+            return option_name, list(values)
+        name_key = self._index.key(f"Opción {option_number}: Nombre")
+        value_key = self._index.key(f"Opción {option_number}: Valor")
+        option_name = ""
+        available_values = set()
+        for variant in variants:
+            current_option_name = str(variant.get(name_key) or '').strip()
+            current_option_value = str(variant.get(value_key) or '').strip()
+            if current_option_name and not option_name:
+                option_name = current_option_name
+            if current_option_value:
+                available_values.add(current_option_value)
+        values = sorted(available_values)
+        if group_key is not None:
+            self._options[cache_key] = (option_name, values)
+        return option_name, list(values)
+
+    def variant(self, product_name: str, selections: Dict[str, str]) -> Optional[Dict[str, Any]]:
+        _, variants = self._select(product_name, selections)
+        return _build_variant_details(variants[0], self._index) if variants else None
+
+
+_catalog: Optional[ProductCatalog] = None
 
 
 def invalidate_products_cache() -> None:
     """Clears the in-memory product cache (in-place to preserve references)."""
+    global _catalog
     logger.info("Invalidando caché de productos.")
     products_cache.update({'data': None, 'timestamp': None})
+    _catalog = None
+
+
+def patch_cached_stock(row_number: int, new_stock: int) -> None:
+    """
+    Write-through for a single stock change: updates the Stock of the cached record
+    in place (the catalog indexes share it) instead of dropping the whole cache.
+    The cache timestamp is left alone, so frequent sales never keep the catalog
+    from being refetched once CACHE_TTL_SECONDS expire. Falls back to a full
+    invalidation if the row is not in the cache.
+    """
+    records = products_cache['data']
+    if records is None:
+        return
+    catalog = _catalog if _catalog is not None and _catalog.records is records else ProductCatalog(records)
+    record = catalog.by_row.get(row_number)
+    stock_key = catalog._index.key("Stock")
+    if record is None or stock_key is None:
+        logger.info(f"Fila {row_number} no está en la caché de productos; se invalida completa.")
+        invalidate_products_cache()
+        return
+    record[stock_key] = new_stock
+    logger.info(f"Caché de productos actualizada en sitio: fila {row_number} con stock {new_stock}.")
+
+
+def _get_catalog() -> Optional[ProductCatalog]:
+    """Returns the catalog index for the current cached records, rebuilding it only when they change."""
+    global _catalog
+    all_products = get_all_products_data_cached()
+    if not all_products:
+        return None
+    if _catalog is None or _catalog.records is not all_products:
+        _catalog = ProductCatalog(all_products)
+    return _catalog
 
 
 def get_product_sheet():
@@ -36,6 +174,7 @@ def get_product_sheet():
 
 def get_all_products_data_cached() -> List[Dict[str, Any]]:
     """Returns all product records, using an in-memory cache with TTL."""
+    global _catalog
     now = datetime.now()
     if products_cache['data'] is not None and products_cache['timestamp']:
         if (now - products_cache['timestamp']).total_seconds() < CACHE_TTL_SECONDS:
@@ -55,111 +194,70 @@ def get_all_products_data_cached() -> List[Dict[str, Any]]:
             record['row_number'] = i + 2
         products_cache['data'] = all_records
         products_cache['timestamp'] = now
+        _catalog = ProductCatalog(all_records)
         return all_records
     except Exception as e:
-        logger.error(f"Error obteniendo todos los datos de productos de la hoja", exc_info=True)
+        logger.error("Error obteniendo todos los datos de productos de la hoja", exc_info=True)
         return []
 
 
 def get_product_categories() -> list[str]:
     """Returns a sorted list of unique product categories."""
-    all_products = get_all_products_data_cached()
-    if not all_products:
+    catalog = _get_catalog()
+    if catalog is None:
         return []
-    seen_categories = set()
-    for product in all_products:
-        category_value = get_value_from_dict_insensitive(product, "Categoría")
-        if category_value is not None:
-            category_str = str(category_value).strip()
-            if category_str:
-                seen_categories.add(category_str)
-    logger.info(f"Categorías únicas procesadas: {seen_categories}")
-    return sorted(list(seen_categories))
+    logger.info(f"Categorías únicas procesadas: {catalog.categories}")
+    return list(catalog.categories)
 
 
 def get_products_by_category(selected_category: str) -> list[str]:
     """Returns a sorted list of product names for a given category."""
-    all_products = get_all_products_data_cached()
-    if not all_products:
+    catalog = _get_catalog()
+    if catalog is None:
         return []
-    normalized_selected_category = normalize_text(selected_category)
-    products_in_category = set()
-    for product in all_products:
-        category_value = get_value_from_dict_insensitive(product, "Categoría")
-        if category_value is not None and normalize_text(str(category_value)) == normalized_selected_category:
-            product_name = get_value_from_dict_insensitive(product, "Producto")
-            if product_name and str(product_name).strip():
-                products_in_category.add(str(product_name).strip())
-    return sorted(list(products_in_category))
+    return list(catalog.products_by_category.get(normalize_text(selected_category), []))
 
 
 def get_product_options(product_name: str, option_number: int, prior_selections: Dict[str, str] = None) -> Tuple[str, List[str]]:
     """Returns the option name and available values for a given product and option level."""
-    all_products = get_all_products_data_cached()
-    if not all_products:
+    catalog = _get_catalog()
+    if catalog is None:
         return "", []
-    normalized_product_name = normalize_text(product_name)
-    option_name_header = f"Opción {option_number}: Nombre"
-    option_value_header = f"Opción {option_number}: Valor"
-    option_name = ""
-    available_values = set()
-    for product in all_products:
-        if normalize_text(str(get_value_from_dict_insensitive(product, "Producto") or '')) != normalized_product_name:
-            continue
-        match = True
-        if prior_selections:
-            for key, value in prior_selections.items():
-                if normalize_text(str(get_value_from_dict_insensitive(product, key) or '')) != normalize_text(value):
-                    match = False
-                    break
-        if match:
-            current_option_name = str(get_value_from_dict_insensitive(product, option_name_header) or '').strip()
-            current_option_value = str(get_value_from_dict_insensitive(product, option_value_header) or '').strip()
-            if current_option_name and not option_name:
-                option_name = current_option_name
-            if current_option_value:
-                available_values.add(current_option_value)
-    return option_name, sorted(list(available_values))
+    return catalog.options(product_name, option_number, prior_selections)
+
+
+def _build_variant_details(record: Dict[str, Any], index: HeaderIndex) -> Dict[str, Any]:
+    """Builds the clean variant dict (typed prices and stock) from a raw product record."""
+    return {
+        'Producto': index.get(record, 'Producto'),
+        'ID Producto': index.get(record, 'ID Producto'),
+        'ID Variante': index.get(record, 'ID Variante'),
+        'Categoría': index.get(record, 'Categoría'),
+        'Opción 1: Valor': index.get(record, 'Opción 1: Valor'),
+        'Opción 2: Valor': index.get(record, 'Opción 2: Valor'),
+        'Opción 3: Valor': index.get(record, 'Opción 3: Valor'),
+        'Precio Final': parse_float(str(index.get(record, 'Precio Final') or '0')),
+        'Precio Unitario': parse_float(str(index.get(record, 'Precio Unitario') or '0')),
+        '%': parse_float(str(index.get(record, '%') or '0')),
+        'Descuento': parse_float(str(index.get(record, 'Descuento') or '0')),
+        'Stock': int(parse_float(str(index.get(record, 'Stock') or '0'))),
+        'row_number': record['row_number']
+    }
 
 
 def get_variant_details(product_name: str, selections: Dict[str, str]) -> Optional[Dict[str, Any]]:
     """Finds and returns the full details of a specific product variant."""
-    all_products = get_all_products_data_cached()
-    if not all_products:
+    catalog = _get_catalog()
+    if catalog is None:
         return None
-    normalized_product_name = normalize_text(product_name)
-    normalized_selections = {key: normalize_text(value) for key, value in selections.items()}
-    for record in all_products:
-        if normalize_text(str(get_value_from_dict_insensitive(record, "Producto") or '')) != normalized_product_name:
-            continue
-        match = True
-        for key, value in normalized_selections.items():
-            if normalize_text(str(get_value_from_dict_insensitive(record, key) or '')) != value:
-                match = False
-                break
-        if match:
-            clean_record = {
-                'Producto': get_value_from_dict_insensitive(record, 'Producto'),
-                'ID Producto': get_value_from_dict_insensitive(record, 'ID Producto'),
-                'ID Variante': get_value_from_dict_insensitive(record, 'ID Variante'),
-                'Categoría': get_value_from_dict_insensitive(record, 'Categoría'),
-                'Opción 1: Valor': get_value_from_dict_insensitive(record, 'Opción 1: Valor'),
-                'Opción 2: Valor': get_value_from_dict_insensitive(record, 'Opción 2: Valor'),
-                'Opción 3: Valor': get_value_from_dict_insensitive(record, 'Opción 3: Valor'),
-                'Precio Final': parse_float(str(get_value_from_dict_insensitive(record, 'Precio Final') or '0')),
-                'Precio Unitario': parse_float(str(get_value_from_dict_insensitive(record, 'Precio Unitario') or '0')),
-                '%': parse_float(str(get_value_from_dict_insensitive(record, '%') or '0')),
-                'Descuento': parse_float(str(get_value_from_dict_insensitive(record, 'Descuento') or '0')),
-                'Stock': int(parse_float(str(get_value_from_dict_insensitive(record, 'Stock') or '0'))),
-                'row_number': record['row_number']
-            }
-            return clean_record
-    logger.warning(f"Variante no encontrada para '{product_name}' con selecciones {selections}")
-    return None
+    variant = catalog.variant(product_name, selections)
+    if variant is None:
+        logger.warning(f"Variante no encontrada para '{product_name}' con selecciones {selections}")
+    return variant
 
 
 def update_product_stock(row_number: int, new_stock: int) -> bool:
-    """Updates the stock value for a specific product row in the sheet."""
+    """Updates the stock value for a specific product row in the sheet and patches the cache to match."""
     product_sheet = get_product_sheet()
     if not product_sheet:
         logger.error("No se pudo acceder a la hoja de productos para actualizar el stock.")
@@ -168,14 +266,34 @@ def update_product_stock(row_number: int, new_stock: int) -> bool:
         stock_col_index = PRODUCTOS_HEADERS.index("Stock") + 1
         product_sheet.update_cell(row_number, stock_col_index, new_stock)
         logger.info(f"Stock actualizado en la fila {row_number} a {new_stock}.")
+        patch_cached_stock(row_number, new_stock)
         return True
     except (ValueError, IndexError, Exception) as e:
         logger.error(f"Error al actualizar el stock en la fila {row_number}", exc_info=True)
         return False
 
 
-def update_products_from_tiendanube(products_data: list) -> tuple[bool, str]:
-    """Replaces all product data in the sheet with fresh data from TiendaNube."""
+def _chunks(rows: Iterable[List[Any]], size: int) -> Iterator[List[List[Any]]]:
+    """Agrupa un flujo de filas en listas de hasta `size` filas."""
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def update_products_from_tiendanube(products_data: Iterable[List[Any]]) -> tuple[bool, str]:
+    """
+    Replaces all product data in the sheet with fresh data from TiendaNube.
+    `products_data` may be a list or a stream (iter_tiendanube_products): rows are
+    appended in chunks of PRODUCTS_WRITE_CHUNK_ROWS as they arrive. The sheet is
+    cleared only once the first chunk is in hand, so a TiendaNube outage on the first
+    page leaves it untouched; a failure further in leaves a partial sheet. That is
+    why it is only the fallback of apply_product_changes for an empty sheet or one
+    with other headers: syncs over existing data (including /sync_products) go
+    through the diff, which never clears.
+    """
     if not is_connected():
         msg = "No hay conexión a Google Sheets para actualizar productos."
         return False, msg
@@ -183,19 +301,209 @@ def update_products_from_tiendanube(products_data: list) -> tuple[bool, str]:
     if not product_sheet:
         msg = f"No se pudo acceder o crear la hoja '{PRODUCTOS_SHEET_NAME}'."
         return False, msg
+    chunks = _chunks(products_data, PRODUCTS_WRITE_CHUNK_ROWS)
+    first_chunk = next(chunks, [])
     try:
         logger.info(f"Actualizando la hoja '{PRODUCTOS_SHEET_NAME}'...")
         product_sheet.clear()
         product_sheet.append_row(PRODUCTOS_HEADERS, value_input_option='USER_ENTERED')
-        if products_data:
-            product_sheet.append_rows(products_data, value_input_option='USER_ENTERED')
-            msg = f"Hoja '{PRODUCTOS_SHEET_NAME}' actualizada con {len(products_data)} variantes."
+        written = 0
+        if first_chunk:
+            for chunk in chain([first_chunk], chunks):
+                product_sheet.append_rows(chunk, value_input_option='USER_ENTERED')
+                written += len(chunk)
+            msg = f"Hoja '{PRODUCTOS_SHEET_NAME}' actualizada con {written} variantes."
         else:
             msg = "No hay productos de TiendaNube para añadir a la hoja."
         apply_table_formatting(product_sheet, len(PRODUCTOS_HEADERS))
         invalidate_products_cache()
         return True, msg
+    except ConnectionError:
+        invalidate_products_cache()
+        raise
     except Exception as e:
-        msg = f"Error inesperado al actualizar la hoja de productos"
+        invalidate_products_cache()
+        msg = "Error inesperado al actualizar la hoja de productos"
         logger.error(msg, exc_info=True)
         return False, f"{msg}: {e}"
+
+
+def _write_rows(product_sheet, writes: Dict[int, List[Any]]) -> None:
+    """Escribe filas completas de Productos (número de fila -> valores) en un solo batch_update."""
+    width = len(PRODUCTOS_HEADERS)
+    product_sheet.batch_update(
+        [{"range": f"{rowcol_to_a1(r, 1)}:{rowcol_to_a1(r, width)}", "values": [values]}
+         for r, values in sorted(writes.items())],
+        value_input_option='USER_ENTERED',
+    )
+
+
+def _same_cell(current: Any, new: Any) -> bool:
+    """Compares a Sheets cell with the value TiendaNube would write, ignoring number formatting."""
+    if str(current).strip() == str(new).strip():
+        return True
+    current_num, new_num = parse_float(str(current)), parse_float(str(new))
+    return current_num is not None and new_num is not None and round(current_num, 2) == round(new_num, 2)
+
+
+class _ProductSheetDiff:
+    """
+    Estado de un apply_product_changes: la hoja actual indexada por ID Variante
+    y los cambios (escrituras, altas, bajas) que le aplica el catálogo de TiendaNube.
+    """
+
+    def __init__(self, current: List[List[Any]]):
+        self.width = len(PRODUCTOS_HEADERS)
+        self.product_col = PRODUCTOS_HEADERS.index("ID Producto")
+        self.variant_col = PRODUCTOS_HEADERS.index("ID Variante")
+        self.final_rows: Dict[int, List[Any]] = {}
+        self.row_of_variant: Dict[str, int] = {}
+        for row_number, values in enumerate(current[1:], start=2):
+            self.final_rows[row_number] = values = (list(values) + [""] * self.width)[:self.width]
+            variant_id = str(values[self.variant_col]).strip()
+            if variant_id:
+                self.row_of_variant.setdefault(variant_id, row_number)
+        self.writes: Dict[int, List[Any]] = {}
+        self.inserts: List[List[Any]] = []
+        self.seen: set = set()
+        self.updated = 0
+        self.flushed = False
+
+    def consume(self, product_sheet, rows: Iterable[List[Any]]) -> None:
+        """Compara el flujo de filas con la hoja; escribe los cambios cada PRODUCTS_WRITE_CHUNK_ROWS."""
+        for chunk in _chunks(rows, PRODUCTS_WRITE_CHUNK_ROWS):
+            for new_values in chunk:
+                variant_id = str(new_values[self.variant_col]).strip()
+                if variant_id in self.seen:
+                    continue
+                self.seen.add(variant_id)
+                row_number = self.row_of_variant.get(variant_id)
+                if row_number is None:
+                    self.inserts.append(list(new_values))
+                elif not all(_same_cell(a, b) for a, b in zip(self.final_rows[row_number], new_values)):
+                    self.writes[row_number] = self.final_rows[row_number] = list(new_values)
+                    self.updated += 1
+            if len(self.writes) >= PRODUCTS_WRITE_CHUNK_ROWS:
+                _write_rows(product_sheet, self.writes)
+                self.writes, self.flushed = {}, True
+
+    def holes(self, scope: Optional[set]) -> List[int]:
+        """Filas cuya variante ya no está en el catálogo (dentro de `scope`, si se limita)."""
+        return [
+            r for r, values in self.final_rows.items()
+            if (variant_id := str(values[self.variant_col]).strip())
+            and not (self.row_of_variant[variant_id] == r and variant_id in self.seen)
+            and (scope is None or str(values[self.product_col]).strip() in scope)
+        ]
+
+    def fill_and_compact(self, holes: List[int]) -> Tuple[List[List[Any]], List[int], int]:
+        """
+        Reutiliza las filas borradas para las altas y sube filas del final a los
+        huecos que sobran. Devuelve (altas a agregar al final, huecos que quedan,
+        primera fila a recortar).
+        """
+        filled = min(len(holes), len(self.inserts))
+        for hole, row in zip(holes[:filled], self.inserts[:filled]):
+            self.writes[hole] = self.final_rows[hole] = row
+        inserts, remaining_holes = self.inserts[filled:], holes[filled:]
+        last_row = len(self.final_rows) + 1
+        trim_from = last_row - len(remaining_holes) + 1
+        if remaining_holes:
+            hole_set = set(remaining_holes)
+            movers = [r for r in range(trim_from, last_row + 1) if r not in hole_set]
+            targets = [h for h in remaining_holes if h < trim_from]
+            for target, mover in zip(targets, movers):
+                self.writes[target] = self.final_rows[mover]
+                self.writes.pop(mover, None)
+        return inserts, remaining_holes, trim_from
+
+    def write(self, product_sheet, inserts: List[List[Any]], remaining_holes: List[int], trim_from: int) -> bool:
+        """Escribe filas, recorta el final o agrega altas. True si la hoja cambió."""
+        if self.writes:
+            _write_rows(product_sheet, self.writes)
+        if remaining_holes:
+            product_sheet.delete_rows(trim_from, len(self.final_rows) + 1)
+        elif inserts:
+            product_sheet.append_rows(inserts, value_input_option='USER_ENTERED')
+        return bool(self.flushed or self.writes or remaining_holes or inserts)
+
+
+def apply_product_changes(rows: Iterable[List[Any]], changed_product_ids: Optional[Iterable[Any]] = None) -> tuple[bool, str]:
+    """
+    Applies TiendaNube rows to Productos as a diff keyed by ID Variante instead of
+    clear() + rewrite. `rows` may be a stream: it is consumed in chunks and changed
+    rows are flushed every PRODUCTS_WRITE_CHUNK_ROWS, so only the current sheet and
+    the pending writes stay in memory. `changed_product_ids` limits deletions to
+    those products (incremental sync); None means `rows` is the whole catalog.
+    Deleted rows are reused for inserts, then filled with rows moved up from the
+    end; leftover inserts go in one append_rows and one delete_rows trims the tail.
+    Falls back to the full rewrite when the sheet is empty or its headers differ.
+    """
+    if not is_connected():
+        return False, "No hay conexión a Google Sheets para actualizar productos."
+    product_sheet = get_product_sheet()
+    if not product_sheet:
+        return False, f"No se pudo acceder o crear la hoja '{PRODUCTOS_SHEET_NAME}'."
+    diff = None
+    try:
+        current = product_sheet.get_all_values(value_render_option=ValueRenderOption.unformatted)
+        if not current or [str(h).strip() for h in current[0]] != PRODUCTOS_HEADERS:
+            logger.info("Productos vacía o con otras cabeceras: se hace la reescritura completa.")
+            return update_products_from_tiendanube(rows)
+        diff = _ProductSheetDiff(current)
+        del current
+        scope = None if changed_product_ids is None else {str(pid) for pid in changed_product_ids}
+
+        diff.consume(product_sheet, rows)
+        holes = diff.holes(scope)
+        added = len(diff.inserts)
+        # Las filas borradas se reutilizan para las altas; lo que sobra se compacta hacia arriba
+        if diff.write(product_sheet, *diff.fill_and_compact(holes)):
+            invalidate_products_cache()
+
+        msg = (f"Hoja '{PRODUCTOS_SHEET_NAME}' sincronizada: {added} altas, {diff.updated} modificaciones, "
+               f"{len(holes)} bajas.")
+        logger.info(msg)
+        return True, msg
+    except ConnectionError:
+        if diff is not None and diff.flushed:
+            invalidate_products_cache()
+        raise
+    except Exception as e:
+        if diff is not None and diff.flushed:
+            invalidate_products_cache()
+        msg = "Error inesperado al actualizar la hoja de productos"
+        logger.error(msg, exc_info=True)
+        return False, f"{msg}: {e}"
+
+
+def sync_products_from_tiendanube(full: bool = False) -> tuple[bool, str]:
+    """
+    Syncs Productos from TiendaNube. Incremental by default: only products changed
+    since the last watermark are fetched and diffed. A full pass (every variant,
+    diffed the same way) runs when there is no watermark yet, when `full` is set or
+    every TIENDANUBE_FULL_SYNC_INTERVAL_SECONDS, to catch products deleted in TiendaNube.
+    """
+    state = (products_snapshot_store.load(SYNC_STATE_KEY) or {}).get("data") or {}
+    watermark = state.get("watermark")
+    last_full = state.get("full_sync_at") or 0
+    started_at = datetime.now(timezone.utc).replace(microsecond=0).isoformat()
+    run_full = full or not watermark or time.time() - last_full >= TIENDANUBE_FULL_SYNC_INTERVAL_SECONDS
+
+    if run_full:
+        logger.info("Sincronización completa de productos con TiendaNube.")
+        success, msg = apply_product_changes(iter_tiendanube_products())
+    else:
+        logger.info(f"Sincronización incremental de productos desde {watermark}.")
+        changed_ids, rows = get_tiendanube_products_updated_since(watermark)
+        if not changed_ids:
+            success, msg = True, "Sin cambios en TiendaNube desde la última sincronización."
+        else:
+            success, msg = apply_product_changes(rows, changed_ids)
+
+    if success:
+        products_snapshot_store.save(SYNC_STATE_KEY, 0, {
+            "watermark": started_at,
+            "full_sync_at": time.time() if run_full else last_full,
+        })
+    return success, msg
@@ -1,11 +1,14 @@
 # services/report_generator.py
 import logging
 import os
+import threading
+import unicodedata
+from typing import Optional
 from fpdf import FPDF
 from fpdf.enums import XPos, YPos
 from datetime import datetime
 import io
-import requests
+from PIL import Image, ImageDraw, ImageFont
 from config import BRAND_COLORS
 
 _PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -17,6 +20,27 @@ def hex_to_rgb(hex_color):
     hex_color = hex_color.lstrip('#')
     return tuple(int(hex_color[i:i+2], 16) for i in (0, 2, 4))
 
+
+# Paleta de marca ya convertida a RGB: las tablas la usan por fila.
+BRAND_RGB = {name: hex_to_rgb(color) for name, color in BRAND_COLORS.items()}
+
+_LOGO_PATH = os.path.join(_ASSETS_DIR, 'logo.png')
+_logo_image = None
+_logo_lock = threading.Lock()
+
+
+def _get_logo_image():
+    """Decodifica el logo una sola vez por proceso; fpdf2 acepta la imagen PIL directamente."""
+    global _logo_image
+    if _logo_image is None:
+        with _logo_lock:
+            if _logo_image is None:
+                with Image.open(_LOGO_PATH) as img:
+                    img.load()
+                    _logo_image = img.copy()
+    return _logo_image
+
+
 class PDFReport(FPDF):
     def header(self):
         self.set_font('Helvetica', 'B', 12)
@@ -29,9 +53,9 @@ class PDFReport(FPDF):
         logo_x_position = page_width - logo_width - margin
 
         try:
-            self.image(os.path.join(_ASSETS_DIR, 'logo.png'), x=logo_x_position, y=8, w=logo_width)
+            self.image(_get_logo_image(), x=logo_x_position, y=8, w=logo_width)
         except (FileNotFoundError, EnvironmentError, Exception) as e:
-            logger.error(f"FALLO LOGO: No se cargó el logo. Path buscado: {os.path.join(_ASSETS_DIR, 'logo.png')}. Error: {e}", exc_info=True)
+            logger.error(f"FALLO LOGO: No se cargó el logo. Path buscado: {_LOGO_PATH}. Error: {e}", exc_info=True)
 
         self.ln(5)
 
@@ -41,57 +65,96 @@ class PDFReport(FPDF):
         self.cell(0, 10, f'Página {self.page_no()}',
                   new_x=XPos.RIGHT, new_y=YPos.TOP, align='C')
 
+
+_CHART_FONT_PATH = os.path.join(_ASSETS_DIR, 'chart_font.ttf')
+
+
+def _load_font(size: int):
+    """
+    Usa assets/chart_font.ttf si existe; si no, la fuente escalable embebida en Pillow
+    (sin FreeType cae a la fuente bitmap por defecto).
+    """
+    if os.path.exists(_CHART_FONT_PATH):
+        return ImageFont.truetype(_CHART_FONT_PATH, size)
+    try:
+        return ImageFont.load_default(size=size)
+    except (TypeError, ImportError, OSError):
+        return ImageFont.load_default()
+
+
+def _chart_text(text: str) -> str:
+    """La fuente embebida de Pillow no trae glifos acentuados: se pliegan a ASCII ('Envíos' -> 'Envios')."""
+    if os.path.exists(_CHART_FONT_PATH):
+        return text
+    return unicodedata.normalize('NFKD', text).encode('ascii', 'ignore').decode('ascii')
+
+
+def _format_amount_es(value: float) -> str:
+    """Formato es-AR sin decimales innecesarios: 20000 -> '20.000', 1234.5 -> '1.234,5'."""
+    text = f"{value:,.2f}".rstrip('0').rstrip('.')
+    return text.replace(',', '_').replace('.', ',').replace('_', '.')
+
+
 def _create_bar_chart(
     data: dict, title: str, buffer: io.BytesIO, color_hex: str = '#c0392b',
     width: int = 800, height: int = 500, title_font_size: int = 28,
     label_font_size: int = 18, bar_thickness: int = 32
 ):
+    """Dibuja localmente (Pillow) un gráfico de barras horizontales y lo escribe como PNG en buffer."""
     if not data:
         return
-    sorted_data = dict(sorted(data.items(), key=lambda item: item[1], reverse=True))
-    chart_config = {
-        'type': 'horizontalBar',
-        'data': {
-            'labels': list(sorted_data.keys()),
-            'datasets': [{
-                'data': list(sorted_data.values()),
-                'backgroundColor': color_hex,
-                'barThickness': bar_thickness
-            }]
-        },
-        'options': {
-            'layout': {'padding': {'right': 90}},
-            'legend': {'display': False},
-            'title': {'display': True, 'text': title, 'font': {'size': title_font_size}},
-            'plugins': {
-                'datalabels': {
-                    'anchor': 'end', 'align': 'right', 'offset': 8,
-                    'color': 'black',
-                    'font': {'size': label_font_size, 'weight': 'bold'},
-                    'formatter': "(value) => { return value.toLocaleString('es-AR'); }"
-                }
-            },
-            'scales': {
-                'xAxes': [{'ticks': {'beginAtZero': True, 'font': {'size': label_font_size - 4}}}],
-                'yAxes': [{'ticks': {'font': {'size': label_font_size}}}]
-            }
-        }
-    }
-    try:
-        response = requests.post(
-            'https://quickchart.io/chart',
-            json={'chart': chart_config, 'backgroundColor': 'white', 'width': width, 'height': height},
-            timeout=10
-        )
-        response.raise_for_status()
-        buffer.write(response.content)
-        buffer.seek(0)
-    except requests.exceptions.RequestException as e:
-        logger.error(f"Error al contactar QuickChart.io para el gráfico de barras '{title}': {e}")
-
-
-def generate_balance_pdf(balance_data: dict) -> str:
+    sorted_data = sorted(data.items(), key=lambda item: item[1], reverse=True)
+    title = _chart_text(title)
+    title_font = _load_font(title_font_size)
+    label_font = _load_font(label_font_size)
+    value_font = _load_font(label_font_size)
+
+    image = Image.new('RGB', (width, height), 'white')
+    draw = ImageDraw.Draw(image)
+
+    padding = 20
+    title_box = draw.textbbox((0, 0), title, font=title_font)
+    draw.text(((width - (title_box[2] - title_box[0])) / 2, padding), title, fill='black', font=title_font)
+    plot_top = padding + (title_box[3] - title_box[1]) + 2 * padding
+    plot_bottom = height - padding
+
+    labels = [_chart_text(str(label)) for label, _ in sorted_data]
+    value_texts = [_format_amount_es(value) for _, value in sorted_data]
+    label_width = max(draw.textlength(label, font=label_font) for label in labels)
+    value_width = max(draw.textlength(text, font=value_font) for text in value_texts)
+    plot_left = padding + label_width + 12
+    plot_right = width - padding - value_width - 8
+    max_value = max((value for _, value in sorted_data), default=0) or 1
+
+    row_height = (plot_bottom - plot_top) / len(sorted_data)
+    thickness = min(bar_thickness, row_height * 0.8)
+    bar_color = hex_to_rgb(color_hex)
+    for i, ((_, value), label, value_text) in enumerate(zip(sorted_data, labels, value_texts)):
+        center_y = plot_top + row_height * (i + 0.5)
+        bar_end = plot_left + max(value, 0) / max_value * (plot_right - plot_left)
+        draw.rectangle([plot_left, center_y - thickness / 2, bar_end, center_y + thickness / 2], fill=bar_color)
+        draw.text((plot_left - 12, center_y), label, fill='black', font=label_font, anchor='rm')
+        draw.text((bar_end + 8, center_y), value_text, fill='black', font=value_font, anchor='lm')
+    draw.line([plot_left, plot_top, plot_left, plot_bottom], fill=(150, 150, 150), width=2)
+
+    image.save(buffer, format='PNG')
+    buffer.seek(0)
+
+
+def _pdf_buffer(content: bytes, filename: str) -> io.BytesIO:
+    buffer = io.BytesIO(content)
+    buffer.name = filename
+    return buffer
+
+
+def generate_balance_pdf(balance_data: dict) -> Optional[io.BytesIO]:
+    """
+    Genera el reporte en memoria y devuelve un BytesIO listo para send_document
+    (buffer.name trae el nombre de archivo). No toca /tmp, así que dos reportes
+    del mismo mes pueden generarse a la vez.
+    """
     try:
+        filename = f"Balance_{balance_data.get('month_name', 'N/A')}_{balance_data.get('year', 'N/A')}.pdf"
         pdf = PDFReport()
         pdf.add_page()
 
@@ -100,17 +163,17 @@ def generate_balance_pdf(balance_data: dict) -> str:
 
         # --- Título ---
         pdf.set_font('Helvetica', 'B', 22)
-        pdf.set_text_color(*hex_to_rgb(BRAND_COLORS['primary_dark']))
+        pdf.set_text_color(*BRAND_RGB['primary_dark'])
         pdf.cell(0, 10, f"Balance para {month_name} {year}",
                  new_x=XPos.LMARGIN, new_y=YPos.NEXT, align='L')
         pdf.set_font('Helvetica', '', 11)
-        pdf.set_text_color(*hex_to_rgb(BRAND_COLORS['text_gray']))
+        pdf.set_text_color(*BRAND_RGB['text_gray'])
         pdf.cell(0, 5, f"Generado el: {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}",
                  new_x=XPos.LMARGIN, new_y=YPos.NEXT, align='L')
         pdf.ln(10)
 
         pdf.set_font('Helvetica', 'B', 14)
-        pdf.set_text_color(*hex_to_rgb(BRAND_COLORS['primary_dark']))
+        pdf.set_text_color(*BRAND_RGB['primary_dark'])
         pdf.cell(0, 10, "Resumen General",
                  new_x=XPos.LMARGIN, new_y=YPos.NEXT, align='L')
 
@@ -123,7 +186,7 @@ def generate_balance_pdf(balance_data: dict) -> str:
             "SALDO NETO": balance_data.get("saldo_neto", 0)
         }
 
-        pdf.set_fill_color(*hex_to_rgb(BRAND_COLORS['light_gray']))
+        pdf.set_fill_color(*BRAND_RGB['light_gray'])
         for label, value in summary_items.items():
             pdf.set_font('Helvetica', '', 10)
             pdf.set_text_color(0, 0, 0)
@@ -157,12 +220,12 @@ def generate_balance_pdf(balance_data: dict) -> str:
             if not data: return
             pdf.add_page()
             pdf.set_font('Helvetica', 'B', 16)
-            pdf.set_text_color(*hex_to_rgb(BRAND_COLORS['primary_dark']))
+            pdf.set_text_color(*BRAND_RGB['primary_dark'])
             pdf.cell(0, 10, title,
                      new_x=XPos.LMARGIN, new_y=YPos.NEXT, align='L')
 
             pdf.set_font('Helvetica', 'B', 10)
-            pdf.set_fill_color(*hex_to_rgb(BRAND_COLORS['primary_dark']))
+            pdf.set_fill_color(*BRAND_RGB['primary_dark'])
             pdf.set_text_color(255, 255, 255)
             pdf.cell(130, 8, "Categoría", border=1,
                      new_x=XPos.RIGHT, new_y=YPos.TOP, align='C', fill=True)
@@ -172,8 +235,8 @@ def generate_balance_pdf(balance_data: dict) -> str:
             pdf.set_font('Helvetica', '', 10)
             pdf.set_text_color(0, 0, 0)
             fill = False
+            pdf.set_fill_color(*BRAND_RGB['light_gray'])
             for category, total in sorted(data.items()):
-                pdf.set_fill_color(*hex_to_rgb(BRAND_COLORS['light_gray']))
                 pdf.cell(130, 8, f"      {category}", border=1,
                          new_x=XPos.RIGHT, new_y=YPos.TOP, align='L', fill=fill)
                 pdf.cell(60, 8, f"${total:,.2f}", border=1,
@@ -188,12 +251,12 @@ def generate_balance_pdf(balance_data: dict) -> str:
         if wholesale_details_list:
             pdf.add_page()
             pdf.set_font('Helvetica', 'B', 16)
-            pdf.set_text_color(*hex_to_rgb(BRAND_COLORS['primary_dark']))
+            pdf.set_text_color(*BRAND_RGB['primary_dark'])
             pdf.cell(0, 10, "Detalle de Mayoristas (Operaciones)",
                      new_x=XPos.LMARGIN, new_y=YPos.NEXT, align='L')
 
             pdf.set_font('Helvetica', 'B', 10)
-            pdf.set_fill_color(*hex_to_rgb(BRAND_COLORS['primary_dark']))
+            pdf.set_fill_color(*BRAND_RGB['primary_dark'])
             pdf.set_text_color(255, 255, 255)
 
             # Anchos de columna: Mayorista (40), Producto (60), Cantidad (30), Monto (60) = 190 total
@@ -213,9 +276,8 @@ def generate_balance_pdf(balance_data: dict) -> str:
             # Ordenar por nombre de cliente para agrupar visualmente
             sorted_details = sorted(wholesale_details_list, key=lambda x: x['client'])
 
+            pdf.set_fill_color(*BRAND_RGB['light_gray'])
             for item in sorted_details:
-                pdf.set_fill_color(*hex_to_rgb(BRAND_COLORS['light_gray']))
-
                 # Truncar textos largos
                 client_text = (item['client'][:18] + '..') if len(item['client']) > 20 else item['client']
                 product_text = (item['product'][:28] + '..') if len(item['product']) > 30 else item['product']
@@ -234,12 +296,12 @@ def generate_balance_pdf(balance_data: dict) -> str:
             # Fallback para compatibilidad si no hay detalles
             pdf.add_page()
             pdf.set_font('Helvetica', 'B', 16)
-            pdf.set_text_color(*hex_to_rgb(BRAND_COLORS['primary_dark']))
+            pdf.set_text_color(*BRAND_RGB['primary_dark'])
             pdf.cell(0, 10, "Detalle de Mayoristas (Resumen)",
                      new_x=XPos.LMARGIN, new_y=YPos.NEXT, align='L')
 
             pdf.set_font('Helvetica', 'B', 10)
-            pdf.set_fill_color(*hex_to_rgb(BRAND_COLORS['primary_dark']))
+            pdf.set_fill_color(*BRAND_RGB['primary_dark'])
             pdf.set_text_color(255, 255, 255)
             pdf.cell(100, 8, "Mayorista", border=1,
                      new_x=XPos.RIGHT, new_y=YPos.TOP, align='C', fill=True)
@@ -251,8 +313,8 @@ def generate_balance_pdf(balance_data: dict) -> str:
             pdf.set_font('Helvetica', '', 10)
             pdf.set_text_color(0, 0, 0)
             fill = False
+            pdf.set_fill_color(*BRAND_RGB['light_gray'])
             for client, data in sorted(wholesale_by_client.items()):
-                pdf.set_fill_color(*hex_to_rgb(BRAND_COLORS['light_gray']))
                 pdf.cell(100, 8, f"      {client}", border=1,
                          new_x=XPos.RIGHT, new_y=YPos.TOP, align='L', fill=fill)
                 pdf.cell(30, 8, str(data.get("quantity", 0)), border=1,
@@ -263,9 +325,7 @@ def generate_balance_pdf(balance_data: dict) -> str:
         create_detail_table("Detalle de Gastos PG", balance_data.get("gastos_pg_summary", {}).get("by_category", {}))
         create_detail_table("Detalle de Gastos Personales", balance_data.get("gastos_personales_summary", {}).get("by_category", {}))
 
-        pdf_file_path = f"/tmp/Balance_{month_name}_{year}.pdf"
-        pdf.output(pdf_file_path)
-        return pdf_file_path
+        return _pdf_buffer(bytes(pdf.output()), filename)
 
     except Exception as e:
         logger.error(f"Error generando el reporte PDF: {e}", exc_info=True)
@@ -0,0 +1,165 @@
+# services/request_scheduler.py
+"""
+Quota-aware scheduling for every Google Sheets API request.
+
+All gspread traffic goes through QuotaAwareHTTPClient (installed by
+connect_globally_to_sheets). Each request first takes a token from a
+per-minute bucket sized to the Sheets quota; 429/408/5xx responses are
+retried with jittered exponential backoff. POST requests (values:append,
+batchUpdate) are not idempotent, so they are only retried when Sheets
+rejected them for rate limiting (429 or 403 usageLimits) and never on a
+timeout or 5xx, which may have been applied. Interactive (Telegram) traffic
+can drain the whole bucket, while background jobs wrapped in
+background_priority() leave a reserve for it.
+
+The bucket lives in process memory: each Lambda container paces only its
+own requests. background_priority() therefore keeps a reserve for the
+interactive traffic of the same container, not for the bot running in a
+different Lambda; across containers the Sheets quota is shared and enforced
+only by Google's 429s and the backoff above.
+"""
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from http import HTTPStatus
+from typing import Any, Callable
+
+from gspread.exceptions import APIError
+from gspread.http_client import HTTPClient
+
+from config import SHEETS_REQUESTS_PER_MINUTE, SHEETS_BACKGROUND_RESERVE, SHEETS_MAX_RETRIES
+from common.tracing import current_span, record_call, sheets_operation
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_INTERACTIVE = "interactive"
+PRIORITY_BACKGROUND = "background"
+
+BACKOFF_BASE_SECONDS = 1.0
+BACKOFF_MAX_SECONDS = 32.0
+
+# Métodos que se pueden repetir sin riesgo de duplicar filas
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+
+_request_priority: ContextVar[str] = ContextVar("sheets_request_priority", default=PRIORITY_INTERACTIVE)
+
+
+class TokenBucket:
+    """
+    Token bucket refilled continuously at rate_per_minute / 60 tokens per second.
+    Background requests only take a token while more than `background_reserve`
+    (fraction of capacity) remains, so interactive requests never queue behind them.
+    """
+
+    def __init__(self, rate_per_minute: int, background_reserve: float = 0.0,
+                 clock: Callable[[], float] = time.monotonic, sleep: Callable[[float], Any] = time.sleep):
+        self.capacity = float(max(rate_per_minute, 1))
+        self.refill_per_second = self.capacity / 60.0
+        self.reserve = self.capacity * min(max(background_reserve, 0.0), 0.9)
+        self.tokens = self.capacity
+        self._clock = clock
+        self._sleep = sleep
+        self._updated_at = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated_at) * self.refill_per_second)
+        self._updated_at = now
+
+    def acquire(self, priority: str = PRIORITY_INTERACTIVE) -> float:
+        """Blocks until a token is available for the given priority. Returns the seconds waited."""
+        floor = self.reserve if priority == PRIORITY_BACKGROUND else 0.0
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill()
+                if self.tokens >= floor + 1:
+                    self.tokens -= 1
+                    return waited
+                wait = (floor + 1 - self.tokens) / self.refill_per_second
+            self._sleep(wait)
+            waited += wait
+
+
+sheets_request_bucket = TokenBucket(SHEETS_REQUESTS_PER_MINUTE, SHEETS_BACKGROUND_RESERVE)
+
+
+def current_priority() -> str:
+    return _request_priority.get()
+
+
+@contextmanager
+def background_priority():
+    """Marks every Sheets request made inside the block as background traffic."""
+    token = _request_priority.set(PRIORITY_BACKGROUND)
+    try:
+        yield
+    finally:
+        _request_priority.reset(token)
+
+
+def is_rate_limit_error(error: APIError) -> bool:
+    """429, or 403 usageLimits (how Drive reports quota exhaustion): the request was rejected, not applied."""
+    code = error.code
+    if code == HTTPStatus.TOO_MANY_REQUESTS:
+        return True
+    details = error.error if isinstance(error.error, dict) else {}
+    errors = details.get("errors") or []
+    return code == HTTPStatus.FORBIDDEN and bool(errors) and errors[0].get("domain") == "usageLimits"
+
+
+def is_retryable_error(error: APIError) -> bool:
+    """Rate limits plus 408 and 5xx, which are transient but may have been applied."""
+    code = error.code
+    return (is_rate_limit_error(error) or code == HTTPStatus.REQUEST_TIMEOUT
+            or code >= HTTPStatus.INTERNAL_SERVER_ERROR)
+
+
+def backoff_delay(attempt: int) -> float:
+    """Exponential backoff with jitter: a random delay in [cap/2, cap], cap = base * 2^attempt."""
+    cap = min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * (2 ** attempt))
+    return random.uniform(cap / 2, cap)
+
+
+def _request_method(args: tuple, kwargs: dict) -> str:
+    return args[0] if args else kwargs.get("method", "")
+
+
+class QuotaAwareHTTPClient(HTTPClient):
+    """gspread HTTP client that paces requests through the shared token bucket and retries transient errors."""
+
+    bucket = sheets_request_bucket
+    max_retries = SHEETS_MAX_RETRIES
+    sleep = staticmethod(time.sleep)
+
+    def request(self, *args: Any, **kwargs: Any):
+        if current_span() is None:
+            return self._request_with_retries(*args, **kwargs)
+        # Incluye la espera por cuota y los reintentos: es lo que ve el usuario.
+        method = _request_method(args, kwargs)
+        endpoint = args[1] if len(args) > 1 else kwargs.get("endpoint", "")
+        start = time.perf_counter()
+        try:
+            return self._request_with_retries(*args, **kwargs)
+        finally:
+            record_call(sheets_operation(method, endpoint), time.perf_counter() - start)
+
+    def _request_with_retries(self, *args: Any, **kwargs: Any):
+        # Un append con timeout o 5xx pudo haberse aplicado: repetirlo duplicaría filas.
+        retryable = is_retryable_error if _request_method(args, kwargs).upper() in IDEMPOTENT_METHODS else is_rate_limit_error
+        attempt = 0
+        while True:
+            self.bucket.acquire(current_priority())
+            try:
+                return super().request(*args, **kwargs)
+            except APIError as e:
+                if attempt >= self.max_retries or not retryable(e):
+                    raise
+                delay = backoff_delay(attempt)
+                logger.warning(f"Sheets API respondió {e.code}; reintento {attempt + 1}/{self.max_retries} en {delay:.1f}s.")
+                self.sleep(delay)
+                attempt += 1
@@ -8,12 +8,14 @@ from typing import Dict, Any
 
 from config import SALES_SHEET_BASE_NAME, SALES_HEADERS
 from common.utils import parse_float
-from services.tiendanube_service import update_tiendanube_stock
+from services.tiendanube_service import adjust_tiendanube_stock
 from services.sheets_connection import (
     get_or_create_monthly_sheet, get_value_from_dict_insensitive
 )
+from services.unit_of_work import invalidate_sheet
+from services.stock_outbox import enqueue_stock_push
 from services.products_service import (
-    update_product_stock, invalidate_products_cache
+    update_product_stock
 )
 
 logger = logging.getLogger(__name__)
@@ -25,6 +27,7 @@ def add_transaction_generic(sheet_base_name: str, headers: list, row_data: list)
     if not worksheet:
         raise ConnectionError(f"Hoja para '{sheet_base_name}' no disponible.")
     try:
+        invalidate_sheet(worksheet.title)
         worksheet.append_row(row_data, value_input_option='USER_ENTERED')
         logger.info(f"Transacción registrada en '{worksheet.title}': {row_data}")
         return {"sheet_title": worksheet.title, "data": row_data}
@@ -34,7 +37,11 @@ def add_transaction_generic(sheet_base_name: str, headers: list, row_data: list)
 
 
 def add_sale(variant_details: dict, quantity: int, client_name: str) -> dict:
-    """Records a sale, updates stock in both Sheets and TiendaNube."""
+    """
+    Records a sale and updates stock in Sheets. The sold quantity is queued
+    for TiendaNube as a stock variation (services.stock_outbox) instead of
+    pushed here, so the confirmation does not wait on the TiendaNube API.
+    """
     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     variant_desc_parts = []
     for i in range(1, 4):
@@ -58,13 +65,16 @@ def add_sale(variant_details: dict, quantity: int, client_name: str) -> dict:
     result = add_transaction_generic(SALES_SHEET_BASE_NAME, SALES_HEADERS, row_data)
     current_stock = int(variant_details.get("Stock", 0) or 0)
     new_stock_level = current_stock - quantity
+    # update_product_stock also patches the cached record, so the catalog stays warm
     stock_updated_on_sheet = update_product_stock(variant_details["row_number"], new_stock_level)
-    if stock_updated_on_sheet:
-        invalidate_products_cache()
     product_id = get_value_from_dict_insensitive(variant_details, "ID Producto")
     variant_id = get_value_from_dict_insensitive(variant_details, "ID Variante")
     if product_id and variant_id:
-        update_tiendanube_stock(int(product_id), int(variant_id), new_stock_level)
+        try:
+            enqueue_stock_push(int(product_id), int(variant_id), -quantity)
+        except Exception:
+            logger.error(f"No se pudo encolar el stock de la variante {variant_id}; se envía ahora.", exc_info=True)
+            adjust_tiendanube_stock(int(product_id), int(variant_id), -quantity)
     else:
         logger.error(f"No se pudo actualizar TiendaNube: Faltan product_id o variant_id en variant_details.")
     return {
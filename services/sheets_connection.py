@@ -4,26 +4,38 @@ Core Google Sheets connection, global state, and worksheet helper functions.
 This module manages the singleton connection to Google Sheets and provides
 utilities for creating/accessing worksheets.
 """
+import os
 import gspread
 from gspread.utils import rowcol_to_a1
 from datetime import datetime, timedelta
 import logging
-from typing import Optional, List, Dict, Any
+import threading
+from functools import lru_cache
+from typing import Optional, List, Dict, Any, Iterable, Set, Tuple
 
 from config import (
     google_credentials, SHEET_ID,
+    STORAGE_BACKEND, LOCAL_DB_PATH, LOCAL_PULL_INTERVAL_SECONDS, CACHE_DIR,
     WHOLESALE_SHEET_BASE_NAME, WHOLESALE_HEADERS,
     PROCESSED_EVENTS_SHEET_NAME, PROCESSED_EVENTS_HEADERS,
-    WEBHOOK_LOGS_SHEET_NAME,
+    WEBHOOK_LOGS_SHEET_NAME, WEBHOOK_LOGS_HEADERS, WEBHOOK_RETRY_WINDOW_HOURS,
+    SPANISH_MONTHS,
     get_sheet_name_for_month
 )
 from common.utils import normalize_text, parse_float
+from services.request_scheduler import QuotaAwareHTTPClient
+from services.local_storage import LocalStore, LocalFirstSpreadsheet, SheetsReplicator
+from services.unit_of_work import invalidate_sheet
 
 logger = logging.getLogger(__name__)
 
 # --- Global connection state ---
 gc: Optional[gspread.Client] = None
 spreadsheet: Optional[gspread.Spreadsheet] = None
+local_replicator: Optional[SheetsReplicator] = None
+
+# Disco propio de cada contenedor: se pierde al reciclarlo y no lo ven las otras funciones.
+_EPHEMERAL_DIRS = (CACHE_DIR, "/tmp")
 
 
 def connect_globally_to_sheets() -> bool:
@@ -35,8 +47,8 @@ def connect_globally_to_sheets() -> bool:
         logger.critical("Credenciales de Google no disponibles en config.py.")
         return False
     try:
-        gc = gspread.authorize(google_credentials)
-        spreadsheet = gc.open_by_key(SHEET_ID)
+        gc = gspread.authorize(google_credentials, http_client=QuotaAwareHTTPClient)
+        spreadsheet = _open_storage_backend(gc.open_by_key(SHEET_ID))
         IS_SHEET_CONNECTED = True
         logger.info("Conexión global con Google Sheets establecida.")
         return True
@@ -48,6 +60,50 @@ def connect_globally_to_sheets() -> bool:
         return False
 
 
+def _open_storage_backend(remote: gspread.Spreadsheet) -> gspread.Spreadsheet:
+    """
+    Con STORAGE_BACKEND="sqlite" devuelve un spreadsheet local-first que sirve
+    las tablas de negocio desde SQLite; si no, el spreadsheet remoto tal cual.
+    La base guarda el outbox de escrituras ya confirmadas al usuario, así que
+    LOCAL_DB_PATH tiene que estar en almacenamiento persistente y compartido
+    (p. ej. EFS); en disco efímero se sigue usando Google Sheets directo.
+    """
+    global local_replicator
+    if STORAGE_BACKEND != "sqlite":
+        return remote
+    db_path = os.path.abspath(LOCAL_DB_PATH)
+    if any(db_path.startswith(os.path.join(os.path.abspath(d), "")) for d in _EPHEMERAL_DIRS):
+        logger.error(f"LOCAL_DB_PATH '{LOCAL_DB_PATH}' está en el disco efímero del contenedor: el outbox "
+                     f"se perdería al reciclarlo. Se usa Google Sheets directo.")
+        return remote
+    os.makedirs(os.path.dirname(LOCAL_DB_PATH) or ".", exist_ok=True)
+    store = LocalStore(LOCAL_DB_PATH)
+    local_replicator = SheetsReplicator(store, remote)
+    if local_replicator.last_pull() is None:
+        local_replicator.pull()
+    logger.info(f"Almacenamiento local SQLite activo en '{LOCAL_DB_PATH}'.")
+    return LocalFirstSpreadsheet(store, remote)
+
+
+def flush_local_storage() -> int:
+    """
+    Replica hacia Google Sheets las escrituras locales pendientes y, cada
+    LOCAL_PULL_INTERVAL_SECONDS, trae las ediciones manuales. Se llama al final
+    de cada invocación, cuando el usuario ya recibió su respuesta.
+    No hace nada si el backend es Google Sheets directo.
+    """
+    if local_replicator is None:
+        return 0
+    try:
+        pushed, pulled = local_replicator.sync(LOCAL_PULL_INTERVAL_SECONDS)
+        if pulled:
+            invalidate_worksheet_cache()
+        return pushed
+    except Exception as e:
+        logger.error(f"Error sincronizando el almacenamiento local con Google Sheets: {e}", exc_info=True)
+        return 0
+
+
 IS_SHEET_CONNECTED = False
 
 def is_connected() -> bool:
@@ -60,6 +116,82 @@ def get_spreadsheet() -> Optional[gspread.Spreadsheet]:
     return spreadsheet
 
 
+# --- Worksheet metadata cache ---
+# Títulos → hojas, cargados con una sola llamada de metadatos por spreadsheet.
+# Sólo se invalida cuando este proceso crea una hoja; una hoja que no figura en
+# el mapa (p. ej. creada por otra instancia) se busca una vez y se incorpora.
+_worksheet_cache: Dict[str, Any] = {"owner": None, "by_title": None, "months": None}
+_worksheet_cache_lock = threading.Lock()
+
+
+def _worksheet_map(target: Optional[gspread.Spreadsheet] = None) -> Dict[str, gspread.Worksheet]:
+    target = target if target is not None else spreadsheet
+    with _worksheet_cache_lock:
+        if _worksheet_cache["owner"] is not target or _worksheet_cache["by_title"] is None:
+            by_title = {ws.title: ws for ws in target.worksheets()}
+            _worksheet_cache.update(owner=target, by_title=by_title, months=None)
+        return _worksheet_cache["by_title"]
+
+
+def list_worksheets(target: Optional[gspread.Spreadsheet] = None) -> List[gspread.Worksheet]:
+    """Devuelve todas las hojas del spreadsheet desde la caché de metadatos."""
+    return list(_worksheet_map(target).values())
+
+
+def find_worksheet(sheet_name: str, target: Optional[gspread.Spreadsheet] = None) -> gspread.Worksheet:
+    """
+    Equivalente a spreadsheet.worksheet(name) servido desde la caché de metadatos.
+    Lanza gspread.exceptions.WorksheetNotFound si la hoja no existe.
+    """
+    target = target if target is not None else spreadsheet
+    by_title = _worksheet_map(target)
+    worksheet = by_title.get(sheet_name)
+    if worksheet is None:
+        worksheet = target.worksheet(sheet_name)
+        remember_worksheet(worksheet, target)
+    return worksheet
+
+
+def remember_worksheet(worksheet: gspread.Worksheet, target: Optional[gspread.Spreadsheet] = None) -> None:
+    """Incorpora a la caché una hoja recién creada (o encontrada fuera del mapa)."""
+    target = target if target is not None else spreadsheet
+    with _worksheet_cache_lock:
+        if _worksheet_cache["owner"] is target and _worksheet_cache["by_title"] is not None:
+            _worksheet_cache["by_title"][worksheet.title] = worksheet
+            _worksheet_cache["months"] = None
+
+
+def invalidate_worksheet_cache() -> None:
+    """Descarta la caché de metadatos; la próxima búsqueda vuelve a listar las hojas."""
+    with _worksheet_cache_lock:
+        _worksheet_cache.update(owner=None, by_title=None, months=None)
+
+
+def get_sheet_month_index(target: Optional[gspread.Spreadsheet] = None) -> Set[Tuple[str, int, int]]:
+    """Índice (base, año, mes) de las hojas mensuales, parseado una vez desde los títulos."""
+    by_title = _worksheet_map(target)
+    months = _worksheet_cache["months"]
+    if months is not None:
+        return months
+    months_map_spanish = {v: k for k, v in SPANISH_MONTHS.items()}
+    months = set()
+    for title in by_title:
+        parts = title.split()
+        if len(parts) < 3:
+            continue
+        month_num = months_map_spanish.get(parts[-2].capitalize())
+        if month_num and parts[-1].isdigit():
+            months.add((" ".join(parts[:-2]), int(parts[-1]), month_num))
+    _worksheet_cache["months"] = months
+    return months
+
+
+@lru_cache(maxsize=512)
+def _normalize_header(header: str) -> str:
+    """normalize_text memoizado: las cabeceras son pocas y se repiten en cada fila."""
+    return normalize_text(header)
+
+
 def get_value_from_dict_insensitive(data: dict, target_key: str) -> Any:
     """
     Busca una clave en el diccionario ignorando mayúsculas/minúsculas y acentos
@@ -67,9 +199,9 @@ def get_value_from_dict_insensitive(data: dict, target_key: str) -> Any:
     """
     if not isinstance(data, dict) or not isinstance(target_key, str):
         return None
-    target_key_normalized = normalize_text(target_key)
+    target_key_normalized = _normalize_header(target_key)
     for key, value in data.items():
-        if normalize_text(str(key)) == target_key_normalized:
+        if _normalize_header(str(key)) == target_key_normalized:
             return value
     for key, value in data.items():
         if str(key).lower().strip() == target_key.lower().strip():
@@ -77,6 +209,62 @@ def get_value_from_dict_insensitive(data: dict, target_key: str) -> Any:
     return None
 
 
+class HeaderIndex:
+    """
+    Resuelve las cabeceras de una hoja una sola vez (nombre normalizado → clave
+    original y posición 1-based). Las búsquedas posteriores son accesos directos
+    al diccionario del registro, sin normalizar Unicode por cada fila.
+    """
+    __slots__ = ("headers", "_keys", "_positions")
+
+    def __init__(self, headers: Iterable[Any]):
+        self.headers = list(headers)
+        self._keys: Dict[str, Any] = {}
+        self._positions: Dict[str, int] = {}
+        for idx, header in enumerate(self.headers):
+            normalized = _normalize_header(str(header))
+            if normalized not in self._keys:
+                self._keys[normalized] = header
+                self._positions[normalized] = idx + 1
+
+    @classmethod
+    def from_records(cls, records: List[Dict[str, Any]]) -> "HeaderIndex":
+        """Construye el índice a partir de las claves de los registros de get_all_records()."""
+        keys: Dict[Any, None] = {}
+        for record in records:
+            keys.update(dict.fromkeys(record))
+        return cls(keys)
+
+    def key(self, *candidates: str) -> Optional[Any]:
+        """Devuelve la cabecera original del primer candidato presente."""
+        for candidate in candidates:
+            header = self._keys.get(_normalize_header(candidate))
+            if header is not None:
+                return header
+        return None
+
+    def position(self, *candidates: str) -> Optional[int]:
+        """Devuelve la posición 1-based del primer candidato presente."""
+        for candidate in candidates:
+            position = self._positions.get(_normalize_header(candidate))
+            if position is not None:
+                return position
+        return None
+
+    def get(self, record: Dict[str, Any], *candidates: str, default: Any = None) -> Any:
+        """Equivalente a get_value_from_dict_insensitive usando las cabeceras ya resueltas."""
+        for candidate in candidates:
+            header = self._keys.get(_normalize_header(candidate))
+            if header is not None and header in record:
+                return record[header]
+        return default
+
+    def project(self, records: List[Dict[str, Any]], *columns: str) -> List[tuple]:
+        """Devuelve los registros como tuplas posicionales con las columnas pedidas."""
+        keys = [self.key(column) for column in columns]
+        return [tuple(record.get(k) if k is not None else None for k in keys) for record in records]
+
+
 def apply_table_formatting(worksheet: gspread.Worksheet, num_headers: int) -> None:
     """Applies standard formatting (bold header, filter) to a worksheet."""
     if not worksheet:
@@ -100,12 +288,13 @@ def _get_or_create_worksheet(sheet_name: str, headers: List[str]) -> Optional[gs
         logger.error(f"No se puede obtener/crear hoja '{sheet_name}' sin conexión a Sheets.")
         return None
     try:
-        worksheet = spreadsheet.worksheet(sheet_name)
+        worksheet = find_worksheet(sheet_name)
         return worksheet
     except gspread.exceptions.WorksheetNotFound:
         logger.info(f"Hoja '{sheet_name}' no encontrada. Creando...")
         try:
             worksheet = spreadsheet.add_worksheet(title=sheet_name, rows="1", cols=str(len(headers)))
+            remember_worksheet(worksheet)
             worksheet.append_row(headers, value_input_option='USER_ENTERED')
             apply_table_formatting(worksheet, len(headers))
             return worksheet
@@ -128,13 +317,14 @@ def get_or_create_monthly_sheet(base_name: str, headers: list, date_override: Op
     target_date = date_override or datetime.now()
     sheet_name = get_sheet_name_for_month(base_name, target_date.year, target_date.month)
     try:
-        worksheet = spreadsheet.worksheet(sheet_name)
+        worksheet = find_worksheet(sheet_name)
         logger.info(f"Hoja '{sheet_name}' encontrada.")
         return worksheet
     except gspread.exceptions.WorksheetNotFound:
         logger.info(f"Hoja '{sheet_name}' no encontrada. Creando...")
         try:
             worksheet = spreadsheet.add_worksheet(title=sheet_name, rows="1", cols=str(len(headers)))
+            remember_worksheet(worksheet)
             worksheet.append_row(headers, value_input_option='USER_ENTERED')
             apply_table_formatting(worksheet, len(headers))
             if base_name == WHOLESALE_SHEET_BASE_NAME:
@@ -142,18 +332,19 @@ def get_or_create_monthly_sheet(base_name: str, headers: list, date_override: Op
                 prev_month_date = target_date.replace(day=1) - timedelta(days=1)
                 previous_sheet_name = get_sheet_name_for_month(base_name, prev_month_date.year, prev_month_date.month)
                 try:
-                    previous_sheet = spreadsheet.worksheet(previous_sheet_name)
+                    previous_sheet = find_worksheet(previous_sheet_name)
                     all_records = previous_sheet.get_all_records()
+                    index = HeaderIndex.from_records(all_records)
                     pending_rows_to_carry_over = []
                     for record in all_records:
-                        if get_value_from_dict_insensitive(record, "Categoría") == "Seña":
-                            old_paid = parse_float(str(get_value_from_dict_insensitive(record, "Monto Pagado") or "0.0"))
-                            old_remaining = parse_float(str(get_value_from_dict_insensitive(record, "Monto Restante") or "0.0"))
+                        if index.get(record, "Categoría") == "Seña":
+                            old_paid = parse_float(str(index.get(record, "Monto Pagado") or "0.0"))
+                            old_remaining = parse_float(str(index.get(record, "Monto Restante") or "0.0"))
                             new_row_data = {
                                 "Fecha": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                                "Nombre": get_value_from_dict_insensitive(record, "Nombre"),
-                                "Producto": get_value_from_dict_insensitive(record, "Producto"),
-                                "Cantidad": get_value_from_dict_insensitive(record, "Cantidad"),
+                                "Nombre": index.get(record, "Nombre"),
+                                "Producto": index.get(record, "Producto"),
+                                "Cantidad": index.get(record, "Cantidad"),
                                 "Monto Total": old_paid + old_remaining,
                                 "Monto Pagado": 0,
                                 "Monto Restante": old_remaining,
@@ -187,12 +378,7 @@ def find_column_index(headers: List[str], *candidates: str) -> Optional[int]:
     candidatos para manejar variaciones de acentos/unicode. Devuelve el índice
     1-based, o None si no se encuentra.
     """
-    for candidate in candidates:
-        target = normalize_text(candidate)
-        for idx, header in enumerate(headers):
-            if normalize_text(str(header)) == target:
-                return idx + 1
-    return None
+    return HeaderIndex(headers).position(*candidates)
 
 
 def safe_row_value(row_values: list, col_index: int, default: str = "0") -> str:
@@ -200,6 +386,86 @@ def safe_row_value(row_values: list, col_index: int, default: str = "0") -> str:
     return row_values[col_index - 1] if len(row_values) >= col_index else default
 
 
+def read_rows(worksheet: gspread.Worksheet, *row_numbers: int) -> List[List[Any]]:
+    """
+    Lee varias filas completas en una sola llamada (batch_get), en el orden
+    pedido. Una fila vacía se devuelve como lista vacía.
+    """
+    value_ranges = worksheet.batch_get([f"{row}:{row}" for row in row_numbers])
+    return [list(value_range[0]) if value_range else [] for value_range in value_ranges]
+
+
+def patch_row(worksheet: gspread.Worksheet, row_number: int, updates: Dict[int, Any]) -> None:
+    """
+    Escribe varias celdas de una misma fila en una única llamada batch_update.
+    `updates` mapea índice de columna 1-based → nuevo valor.
+    """
+    if not updates:
+        return
+    data = [{"range": rowcol_to_a1(row_number, col), "values": [[value]]} for col, value in updates.items()]
+    invalidate_sheet(worksheet.title)
+    worksheet.batch_update(data, value_input_option='USER_ENTERED')
+
+
+# --- Append-only log indexes (idempotency) ---
+
+class AppendOnlyLogIndex:
+    """
+    Índice local (set) de la primera columna de una hoja append-only. La hoja se
+    lee completa una sola vez por contenedor; después sólo se consultan las filas
+    agregadas desde la última lectura (por otras instancias), así que el costo de
+    cada verificación no crece con el historial.
+    """
+
+    def __init__(self):
+        self.sheet: Optional[gspread.Worksheet] = None
+        self.ids: Optional[set] = None
+        self.rows = 0
+
+    def _sync(self, sheet: gspread.Worksheet) -> set:
+        if self.sheet is not sheet or self.ids is None:
+            column = sheet.col_values(1)
+            self.sheet, self.ids, self.rows = sheet, set(column[1:]), len(column)
+            return self.ids
+        tail = sheet.get(f"A{self.rows + 1}:A")
+        for row in tail:
+            if row:
+                self.ids.add(row[0])
+        self.rows += len(tail)
+        return self.ids
+
+    def contains(self, sheet: gspread.Worksheet, key: str) -> bool:
+        """True si la clave ya está en la hoja; sólo va a la API cuando no está en memoria."""
+        if self.sheet is sheet and self.ids is not None and key in self.ids:
+            return True
+        return key in self._sync(sheet)
+
+    def record(self, key: str) -> None:
+        """
+        Registra una clave recién agregada por este proceso. No avanza `rows`: otra
+        instancia puede haber agregado filas antes que la nuestra, y sólo la lectura
+        de la cola sabe dónde quedó cada una.
+        """
+        if self.ids is not None:
+            self.ids.add(key)
+
+    def reset(self) -> None:
+        self.sheet, self.ids, self.rows = None, None, 0
+
+
+_processed_events_index = AppendOnlyLogIndex()
+_webhook_log_indexes: Dict[str, AppendOnlyLogIndex] = {}
+_event_index_lock = threading.Lock()
+
+
+def reset_processed_events_index() -> None:
+    """Descarta los índices locales de eventos procesados y webhooks (se recargan en el próximo uso)."""
+    with _event_index_lock:
+        _processed_events_index.reset()
+        _webhook_log_indexes.clear()
+        _legacy_webhook_log.update(loaded=False, last_logged=None)
+
+
 def check_and_set_event_processed(event_id: str) -> bool:
     """
     Verifica si un ID de evento ya fue procesado. Si no, lo registra y devuelve True.
@@ -213,38 +479,137 @@ def check_and_set_event_processed(event_id: str) -> bool:
         logger.error(f"No se pudo acceder a la hoja '{PROCESSED_EVENTS_SHEET_NAME}'. No se puede garantizar la idempotencia.")
         return True
     try:
-        cell = log_sheet.find(event_id, in_column=1)
-        if cell:
-            logger.warning(f"Evento duplicado detectado y omitido: {event_id}")
-            return False
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        log_sheet.append_row([event_id, timestamp], value_input_option='USER_ENTERED')
+        with _event_index_lock:
+            if _processed_events_index.contains(log_sheet, event_id):
+                logger.warning(f"Evento duplicado detectado y omitido: {event_id}")
+                return False
+            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            log_sheet.append_row([event_id, timestamp], value_input_option='USER_ENTERED')
+            _processed_events_index.record(event_id)
         logger.info(f"Evento nuevo '{event_id}' registrado como procesado.")
         return True
     except Exception as e:
+        reset_processed_events_index()
         logger.error(f"Error al verificar/escribir en la hoja '{PROCESSED_EVENTS_SHEET_NAME}': {e}", exc_info=True)
         return False
 
 
-def log_webhook_event(event_id: str, event_type: str, order_id: int) -> bool:
+def _webhook_log_partitions(now: datetime) -> List[str]:
+    """Particiones a consultar: la del mes actual y, dentro de la ventana de reintentos, la anterior."""
+    partitions = [get_sheet_name_for_month(WEBHOOK_LOGS_SHEET_NAME, now.year, now.month)]
+    window_start = now - timedelta(hours=WEBHOOK_RETRY_WINDOW_HOURS)
+    if (window_start.year, window_start.month) != (now.year, now.month):
+        partitions.append(get_sheet_name_for_month(WEBHOOK_LOGS_SHEET_NAME, window_start.year, window_start.month))
+    return partitions
+
+
+# Hoja histórica Webhook_Logs (sin partición): ya no recibe filas, pero sus eventos
+# pueden reintentarse hasta WEBHOOK_RETRY_WINDOW_HOURS después de su última fila.
+_legacy_webhook_log: Dict[str, Any] = {"loaded": False, "last_logged": None}
+
+
+def _legacy_webhook_log_sheet(now: datetime) -> Optional[gspread.Worksheet]:
     """
-    Registra un evento de webhook en la hoja de logs para prevenir duplicados.
-    Devuelve True si el evento es nuevo y se registró, False si ya existía.
+    Devuelve la hoja histórica mientras su última fila siga dentro de la ventana
+    de reintentos, o None. La fecha de la última fila se lee una vez por
+    contenedor; pasada la ventana la hoja deja de consultarse.
     """
+    if _legacy_webhook_log["loaded"] and _legacy_webhook_log["last_logged"] is None:
+        return None
     try:
-        log_sheet = spreadsheet.worksheet(WEBHOOK_LOGS_SHEET_NAME)
+        sheet = find_worksheet(WEBHOOK_LOGS_SHEET_NAME)
     except gspread.exceptions.WorksheetNotFound:
-        logger.error(f"La hoja '{WEBHOOK_LOGS_SHEET_NAME}' no existe. Por favor, créala manualmente.")
-        return False
+        _legacy_webhook_log.update(loaded=True, last_logged=None)
+        return None
+    if not _legacy_webhook_log["loaded"]:
+        timestamps = sheet.col_values(4)[1:]
+        try:
+            last_logged = datetime.strptime(timestamps[-1], "%Y-%m-%d %H:%M:%S") if timestamps else None
+        except ValueError:
+            # Sin una fecha legible no sabemos cuándo cierra la ventana: se sigue consultando.
+            last_logged = now
+        _legacy_webhook_log.update(loaded=True, last_logged=last_logged)
+    last_logged = _legacy_webhook_log["last_logged"]
+    if last_logged is None or now - last_logged > timedelta(hours=WEBHOOK_RETRY_WINDOW_HOURS):
+        _legacy_webhook_log["last_logged"] = None
+        return None
+    return sheet
+
+
+def log_webhook_event(event_id: str, event_type: str, order_id: int) -> bool:
+    """
+    Registra un evento de webhook en la partición mensual de Webhook_Logs para
+    prevenir duplicados. Devuelve True si el evento es nuevo y se registró,
+    False si ya existía (en esta partición o en la anterior, dentro de la
+    ventana de reintentos de TiendaNube). La hoja histórica sin partición se
+    sigue consultando hasta que su última fila sale de esa ventana.
+    """
+    now = datetime.now()
+    current_partition, *previous_partitions = _webhook_log_partitions(now)
     try:
-        cell = log_sheet.find(event_id)
-        if cell:
-            logger.warning(f"Evento duplicado detectado y omitido: {event_id}")
+        log_sheet = _get_or_create_worksheet(current_partition, WEBHOOK_LOGS_HEADERS)
+        if not log_sheet:
+            logger.error(f"No se pudo acceder a la hoja '{current_partition}'.")
             return False
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        log_sheet.append_row([event_id, event_type, order_id, timestamp])
+        with _event_index_lock:
+            for partition in previous_partitions:
+                try:
+                    previous_sheet = find_worksheet(partition)
+                except gspread.exceptions.WorksheetNotFound:
+                    continue
+                if _webhook_log_indexes.setdefault(partition, AppendOnlyLogIndex()).contains(previous_sheet, event_id):
+                    logger.warning(f"Evento duplicado detectado y omitido: {event_id}")
+                    return False
+            legacy_sheet = _legacy_webhook_log_sheet(now)
+            if legacy_sheet is not None:
+                previous_partitions.append(WEBHOOK_LOGS_SHEET_NAME)
+                if _webhook_log_indexes.setdefault(WEBHOOK_LOGS_SHEET_NAME, AppendOnlyLogIndex()).contains(legacy_sheet, event_id):
+                    logger.warning(f"Evento duplicado detectado y omitido (hoja histórica): {event_id}")
+                    return False
+            index = _webhook_log_indexes.setdefault(current_partition, AppendOnlyLogIndex())
+            if index.contains(log_sheet, event_id):
+                logger.warning(f"Evento duplicado detectado y omitido: {event_id}")
+                return False
+            timestamp = now.strftime("%Y-%m-%d %H:%M:%S")
+            log_sheet.append_row([event_id, event_type, order_id, timestamp])
+            index.record(event_id)
+            for stale in set(_webhook_log_indexes) - {current_partition, *previous_partitions}:
+                del _webhook_log_indexes[stale]
         logger.info(f"Evento nuevo registrado en el log: {event_id}")
         return True
     except Exception as e:
+        reset_processed_events_index()
         logger.error(f"Error al buscar o escribir en la hoja de Webhook_Logs: {e}", exc_info=True)
         return False
+
+
+def compact_webhook_logs(now: Optional[datetime] = None) -> List[str]:
+    """
+    Borra las particiones mensuales de Webhook_Logs que quedaron fuera de la
+    ventana de reintentos de TiendaNube. La hoja histórica sin partición no se toca.
+    Devuelve los títulos borrados.
+    """
+    if not IS_SHEET_CONNECTED or not spreadsheet:
+        return []
+    keep = set(_webhook_log_partitions(now or datetime.now()))
+    deleted = []
+    try:
+        month_index = get_sheet_month_index()
+    except Exception as e:
+        logger.error(f"No se pudo listar las hojas para compactar Webhook_Logs: {e}", exc_info=True)
+        return []
+    for base_name, year, month in sorted(month_index):
+        if base_name != WEBHOOK_LOGS_SHEET_NAME:
+            continue
+        title = get_sheet_name_for_month(base_name, year, month)
+        if title in keep:
+            continue
+        try:
+            spreadsheet.del_worksheet(find_worksheet(title))
+            deleted.append(title)
+            logger.info(f"Partición de webhooks '{title}' eliminada (fuera de la ventana de reintentos).")
+        except Exception as e:
+            logger.error(f"No se pudo eliminar la partición '{title}': {e}", exc_info=True)
+    if deleted:
+        invalidate_worksheet_cache()
+    return deleted
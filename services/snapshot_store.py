@@ -0,0 +1,84 @@
+# services/snapshot_store.py
+"""
+Second-tier cache storage that survives across Lambda invocations: a compact
+serialized snapshot plus a version counter per key. Bumping the version
+invalidates every snapshot saved under the previous one.
+
+LocalFileSnapshotStore keeps both in a local directory (/tmp on Lambda, which
+persists across warm starts). Any object exposing the same four methods
+(get_version, bump_version, load, save) can be plugged in instead, e.g. an
+S3/DynamoDB-backed store shared by every container.
+"""
+import gzip
+import json
+import logging
+import os
+import tempfile
+import time
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class LocalFileSnapshotStore:
+    """
+    Snapshot store backed by gzip'd JSON files in a local directory. Each
+    container has its own /tmp, so version bumps made elsewhere (another
+    container, the sync Lambda) are not seen here.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def _path(self, key: str, suffix: str) -> str:
+        return os.path.join(self.directory, f"{key}.{suffix}")
+
+    def _write_atomic(self, path: str, content: bytes) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def get_version(self, key: str) -> int:
+        """Returns the current version for a key (0 if it was never bumped)."""
+        try:
+            with open(self._path(key, "version"), "r") as f:
+                return int(f.read().strip() or 0)
+        except (FileNotFoundError, ValueError):
+            return 0
+
+    def bump_version(self, key: str) -> int:
+        """Increments the version for a key, invalidating any saved snapshot."""
+        version = self.get_version(key) + 1
+        try:
+            self._write_atomic(self._path(key, "version"), str(version).encode("utf-8"))
+        except OSError as e:
+            logger.warning(f"No se pudo actualizar la versión del snapshot '{key}': {e}")
+        return version
+
+    def load(self, key: str) -> Optional[Dict[str, Any]]:
+        """Returns {'version', 'saved_at', 'data'} for a key, or None if missing/unreadable."""
+        try:
+            with gzip.open(self._path(key, "snapshot.json.gz"), "rt", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Snapshot '{key}' ilegible, se ignorará: {e}")
+            return None
+
+    def save(self, key: str, version: int, data: Any) -> None:
+        """Persists data under the given version. Failures are logged, never raised."""
+        payload = {"version": version, "saved_at": time.time(), "data": data}
+        try:
+            encoded = json.dumps(payload, separators=(",", ":"), ensure_ascii=False, default=str).encode("utf-8")
+            self._write_atomic(self._path(key, "snapshot.json.gz"), gzip.compress(encoded))
+        except (OSError, TypeError, ValueError) as e:
+            logger.warning(f"No se pudo guardar el snapshot '{key}': {e}")
+
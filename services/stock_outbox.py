@@ -0,0 +1,231 @@
+# services/stock_outbox.py
+"""
+Outbox for TiendaNube stock pushes after a sale.
+
+add_sale no longer waits on TiendaNube inside the user's confirmation step:
+it records the sale's stock variation (-quantity) here and returns. Entries
+live in a small SQLite table next to the local cache, so they survive warm
+Lambda invocations, and are coalesced per variant by adding up the
+variations. A push re-reads the variant's current TiendaNube stock and
+writes it plus the variation, so a push that runs late never overwrites
+newer stock (e.g. online sales made in the meantime) with a stale level.
+
+A background worker pushes entries as soon as they are enqueued and retries
+failures with jittered exponential backoff; a failed push stays queued
+instead of being lost. The bot's Lambda also calls flush_stock_outbox()
+once the reply is sent, because a frozen container runs no threads between
+invocations.
+
+The queue is per container: only the bot's Lambda, where sales are recorded,
+ever drains it; the sync and scheduler functions have their own disk and
+never see it. It lives on the container's disk (STOCK_OUTBOX_DB_PATH under
+CACHE_DIR), so entries still pending when the container is recycled are
+lost; every flush logs how many are left pending and reports as an error
+the variations older than STOCK_OUTBOX_ALERT_AGE_SECONDS, which need a
+manual stock check in TiendaNube.
+"""
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import List, Optional
+
+from config import STOCK_OUTBOX_DB_PATH, STOCK_OUTBOX_ALERT_AGE_SECONDS
+from services.request_scheduler import backoff_delay
+from services.tiendanube_service import adjust_tiendanube_stock
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS stock_deltas (
+    variant_id INTEGER PRIMARY KEY,
+    product_id INTEGER NOT NULL,
+    delta INTEGER NOT NULL,
+    enqueued_at REAL NOT NULL,
+    version INTEGER NOT NULL DEFAULT 1,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    last_error TEXT
+);
+"""
+
+
+class StockOutbox:
+    """Cola SQLite de variaciones de stock pendientes de enviar, una fila por variante."""
+
+    def __init__(self, path: str, clock=time.time):
+        self.path = path
+        self.clock = clock
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._lock = threading.RLock()
+        with self._lock:
+            self._conn.executescript(_SCHEMA)
+
+    def enqueue(self, product_id: int, variant_id: int, delta: int) -> None:
+        """Suma la variación a la pendiente de la variante (o crea la entrada)."""
+        now = self.clock()
+        with self._lock:
+            self._conn.execute(
+                """
+                INSERT INTO stock_deltas (variant_id, product_id, delta, enqueued_at, next_attempt_at)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (variant_id) DO UPDATE SET
+                    product_id = excluded.product_id, delta = delta + excluded.delta, version = version + 1,
+                    attempts = 0, next_attempt_at = excluded.next_attempt_at, last_error = NULL
+                """,
+                (variant_id, product_id, delta, now, now),
+            )
+
+    def due(self) -> List[tuple]:
+        """(variant_id, product_id, delta, version, attempts) de las entradas listas para enviar."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT variant_id, product_id, delta, version, attempts FROM stock_deltas "
+                "WHERE next_attempt_at <= ? ORDER BY next_attempt_at",
+                (self.clock(),),
+            ).fetchall()
+
+    def acknowledge(self, variant_id: int, version: int, delta: int) -> None:
+        """
+        Descuenta la variación enviada. Si entretanto se encoló otra venta de la
+        misma variante, queda pendiente sólo la parte nueva.
+        """
+        with self._lock:
+            deleted = self._conn.execute(
+                "DELETE FROM stock_deltas WHERE variant_id = ? AND version = ?", (variant_id, version)
+            ).rowcount
+            if not deleted:
+                self._conn.execute(
+                    "UPDATE stock_deltas SET delta = delta - ?, enqueued_at = ? WHERE variant_id = ?",
+                    (delta, self.clock(), variant_id),
+                )
+
+    def retry_later(self, variant_id: int, version: int, attempts: int, error: str = "") -> float:
+        """Reprograma la entrada con backoff. Devuelve la espera en segundos."""
+        delay = backoff_delay(attempts - 1)
+        with self._lock:
+            self._conn.execute(
+                "UPDATE stock_deltas SET attempts = ?, next_attempt_at = ?, last_error = ? "
+                "WHERE variant_id = ? AND version = ?",
+                (attempts, self.clock() + delay, error, variant_id, version),
+            )
+        return delay
+
+    def next_due_in(self) -> Optional[float]:
+        """Segundos hasta la próxima entrada a enviar (0 si ya hay alguna); None si la cola está vacía."""
+        with self._lock:
+            row = self._conn.execute("SELECT MIN(next_attempt_at) FROM stock_deltas").fetchone()
+        return None if row[0] is None else max(row[0] - self.clock(), 0.0)
+
+    def pending_count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM stock_deltas").fetchone()[0]
+
+    def stale(self, max_age: float) -> List[tuple]:
+        """(variant_id, delta, last_error) de las entradas encoladas hace más de max_age segundos."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT variant_id, delta, last_error FROM stock_deltas WHERE enqueued_at <= ? ORDER BY enqueued_at",
+                (self.clock() - max_age,),
+            ).fetchall()
+
+
+# Worker y flush no envían la misma variante a la vez
+_push_lock = threading.Lock()
+
+
+def _push_due(outbox: StockOutbox) -> int:
+    """Envía a TiendaNube las entradas vencidas. Devuelve cuántas se confirmaron."""
+    pushed = 0
+    with _push_lock:
+        for variant_id, product_id, delta, version, attempts in outbox.due():
+            if adjust_tiendanube_stock(product_id, variant_id, delta):
+                outbox.acknowledge(variant_id, version, delta)
+                pushed += 1
+                continue
+            delay = outbox.retry_later(variant_id, version, attempts + 1, "adjust_tiendanube_stock falló")
+            logger.warning(f"Stock de la variante {variant_id} pendiente para TiendaNube "
+                           f"(intento {attempts + 1}); reintento en {delay:.1f}s.")
+    return pushed
+
+
+class StockPushWorker(threading.Thread):
+    """Hilo que vacía el outbox cuando se encola algo o vence un reintento."""
+
+    def __init__(self, outbox: StockOutbox):
+        super().__init__(name="stock-push-worker", daemon=True)
+        self.outbox = outbox
+        self.wake = threading.Event()
+        self._stopped = threading.Event()
+
+    def run(self) -> None:
+        while not self._stopped.is_set():
+            self.wake.clear()
+            try:
+                _push_due(self.outbox)
+            except Exception as e:
+                logger.error(f"Error enviando el outbox de stock a TiendaNube: {e}", exc_info=True)
+            self.wake.wait(timeout=self.outbox.next_due_in())
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self.wake.set()
+
+
+_outbox: Optional[StockOutbox] = None
+_worker: Optional[StockPushWorker] = None
+_state_lock = threading.Lock()
+
+
+def get_stock_outbox() -> StockOutbox:
+    """Outbox compartido por el proceso, abierto al primer uso."""
+    global _outbox
+    with _state_lock:
+        if _outbox is None:
+            _outbox = StockOutbox(STOCK_OUTBOX_DB_PATH)
+        return _outbox
+
+
+def start_stock_push_worker() -> StockPushWorker:
+    """Arranca el worker en segundo plano si no está corriendo. Idempotente."""
+    global _worker
+    outbox = get_stock_outbox()
+    with _state_lock:
+        if _worker is None or not _worker.is_alive() or _worker.outbox is not outbox:
+            _worker = StockPushWorker(outbox)
+            _worker.start()
+        return _worker
+
+
+def enqueue_stock_push(product_id: int, variant_id: int, delta: int) -> None:
+    """Encola una variación de stock de una variante para TiendaNube y despierta al worker."""
+    get_stock_outbox().enqueue(product_id, variant_id, delta)
+    logger.info(f"Variación de stock {delta:+d} de la variante {variant_id} encolada para TiendaNube.")
+    worker = _worker
+    if worker is not None:
+        worker.wake.set()
+
+
+def flush_stock_outbox() -> int:
+    """
+    Envía las entradas vencidas del outbox y devuelve cuántas se confirmaron. Se
+    llama al final de cada invocación del bot, cuando el usuario ya recibió su
+    respuesta; lo que falle queda encolado para la próxima de este contenedor.
+    """
+    try:
+        outbox = get_stock_outbox()
+        pushed = _push_due(outbox)
+        pending = outbox.pending_count()
+        if pending:
+            logger.warning(f"Outbox de stock: {pending} variantes siguen pendientes para TiendaNube.")
+            for variant_id, delta, last_error in outbox.stale(STOCK_OUTBOX_ALERT_AGE_SECONDS):
+                logger.error(f"Outbox de stock: la variación {delta:+d} de la variante {variant_id} lleva más de "
+                             f"{STOCK_OUTBOX_ALERT_AGE_SECONDS}s sin llegar a TiendaNube ({last_error or 'sin error'}); "
+                             f"revisar su stock a mano.")
+        return pushed
+    except Exception as e:
+        logger.error(f"Error vaciando el outbox de stock: {e}", exc_info=True)
+        return 0
@@ -0,0 +1,174 @@
+# services/tiendanube_client.py
+"""
+Single HTTP client for the TiendaNube REST API.
+
+Every TiendaNube call (catalog pages, variant stock reads and writes, order
+details, webhook registration) goes through TiendaNubeClient. It owns one
+keep-alive requests.Session, so bursts of calls reuse the TLS connection,
+applies a timeout per endpoint, retries 429/5xx and connection errors with
+jittered exponential backoff (only 429 for non-idempotent methods such as
+the POST that registers a webhook) and throttles itself from the x-rate-limit-*
+headers TiendaNube returns with every response.
+"""
+import logging
+import threading
+import time
+from http import HTTPStatus
+from typing import Any, Callable, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from config import (
+    TIENDANUBE_API_BASE_URL,
+    TIENDANUBE_STORE_ID,
+    TIENDANUBE_ACCESS_TOKEN,
+    TIENDANUBE_USER_AGENT,
+    TIENDANUBE_MAX_CONCURRENCY,
+)
+from common.tracing import traced_call
+from services.request_scheduler import backoff_delay
+
+logger = logging.getLogger(__name__)
+
+MAX_RETRIES = 3
+RETRYABLE_STATUSES = {
+    HTTPStatus.TOO_MANY_REQUESTS, HTTPStatus.INTERNAL_SERVER_ERROR, HTTPStatus.BAD_GATEWAY,
+    HTTPStatus.SERVICE_UNAVAILABLE, HTTPStatus.GATEWAY_TIMEOUT,
+}
+# Repetirlos tras un 5xx o un corte no duplica nada; un POST repetido puede crear dos webhooks.
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+# Segundos por operación ('MÉTODO /recurso'); lo demás usa DEFAULT_TIMEOUT
+ENDPOINT_TIMEOUTS = {
+    "GET /products": 30,
+    "GET /variants": 10,
+    "PUT /variants": 15,
+    "GET /orders": 15,
+    "POST /webhooks": 15,
+}
+DEFAULT_TIMEOUT = 15
+
+
+def _header_int(headers: Any, name: str) -> Optional[int]:
+    value = headers.get(name) if headers is not None else None
+    if isinstance(value, str) and value.strip().isdigit():
+        return int(value)
+    return value if isinstance(value, int) and not isinstance(value, bool) else None
+
+
+class RateLimitGate:
+    """
+    Shared pause for concurrent TiendaNube requests, driven by the x-rate-limit-*
+    response headers: when the bucket is nearly empty every caller waits until
+    x-rate-limit-reset has elapsed instead of running into 429s.
+    """
+
+    def __init__(self, reserve: int = TIENDANUBE_MAX_CONCURRENCY, sleep=None, clock=None):
+        self.reserve = reserve
+        self.sleep = sleep or time.sleep
+        self.clock = clock or time.monotonic
+        self._resume_at = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self) -> None:
+        with self._lock:
+            delay = self._resume_at - self.clock()
+        if delay > 0:
+            self.sleep(delay)
+
+    def observe(self, headers: Any, throttled: bool = False) -> bool:
+        """Registra los headers de una respuesta. Devuelve True si programó una pausa."""
+        remaining = _header_int(headers, "x-rate-limit-remaining")
+        reset_ms = _header_int(headers, "x-rate-limit-reset")
+        if reset_ms is None or not (throttled or (remaining is not None and remaining <= self.reserve)):
+            return False
+        with self._lock:
+            self._resume_at = max(self._resume_at, self.clock() + reset_ms / 1000)
+        logger.info(f"TiendaNube: cupo casi agotado ({remaining} restantes), pausa de {reset_ms} ms.")
+        return True
+
+
+class TiendaNubeClient:
+    """Pooled, retrying and rate-limit aware client bound to one store."""
+
+    def __init__(self, store_id: Any, access_token: Optional[str], user_agent: str = TIENDANUBE_USER_AGENT,
+                 base_url: str = TIENDANUBE_API_BASE_URL, max_connections: int = TIENDANUBE_MAX_CONCURRENCY,
+                 session: Optional[requests.Session] = None, max_retries: int = MAX_RETRIES,
+                 sleep: Optional[Callable[[float], Any]] = None):
+        self.store_id = store_id
+        self.access_token = access_token
+        self.base_url = base_url
+        self.max_retries = max_retries
+        self.sleep = sleep or time.sleep
+        self.gate = RateLimitGate(sleep=self.sleep)
+        if session is None:
+            session = requests.Session()
+            session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=max(max_connections, 1)))
+        self.session = session
+        self.headers = {
+            "Authentication": f"bearer {str(access_token or '').strip()}",
+            "User-Agent": user_agent,
+            "Content-Type": "application/json",
+        }
+
+    def url(self, path: str) -> str:
+        return f"{self.base_url}{self.store_id}/{path.lstrip('/')}"
+
+    def request(self, method: str, path: str, operation: str, **kwargs: Any) -> requests.Response:
+        """
+        Sends `method path` (relative to the store) and returns the response after
+        raise_for_status(). `operation` ('GET /products') names the call in traces and
+        selects its timeout. Retries 429/5xx and connection errors; non-idempotent
+        methods only retry 429, which TiendaNube answers without processing the call.
+        """
+        kwargs.setdefault("timeout", ENDPOINT_TIMEOUTS.get(operation, DEFAULT_TIMEOUT))
+        url = self.url(path)
+        idempotent = method.upper() in IDEMPOTENT_METHODS
+        attempt = 0
+        while True:
+            self.gate.wait()
+            try:
+                with traced_call(f"tiendanube.{operation}"):
+                    response = self.session.request(method, url, headers=self.headers, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                if not idempotent or attempt >= self.max_retries:
+                    raise
+                delay = backoff_delay(attempt)
+                logger.warning(f"TiendaNube {operation}: {e}; reintento {attempt + 1}/{self.max_retries} en {delay:.1f}s.")
+                self.sleep(delay)
+                attempt += 1
+                continue
+            throttled = response.status_code == HTTPStatus.TOO_MANY_REQUESTS
+            paused = self.gate.observe(response.headers, throttled=throttled)
+            retryable = throttled or (idempotent and response.status_code in RETRYABLE_STATUSES)
+            if not retryable or attempt >= self.max_retries:
+                response.raise_for_status()
+                return response
+            if not paused:
+                delay = backoff_delay(attempt)
+                logger.warning(f"TiendaNube {operation} respondió {response.status_code}; "
+                               f"reintento {attempt + 1}/{self.max_retries} en {delay:.1f}s.")
+                self.sleep(delay)
+            attempt += 1
+
+    def get(self, path: str, operation: str, **kwargs: Any) -> requests.Response:
+        return self.request("GET", path, operation, **kwargs)
+
+    def put(self, path: str, operation: str, **kwargs: Any) -> requests.Response:
+        return self.request("PUT", path, operation, **kwargs)
+
+    def post(self, path: str, operation: str, **kwargs: Any) -> requests.Response:
+        return self.request("POST", path, operation, **kwargs)
+
+
+_client: Optional[TiendaNubeClient] = None
+_client_lock = threading.Lock()
+
+
+def get_tiendanube_client() -> TiendaNubeClient:
+    """Cliente compartido por todo el proceso (sesión y cupo comunes), creado al primer uso."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = TiendaNubeClient(TIENDANUBE_STORE_ID, TIENDANUBE_ACCESS_TOKEN)
+        return _client
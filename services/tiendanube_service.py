@@ -1,16 +1,20 @@
 import requests
 import logging
-from typing import List, Dict, Any, Optional
-from config import (
-    TIENDANUBE_API_BASE_URL,
-    TIENDANUBE_STORE_ID,
-    TIENDANUBE_ACCESS_TOKEN,
-    TIENDANUBE_USER_AGENT
-)
+import contextvars
+import math
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import List, Dict, Any, Optional, Tuple, Iterator, Callable
+from config import TIENDANUBE_MAX_CONCURRENCY
 from common.utils import parse_float
+from services.tiendanube_client import TiendaNubeClient, get_tiendanube_client, _header_int
 
 logger = logging.getLogger(__name__)
 
+# --- Catalog pager ---
+PRODUCTS_PAGE_SIZE = 200  # máximo que acepta GET /products
+
 def _get_localized_name(name_obj: Any, prefer_lang: str = 'es') -> str:
     if isinstance(name_obj, dict):
         if prefer_lang in name_obj and name_obj[prefer_lang]: return str(name_obj[prefer_lang])
@@ -22,115 +26,198 @@ def _get_localized_name(name_obj: Any, prefer_lang: str = 'es') -> str:
         return name_obj
     return "No disponible"
 
-def get_tiendanube_products() -> List[List[Any]]:
-    if not TIENDANUBE_STORE_ID or not isinstance(TIENDANUBE_STORE_ID, int):
+def _check_credentials(client: TiendaNubeClient) -> None:
+    if not client.store_id or not isinstance(client.store_id, int):
         logger.error("TiendaNube Store ID not configured or invalid in config.py.")
         raise ValueError("TiendaNube Store ID no configurado o inválido.")
-    if not TIENDANUBE_ACCESS_TOKEN or "your_tiendanube_access_token" in TIENDANUBE_ACCESS_TOKEN:
+    if not client.access_token or "your_tiendanube_access_token" in client.access_token:
         logger.error("TiendaNube Access Token not configured in config.py.")
         raise ValueError("TiendaNube Access Token no configurado.")
 
-    all_variants_data_for_sheet: List[List[Any]] = []
-    page = 1
-    per_page = 50 
 
-    headers = {
-        "Authentication": f"bearer {str(TIENDANUBE_ACCESS_TOKEN).strip()}",
-        "User-Agent": TIENDANUBE_USER_AGENT
-    }
-    
-    url = f"{TIENDANUBE_API_BASE_URL}{TIENDANUBE_STORE_ID}/products"
+def _product_rows(product: Dict[str, Any]) -> List[List[Any]]:
+    """Convierte un producto de la API en una fila de Productos por variante."""
+    product_name = _get_localized_name(product.get("name", {}))
+    product_id = product.get("id") # --- OBTENER ID DEL PRODUCTO PADRE ---
+
+    category_name = "General"
+    categories = product.get("categories", [])
+    if categories:
+        category_name = _get_localized_name(categories[0].get("name", {}))
+    attribute_names = [_get_localized_name(attr) for attr in product.get("attributes", [])]
+
+    rows: List[List[Any]] = []
+    for variant in product.get("variants", []) or []:
+        variant_id = variant.get("id")
+        sku = variant.get("sku") if variant.get("sku") else ""
+
+        stock: Optional[int]
+        if variant.get("stock_management"):
+            raw_stock = variant.get("stock")
+            stock = int(raw_stock) if raw_stock is not None else 0
+        else:
+            stock = 999
+
+        unit_price = parse_float(str(variant.get("price", "0"))) or 0.0
+        promo_price_val = parse_float(str(variant.get("promotional_price")))
+        final_price, fixed_discount, discount_percentage = unit_price, 0.0, 0.0
+        if promo_price_val is not None and 0 < promo_price_val < unit_price:
+            final_price = promo_price_val
+            fixed_discount = unit_price - final_price
+            if unit_price > 0: discount_percentage = (fixed_discount / unit_price) * 100
+
+        option_values = [_get_localized_name(val) for val in variant.get("values", [])]
+
+        # --- MODIFICADO: Se añade product_id a la fila ---
+        rows.append([
+            product_name,
+            product_id, # ID del Producto
+            variant_id, # ID de la Variante
+            sku,
+            attribute_names[0] if len(attribute_names) > 0 else "",
+            option_values[0] if len(option_values) > 0 else "",
+            attribute_names[1] if len(attribute_names) > 1 else "",
+            option_values[1] if len(option_values) > 1 else "",
+            attribute_names[2] if len(attribute_names) > 2 else "",
+            option_values[2] if len(option_values) > 2 else "",
+            category_name,
+            stock,
+            round(unit_price, 2),
+            round(discount_percentage, 2),
+            round(fixed_discount, 2),
+            round(final_price, 2)
+        ])
+    return rows
 
+
+def _iter_pages_sequential(get_page: Callable[[int], requests.Response], first_page: int) -> Iterator[List[Dict[str, Any]]]:
+    """Walks the pages one by one from `first_page` until an empty or short page."""
+    page = first_page
     while True:
-        params = {"page": page, "per_page": per_page, "fields": "id,name,variants,categories,attributes"}
-        
-        try:
-            response = requests.get(url, headers=headers, params=params, timeout=30)
-            response.raise_for_status()
-            products_page = response.json()
-            
-            if not products_page: break
-
-            for product in products_page:
-                product_name = _get_localized_name(product.get("name", {}))
-                product_id = product.get("id") # --- OBTENER ID DEL PRODUCTO PADRE ---
-                
-                category_name = "General"
-                categories = product.get("categories", [])
-                if categories:
-                    category_name = _get_localized_name(categories[0].get("name", {}))
-                attribute_names = [_get_localized_name(attr) for attr in product.get("attributes", [])]
-
-                variants = product.get("variants", [])
-                if not variants: continue
-
-                for variant in variants:
-                    variant_id = variant.get("id")
-                    sku = variant.get("sku") if variant.get("sku") else ""
-                    
-                    stock: Optional[int]
-                    if variant.get("stock_management"):
-                        raw_stock = variant.get("stock")
-                        stock = int(raw_stock) if raw_stock is not None else 0
-                    else:
-                        stock = 999 
-
-                    unit_price = parse_float(str(variant.get("price", "0"))) or 0.0
-                    promo_price_val = parse_float(str(variant.get("promotional_price")))
-                    final_price, fixed_discount, discount_percentage = unit_price, 0.0, 0.0
-                    if promo_price_val is not None and 0 < promo_price_val < unit_price:
-                        final_price = promo_price_val
-                        fixed_discount = unit_price - final_price
-                        if unit_price > 0: discount_percentage = (fixed_discount / unit_price) * 100
-                    
-                    option_values = [_get_localized_name(val) for val in variant.get("values", [])]
-
-                    # --- MODIFICADO: Se añade product_id a la fila ---
-                    product_row = [
-                        product_name,
-                        product_id, # ID del Producto
-                        variant_id, # ID de la Variante
-                        sku,
-                        attribute_names[0] if len(attribute_names) > 0 else "",
-                        option_values[0] if len(option_values) > 0 else "",
-                        attribute_names[1] if len(attribute_names) > 1 else "",
-                        option_values[1] if len(option_values) > 1 else "",
-                        attribute_names[2] if len(attribute_names) > 2 else "",
-                        option_values[2] if len(option_values) > 2 else "",
-                        category_name,
-                        stock,
-                        round(unit_price, 2),
-                        round(discount_percentage, 2),
-                        round(fixed_discount, 2),
-                        round(final_price, 2)
-                    ]
-                    all_variants_data_for_sheet.append(product_row)
-
-            page += 1
-            if len(products_page) < per_page: break
-
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Error en la solicitud a TiendaNube API: {e}", exc_info=True)
-            raise ConnectionError(f"Error de conexión con TiendaNube.") from e
-        except Exception as e:
-            logger.error(f"Error inesperado procesando productos de TiendaNube: {e}", exc_info=True)
-            raise RuntimeError(f"Error inesperado con TiendaNube.") from e
-            
-    logger.info(f"Se obtuvieron un total de {len(all_variants_data_for_sheet)} variantes de productos de TiendaNube.")
-    return all_variants_data_for_sheet
+        products_page = get_page(page).json()
+        if not products_page:
+            return
+        yield products_page
+        if len(products_page) < PRODUCTS_PAGE_SIZE:
+            return
+        page += 1
+
+
+def _iter_pages_windowed(get_page: Callable[[int], requests.Response], last_page: int) -> Iterator[List[Dict[str, Any]]]:
+    """Yields pages 2..last_page in order, keeping up to TIENDANUBE_MAX_CONCURRENCY requests in flight."""
+    window = max(TIENDANUBE_MAX_CONCURRENCY, 1)
+    pending_pages = iter(range(2, last_page + 1))
+    with ThreadPoolExecutor(max_workers=window) as executor:
+        def submit(page: int):
+            return executor.submit(contextvars.copy_context().run, get_page, page)
+
+        in_flight = deque(submit(page) for page in islice(pending_pages, window))
+        while in_flight:
+            response = in_flight.popleft().result()
+            next_page = next(pending_pages, None)
+            if next_page is not None:
+                in_flight.append(submit(next_page))
+            yield response.json()
+
+
+def _iter_product_pages(client: TiendaNubeClient, extra_params: Optional[Dict[str, Any]] = None) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Yields the /products pages in order. The first page reports the catalog size
+    (x-total-count); the rest are requested concurrently through a sliding window of
+    TIENDANUBE_MAX_CONCURRENCY pages, so a full download is bounded by the rate limit
+    rather than by pages x round-trip time, and at most that many pages wait in
+    memory while the consumer writes the previous one. Without that header the pages
+    are walked one by one until a short page.
+    """
+    def get_page(page: int) -> requests.Response:
+        params = {"page": page, "per_page": PRODUCTS_PAGE_SIZE, "fields": "id,name,variants,categories,attributes"}
+        params.update(extra_params or {})
+        return client.get("products", "GET /products", params=params)
+
+    first = get_page(1)
+    products_page = first.json()
+    if not products_page:
+        return
+    yield products_page
+    if len(products_page) < PRODUCTS_PAGE_SIZE:
+        return
+
+    total = _header_int(first.headers, "x-total-count")
+    if total is None:
+        yield from _iter_pages_sequential(get_page, 2)
+    else:
+        yield from _iter_pages_windowed(get_page, math.ceil(total / PRODUCTS_PAGE_SIZE))
+
+
+def _iter_catalog(client: TiendaNubeClient, extra_params: Optional[Dict[str, Any]] = None) -> Iterator[Tuple[List[Any], List[List[Any]]]]:
+    """Por cada página de /products, devuelve los IDs de producto y sus filas de variantes."""
+    try:
+        for products_page in _iter_product_pages(client, extra_params):
+            yield ([product.get("id") for product in products_page],
+                   [row for product in products_page for row in _product_rows(product)])
+
+    except requests.exceptions.RequestException as e:
+        logger.error(f"Error en la solicitud a TiendaNube API: {e}", exc_info=True)
+        raise ConnectionError(f"Error de conexión con TiendaNube.") from e
+    except Exception as e:
+        logger.error(f"Error inesperado procesando productos de TiendaNube: {e}", exc_info=True)
+        raise RuntimeError(f"Error inesperado con TiendaNube.") from e
+
+
+def _fetch_product_rows(extra_params: Optional[Dict[str, Any]] = None) -> Tuple[List[Any], List[List[Any]]]:
+    """Recorre el listado paginado de /products. Devuelve los IDs de producto vistos y sus filas."""
+    client = get_tiendanube_client()
+    _check_credentials(client)
+
+    product_ids: List[Any] = []
+    all_variants_data_for_sheet: List[List[Any]] = []
+    for page_ids, page_rows in _iter_catalog(client, extra_params):
+        product_ids.extend(page_ids)
+        all_variants_data_for_sheet.extend(page_rows)
+    return product_ids, all_variants_data_for_sheet
+
+
+def iter_tiendanube_products() -> Iterator[List[Any]]:
+    """
+    Streams the catalog as Productos rows, one variant at a time, as the pages
+    arrive. Credentials are checked on the call, before anything is fetched; HTTP
+    failures surface while iterating, as ConnectionError/RuntimeError. Lets the sync
+    write each chunk while the next pages are still downloading, with only a few
+    pages in memory instead of the whole catalog.
+    """
+    client = get_tiendanube_client()
+    _check_credentials(client)
+
+    def rows() -> Iterator[List[Any]]:
+        total = 0
+        for _, page_rows in _iter_catalog(client):
+            total += len(page_rows)
+            yield from page_rows
+        logger.info(f"Se obtuvieron un total de {total} variantes de productos de TiendaNube.")
+
+    return rows()
+
+
+def get_tiendanube_products() -> List[List[Any]]:
+    return list(iter_tiendanube_products())
+
+
+def get_tiendanube_products_updated_since(updated_at_min: str) -> Tuple[List[Any], List[List[Any]]]:
+    """
+    Fetches only the products modified since `updated_at_min` (ISO 8601). Returns the
+    changed product IDs and the current rows of all their variants, so the caller can
+    also drop variants that no longer exist in those products.
+    """
+    product_ids, rows = _fetch_product_rows({"updated_at_min": updated_at_min})
+    logger.info(f"TiendaNube: {len(product_ids)} productos modificados desde {updated_at_min} ({len(rows)} variantes).")
+    return product_ids, rows
 
 # --- NUEVO: Función para obtener stock en tiempo real de una variante ---
 def get_realtime_stock(product_id: int, variant_id: int) -> Optional[int]:
     """Consulta la API de TiendaNube para obtener el stock actual de una variante específica."""
     logger.info(f"Consultando stock en tiempo real para producto {product_id}, variante {variant_id}")
-    url = f"{TIENDANUBE_API_BASE_URL}{TIENDANUBE_STORE_ID}/products/{product_id}/variants/{variant_id}"
-    headers = {
-        "Authentication": f"bearer {str(TIENDANUBE_ACCESS_TOKEN).strip()}",
-        "User-Agent": TIENDANUBE_USER_AGENT
-    }
     try:
-        response = requests.get(url, headers=headers, timeout=10)
-        response.raise_for_status()
+        response = get_tiendanube_client().get(f"products/{product_id}/variants/{variant_id}", "GET /variants")
         data = response.json()
         
         if data.get("stock_management"):
@@ -143,23 +230,33 @@ def get_realtime_stock(product_id: int, variant_id: int) -> Optional[int]:
 
 # --- NUEVO: Función para actualizar el stock en TiendaNube (preparada para el futuro) ---
 def update_tiendanube_stock(product_id: int, variant_id: int, new_stock_level: int) -> bool:
-    """Actualiza el stock de una variante en TiendaNube."""
+    """Actualiza el stock de una variante en TiendaNube (el cliente reintenta 429/5xx)."""
     logger.info(f"Intentando actualizar stock en TiendaNube para variante {variant_id} a {new_stock_level}")
-    
-    url = f"{TIENDANUBE_API_BASE_URL}{TIENDANUBE_STORE_ID}/products/{product_id}/variants/{variant_id}"
-    headers = {
-        "Authentication": f"bearer {str(TIENDANUBE_ACCESS_TOKEN).strip()}",
-        "User-Agent": TIENDANUBE_USER_AGENT,
-        "Content-Type": "application/json"
-    }
     payload = {"stock": new_stock_level}
     
     try:
-        response = requests.put(url, headers=headers, json=payload, timeout=15)
-        response.raise_for_status()
+        get_tiendanube_client().put(f"products/{product_id}/variants/{variant_id}", "PUT /variants", json=payload)
         logger.info(f"Éxito: Stock de la variante {variant_id} actualizado a {new_stock_level} en TiendaNube.")
         return True
     except Exception as e:
         logger.error(f"FALLO al actualizar stock en TiendaNube para variante {variant_id}: {e}", exc_info=True)
-        # Aquí se podría implementar una lógica de reintentos o notificación de error.
-        return False
\ No newline at end of file
+        return False
+
+
+def adjust_tiendanube_stock(product_id: int, variant_id: int, delta: int) -> bool:
+    """
+    Aplica una variación de stock sobre el nivel actual de TiendaNube: relee la
+    variante y escribe stock + delta (nunca menos de 0), así una venta enviada
+    tarde no pisa cambios posteriores como ventas online. Las variantes sin
+    stock gestionado (stock null) no se tocan.
+    """
+    try:
+        response = get_tiendanube_client().get(f"products/{product_id}/variants/{variant_id}", "GET /variants")
+        current = response.json().get("stock")
+    except Exception as e:
+        logger.error(f"No se pudo leer el stock actual de la variante {variant_id} en TiendaNube: {e}", exc_info=True)
+        return False
+    if current is None:
+        logger.info(f"La variante {variant_id} no gestiona stock en TiendaNube; no se ajusta.")
+        return True
+    return update_tiendanube_stock(product_id, variant_id, max(int(current) + delta, 0))
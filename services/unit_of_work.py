@@ -0,0 +1,103 @@
+# services/unit_of_work.py
+"""
+Request-scoped read cache.
+
+Entry points open a unit of work per Telegram update (and per webhook or
+scheduler run). Inside it, reads decorated with @cached_read are memoized
+under the sheet titles they depend on, so the same records are fetched at
+most once per update. Writes call invalidate_sheet(title) and drop exactly
+the entries tagged with that sheet. Outside a unit of work every call goes
+straight to Sheets, as before.
+
+Cached values are shared between callers of the same unit of work; treat
+them as read-only.
+"""
+import functools
+import logging
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class UnitOfWork:
+    """Memo de lecturas etiquetadas por hoja, válido mientras dura un update."""
+
+    def __init__(self):
+        self._entries: Dict[Tuple, Tuple[Any, frozenset]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_load(self, key: Tuple, tags: Iterable[str], loader: Callable[[], Any]) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self.hits += 1
+                return entry[0]
+        value = loader()
+        with self._lock:
+            self.misses += 1
+            self._entries[key] = (value, frozenset(tags))
+        return value
+
+    def invalidate(self, tag: str) -> int:
+        with self._lock:
+            stale = [key for key, (_, tags) in self._entries.items() if tag in tags]
+            for key in stale:
+                del self._entries[key]
+        return len(stale)
+
+
+_current_uow: ContextVar[Optional[UnitOfWork]] = ContextVar("pombot_unit_of_work", default=None)
+
+
+def current_unit_of_work() -> Optional[UnitOfWork]:
+    return _current_uow.get()
+
+
+@contextmanager
+def unit_of_work() -> Iterator[UnitOfWork]:
+    """Abre una unidad de trabajo; si ya hay una activa, la reutiliza."""
+    active = _current_uow.get()
+    if active is not None:
+        yield active
+        return
+    uow = UnitOfWork()
+    token = _current_uow.set(uow)
+    try:
+        yield uow
+    finally:
+        _current_uow.reset(token)
+        if uow.hits:
+            logger.debug(f"Unidad de trabajo: {uow.hits} lecturas servidas desde memoria, {uow.misses} a Sheets.")
+
+
+def invalidate_sheet(title: str) -> None:
+    """Descarta las lecturas memoizadas que dependen de la hoja escrita."""
+    uow = _current_uow.get()
+    if uow is not None and title:
+        uow.invalidate(title)
+
+
+def cached_read(tags: Callable[..., Iterable[str]]):
+    """
+    Memoiza la función dentro de la unidad de trabajo activa. `tags` recibe los
+    mismos argumentos y devuelve los títulos de hoja de los que depende el resultado.
+    """
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            uow = _current_uow.get()
+            if uow is None:
+                return func(*args, **kwargs)
+            key = (func.__module__, func.__qualname__, args, tuple(sorted(kwargs.items())))
+            try:
+                hash(key)
+            except TypeError:
+                return func(*args, **kwargs)
+            return uow.get_or_load(key, tags(*args, **kwargs), lambda: func(*args, **kwargs))
+        return wrapper
+    return decorator
@@ -12,8 +12,10 @@ from config import WHOLESALE_SHEET_BASE_NAME, WHOLESALE_HEADERS, get_sheet_name_
 from common.utils import parse_float
 from services.sheets_connection import (
     is_connected, get_spreadsheet,
-    get_or_create_monthly_sheet, get_value_from_dict_insensitive
+    get_or_create_monthly_sheet, HeaderIndex,
+    safe_row_value, read_rows, patch_row, find_worksheet
 )
+from services.unit_of_work import cached_read, invalidate_sheet
 
 logger = logging.getLogger(__name__)
 
@@ -29,6 +31,7 @@ def add_wholesale_record(name: str, product: str, quantity: int, paid_amount: fl
     remaining_amount = total_amount - paid_amount
     row_data = [timestamp, name, product, quantity, total_amount, paid_amount, remaining_amount, category]
     try:
+        invalidate_sheet(worksheet.title)
         worksheet.append_row(row_data, value_input_option='USER_ENTERED')
         logger.info(f"Venta mayorista registrada: {row_data}")
         return {
@@ -40,6 +43,7 @@ def add_wholesale_record(name: str, product: str, quantity: int, paid_amount: fl
         return None
 
 
+@cached_read(tags=lambda year, month: [get_sheet_name_for_month(WHOLESALE_SHEET_BASE_NAME, year, month)])
 def get_pending_wholesale_payments(year: int, month: int) -> List[Dict[str, Any]]:
     """Obtiene todos los registros mayoristas marcados como 'Seña'."""
     spreadsheet = get_spreadsheet()
@@ -48,13 +52,14 @@ def get_pending_wholesale_payments(year: int, month: int) -> List[Dict[str, Any]
 
     target_sheet_name = get_sheet_name_for_month(WHOLESALE_SHEET_BASE_NAME, year, month)
     try:
-        worksheet = spreadsheet.worksheet(target_sheet_name)
+        worksheet = find_worksheet(target_sheet_name, spreadsheet)
     except Exception:
         return []
     all_records = worksheet.get_all_records()
+    category_key = HeaderIndex.from_records(all_records).key("Categoría")
     pending_payments = []
     for i, record in enumerate(all_records):
-        category = get_value_from_dict_insensitive(record, "Categoría")
+        category = record.get(category_key)
         if category == "Seña":
             record['row_number'] = i + 2
             pending_payments.append(record)
@@ -71,24 +76,24 @@ def modify_wholesale_payment(row_number: int, payment_amount: float) -> Optional
         remaining_col = WHOLESALE_HEADERS.index("Monto Restante") + 1
         category_col = WHOLESALE_HEADERS.index("Categoría") + 1
 
-        current_paid_str = str(worksheet.cell(row_number, paid_col).value)
-        current_remaining_str = str(worksheet.cell(row_number, remaining_col).value)
-        current_paid = parse_float(current_paid_str) or 0.0
-        current_remaining = parse_float(current_remaining_str) or 0.0
+        row_values = read_rows(worksheet, row_number)[0]
+        current_paid = parse_float(str(safe_row_value(row_values, paid_col))) or 0.0
+        current_remaining = parse_float(str(safe_row_value(row_values, remaining_col))) or 0.0
         if payment_amount > current_remaining:
             return {"error": "El pago excede el saldo pendiente."}
         new_paid_amount = current_paid + payment_amount
         new_remaining_amount = current_remaining - payment_amount
-        worksheet.update_cell(row_number, paid_col, new_paid_amount)
-        worksheet.update_cell(row_number, remaining_col, new_remaining_amount)
+        updates = {paid_col: new_paid_amount, remaining_col: new_remaining_amount}
         if new_remaining_amount <= 0:
-            worksheet.update_cell(row_number, category_col, "PAGO")
+            updates[category_col] = "PAGO"
+        patch_row(worksheet, row_number, updates)
         return {"remaining_balance": new_remaining_amount}
     except Exception as e:
         logger.error(f"Error al modificar pago mayorista en fila {row_number}: {e}", exc_info=True)
         return None
 
 
+@cached_read(tags=lambda year, month: [get_sheet_name_for_month(WHOLESALE_SHEET_BASE_NAME, year, month)])
 def get_wholesale_summary(year: int, month: int) -> dict:
     """Obtiene el resumen de ventas mayoristas para un mes especifico, incluyendo detalles por operación."""
     if not is_connected():
@@ -100,20 +105,19 @@ def get_wholesale_summary(year: int, month: int) -> dict:
 
     target_sheet_name = get_sheet_name_for_month(WHOLESALE_SHEET_BASE_NAME, year, month)
     try:
-        worksheet = spreadsheet.worksheet(target_sheet_name)
+        worksheet = find_worksheet(target_sheet_name, spreadsheet)
     except Exception:
         return {"total": 0.0, "count": 0, "by_client": {}, "details": []}
     all_records = worksheet.get_all_records()
     total_amount = 0.0
     detailed_transactions = []
     by_client_data = defaultdict(lambda: {"amount": 0.0, "quantity": 0})
-    for record in all_records:
-        client_name_value = get_value_from_dict_insensitive(record, "Nombre")
+    rows = HeaderIndex.from_records(all_records).project(all_records, "Nombre", "Producto", "Monto Pagado", "Cantidad")
+    for client_name_value, product_value, paid_value, quantity_raw in rows:
         client_name_str = str(client_name_value).strip() if client_name_value is not None else "Sin Nombre"
-        product_value = get_value_from_dict_insensitive(record, "Producto")
         product_str = str(product_value).strip() if product_value is not None else "N/A"
-        amount = parse_float(str(get_value_from_dict_insensitive(record, "Monto Pagado") or '0')) or 0.0
-        quantity_value = parse_float(str(get_value_from_dict_insensitive(record, "Cantidad") or '0')) or 0.0
+        amount = parse_float(str(paid_value or '0')) or 0.0
+        quantity_value = parse_float(str(quantity_raw or '0')) or 0.0
         quantity = int(quantity_value)
         total_amount += amount
         detailed_transactions.append({
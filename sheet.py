@@ -8,6 +8,7 @@ All business logic now lives in the services/ submodules:
   - services.sheets_connection   (connection, helpers, idempotency)
   - services.products_service    (product cache, queries, stock)
   - services.sales_service       (add_sale, add_transaction_generic)
+  - services.stock_outbox        (queued TiendaNube stock pushes)
   - services.expenses_service    (add_expense)
   - services.debts_service       (debt CRUD)
   - services.wholesale_service   (wholesale CRUD + summaries)
@@ -21,18 +22,28 @@ from services.sheets_connection import (
     IS_SHEET_CONNECTED,
     is_connected,
     get_value_from_dict_insensitive,
+    HeaderIndex,
     apply_table_formatting,
     _get_or_create_worksheet,
     get_or_create_monthly_sheet,
     find_column_index,
     safe_row_value,
+    read_rows,
+    patch_row,
+    find_worksheet,
+    list_worksheets,
+    invalidate_worksheet_cache,
+    get_sheet_month_index,
     check_and_set_event_processed,
     log_webhook_event,
+    compact_webhook_logs,
+    flush_local_storage,
 )
 
 # Products
 from services.products_service import (
     invalidate_products_cache,
+    patch_cached_stock,
     get_product_sheet,
     get_all_products_data_cached,
     get_product_categories,
@@ -41,6 +52,15 @@ from services.products_service import (
     get_variant_details,
     update_product_stock,
     update_products_from_tiendanube,
+    apply_product_changes,
+    sync_products_from_tiendanube,
+)
+
+# Stock outbox (TiendaNube)
+from services.stock_outbox import (
+    enqueue_stock_push,
+    flush_stock_outbox,
+    start_stock_push_worker,
 )
 
 # Sales
@@ -87,5 +107,7 @@ from services.checks_service import (
 from services.balance_service import (
     get_monthly_summary,
     get_net_balance_for_month,
+    get_expenses_breakdown,
+    invalidate_balance_snapshot,
     get_available_sheet_months_years,
 )
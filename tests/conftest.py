@@ -11,6 +11,76 @@ except ImportError:
     pass
 
 
+def pytest_configure(config):
+    config.addinivalue_line("markers", "unit: fast isolated tests of a single module")
+    config.addinivalue_line("markers", "integration: flows across several services with mocked APIs")
+    config.addinivalue_line("markers", "regression: guards for previously fixed bugs")
+    config.addinivalue_line("markers", "smoke: import and wiring checks")
+    config.addinivalue_line("markers", "perf: wall-clock/API-call budgets; deselected unless run with -m perf")
+
+
+def pytest_collection_modifyitems(config, items):
+    """Perf budgets depend on wall-clock time and flake on loaded CI runners: opt-in via -m perf."""
+    if "perf" in (config.option.markexpr or ""):
+        return
+    selected = [item for item in items if item.get_closest_marker("perf") is None]
+    if len(selected) != len(items):
+        config.hook.pytest_deselected(items=[item for item in items if item.get_closest_marker("perf")])
+        items[:] = selected
+
+
+@pytest.fixture(autouse=True)
+def isolated_snapshot_store(tmp_path, monkeypatch):
+    """Points the persistent product/balance snapshots at a per-test directory so tests never share /tmp state."""
+    from services import products_service, balance_service
+    from services.snapshot_store import LocalFileSnapshotStore
+    store = LocalFileSnapshotStore(str(tmp_path / "cache"))
+    monkeypatch.setattr(products_service, "products_snapshot_store", store)
+    monkeypatch.setattr(balance_service, "balance_snapshot_store", store)
+    return store
+
+
+@pytest.fixture(autouse=True)
+def isolated_stock_outbox(monkeypatch):
+    """Gives each test its own TiendaNube stock outbox and no background worker."""
+    from services import stock_outbox
+    outbox = stock_outbox.StockOutbox(":memory:")
+    monkeypatch.setattr(stock_outbox, "_outbox", outbox)
+    monkeypatch.setattr(stock_outbox, "_worker", None)
+    return outbox
+
+
+@pytest.fixture(autouse=True)
+def reset_worksheet_cache():
+    """Clears the worksheet metadata cache and event index so each test sees its own spreadsheet mock."""
+    from services.sheets_connection import invalidate_worksheet_cache, reset_processed_events_index
+    invalidate_worksheet_cache()
+    reset_processed_events_index()
+    yield
+    invalidate_worksheet_cache()
+    reset_processed_events_index()
+
+
+@pytest.fixture
+def fake_spreadsheet():
+    """In-memory spreadsheet installed as the global connection; counts every Sheets call."""
+    from tests.helpers.fake_spreadsheet import FakeSpreadsheet
+    fake = FakeSpreadsheet()
+    with fake.installed():
+        yield fake
+
+
+@pytest.fixture
+def tn_session():
+    """Installs a TiendaNube client whose session is a MagicMock; stub `tn_session.request` per test."""
+    from unittest.mock import MagicMock, patch
+    from services import tiendanube_client
+    session = MagicMock()
+    client = tiendanube_client.TiendaNubeClient(12345, "valid_token", session=session, sleep=MagicMock())
+    with patch.object(tiendanube_client, "_client", client):
+        yield session
+
+
 @pytest.fixture
 def sample_expense_records():
     """Sample expense records as returned by gspread get_all_records()."""
@@ -0,0 +1,158 @@
+# tests/helpers/fake_spreadsheet.py
+"""
+In-memory stand-in for gspread.Spreadsheet/Worksheet.
+
+Unlike a MagicMock it keeps real cell state (on the same SQLite-backed
+worksheet the local storage engine uses, in ':memory:'), so services read
+back what they wrote. Every public call counts as one Sheets API request
+and can be delayed by a configurable latency, which lets flows be
+benchmarked offline:
+
+    fake = FakeSpreadsheet(latency={"get_all_records": 0.3}, default_latency=0.15)
+    fake.seed("Deudas", [DEBTS_HEADERS, [...]])
+    with fake.installed():
+        register_debt_payment("D1", 500.0)
+    fake.calls  # Counter({"worksheets": 1, "find": 1, "batch_get": 1, "batch_update": 1})
+"""
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional, Union
+from unittest.mock import patch
+
+import gspread
+
+from services.local_storage import LocalStore, LocalWorksheet
+
+
+# Llamadas que no modifican el spreadsheet (no mueven get_lastUpdateTime).
+_READ_METHODS = {
+    "worksheets", "worksheet", "values_batch_get", "get_lastUpdateTime", "get_all_records",
+    "get_all_values", "get_values", "get", "batch_get", "find", "findall", "row_values",
+    "col_values", "acell", "cell",
+}
+
+
+class _Instrumented:
+    """Proxy that turns every public method call into a counted, delayed request."""
+
+    def __init__(self, target: Any, fake: "FakeSpreadsheet"):
+        self._target = target
+        self._fake = fake
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._target, name)
+        if name.startswith("_") or not callable(attr):
+            return attr
+        def call(*args, **kwargs):
+            self._fake._request(name, getattr(self._target, "title", None))
+            return attr(*args, **kwargs)
+        return call
+
+    def __repr__(self) -> str:
+        return f"<Fake {self._target!r}>"
+
+
+class FakeSpreadsheet:
+    """Spreadsheet en memoria que cuenta llamadas e inyecta latencia por método."""
+
+    def __init__(self, latency: Optional[Dict[str, float]] = None, default_latency: float = 0.0,
+                 sleep: Callable[[float], None] = time.sleep):
+        self.store = LocalStore(":memory:")
+        self.latency = dict(latency or {})
+        self.default_latency = default_latency
+        self.sleep = sleep
+        self.calls: Counter = Counter()
+        self.log: List[tuple] = []
+        self._sheets: Dict[tuple, _Instrumented] = {}
+        self.title = "Fake Spreadsheet"
+        self.id = "fake-spreadsheet"
+        self.revision = 0
+
+    # --- instrumentación ---
+
+    def _request(self, method: str, sheet_title: Optional[str] = None) -> None:
+        self.calls[method] += 1
+        self.log.append((sheet_title, method))
+        if method not in _READ_METHODS:
+            self.revision += 1
+        delay = self.latency.get(method, self.default_latency)
+        if delay:
+            self.sleep(delay)
+
+    @property
+    def total_calls(self) -> int:
+        return sum(self.calls.values())
+
+    def reset_calls(self) -> None:
+        self.calls.clear()
+        self.log.clear()
+
+    def _wrap(self, title: str) -> _Instrumented:
+        key = (title, self.store.sheet_info(title)[0])
+        if key not in self._sheets:
+            self._sheets[key] = _Instrumented(LocalWorksheet(self.store, *key), self)
+        return self._sheets[key]
+
+    # --- gspread.Spreadsheet API ---
+
+    def worksheets(self, *args: Any, **kwargs: Any) -> List[_Instrumented]:
+        self._request("worksheets")
+        return [self._wrap(title) for title in self.store.titles()]
+
+    def worksheet(self, title: str) -> _Instrumented:
+        self._request("worksheet")
+        if not self.store.sheet_info(title):
+            raise gspread.exceptions.WorksheetNotFound(title)
+        return self._wrap(title)
+
+    def add_worksheet(self, title: str, rows: Union[int, str] = 1, cols: Union[int, str] = 26, **kwargs: Any) -> _Instrumented:
+        self._request("add_worksheet")
+        if self.store.sheet_info(title):
+            raise ValueError(f'A sheet with the name "{title}" already exists.')
+        self.store.create_sheet(title, int(cols))
+        return self._wrap(title)
+
+    def del_worksheet(self, worksheet: Any) -> None:
+        self._request("del_worksheet")
+        with self.store.transaction():
+            self.store.drop_sheet(worksheet.title)
+
+    def values_batch_get(self, ranges: List[str], **kwargs: Any) -> Dict[str, Any]:
+        self._request("values_batch_get")
+        value_ranges = []
+        for range_name in ranges:
+            title = range_name.strip("'")
+            info = self.store.sheet_info(title)
+            value_ranges.append({"range": range_name, "values": self.store.read(info[0]) if info else []})
+        return {"valueRanges": value_ranges}
+
+    def get_lastUpdateTime(self) -> str:
+        """Fecha de modificación de Drive simulada: cambia con cada escritura."""
+        self._request("get_lastUpdateTime")
+        return f"2020-01-01T00:00:00.{self.revision:06d}Z"
+
+    # --- helpers de test ---
+
+    def seed(self, title: str, rows: List[List[Any]]) -> None:
+        """Crea (o reemplaza) una hoja con filas, sin contar llamadas."""
+        info = self.store.sheet_info(title)
+        sheet_id = info[0] if info else self.store.create_sheet(title, max((len(r) for r in rows), default=1))
+        LocalWorksheet(self.store, title, sheet_id).clear()
+        LocalWorksheet(self.store, title, sheet_id).append_rows(rows)
+        self.revision += 1
+
+    def values(self, title: str) -> List[List[str]]:
+        """Contenido actual de una hoja, sin contar llamadas."""
+        info = self.store.sheet_info(title)
+        return self.store.read(info[0]) if info else []
+
+    @contextmanager
+    def installed(self):
+        """Instala el fake como spreadsheet global conectado."""
+        from services import sheets_connection
+        sheets_connection.invalidate_worksheet_cache()
+        with patch.object(sheets_connection, "spreadsheet", self), \
+                patch.object(sheets_connection, "IS_SHEET_CONNECTED", True):
+            yield self
+        sheets_connection.invalidate_worksheet_cache()
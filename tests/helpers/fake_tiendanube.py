@@ -0,0 +1,118 @@
+# tests/helpers/fake_tiendanube.py
+"""
+In-memory stand-in for the TiendaNube REST API.
+
+Serves the paginated /products listing (honouring updated_at_min) and
+single-variant GET/PUT from a generated catalog, counts one request per HTTP call and can inject
+latency, mirroring tests/helpers/fake_spreadsheet.py for the TiendaNube side.
+"""
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional
+from unittest.mock import MagicMock, patch
+
+_VARIANT_URL = re.compile(r"/products/(\d+)/variants/(\d+)$")
+
+
+def build_catalog(products: int, variants_per_product: int = 3) -> List[Dict[str, Any]]:
+    """Genera productos con la forma que devuelve GET /products."""
+    catalog = []
+    for p in range(1, products + 1):
+        catalog.append({
+            "id": p,
+            "updated_at": "2026-01-01T00:00:00+00:00",
+            "name": {"es": f"Producto {p}"},
+            "categories": [{"name": {"es": f"Categoría {p % 5}"}}],
+            "attributes": [{"es": "Talle"}],
+            "variants": [
+                {
+                    "id": p * 100 + v, "sku": f"SKU-{p}-{v}", "stock_management": True, "stock": 10 + v,
+                    "price": "15000.00", "promotional_price": "12000.00" if v == 0 else None,
+                    "values": [{"es": ["S", "M", "L", "XL"][v % 4]}],
+                }
+                for v in range(variants_per_product)
+            ],
+        })
+    return catalog
+
+
+class FakeTiendaNube:
+    """API de TiendaNube en memoria que cuenta requests e inyecta latencia."""
+
+    def __init__(self, catalog: Optional[List[Dict[str, Any]]] = None, latency: float = 0.0,
+                 sleep: Callable[[float], None] = time.sleep):
+        self.catalog = catalog if catalog is not None else build_catalog(20)
+        self.latency = latency
+        self.sleep = sleep
+        self.calls: Counter = Counter()
+
+    @property
+    def total_calls(self) -> int:
+        return sum(self.calls.values())
+
+    def reset_calls(self) -> None:
+        self.calls.clear()
+
+    def _response(self, payload: Any) -> MagicMock:
+        response = MagicMock()
+        response.status_code = 200
+        response.headers = {}
+        response.json.return_value = payload
+        return response
+
+    def touch(self, product_id: int, updated_at: str = "2999-01-01T00:00:00+00:00") -> Dict[str, Any]:
+        """Marca un producto como modificado (para updated_at_min) y lo devuelve para editarlo."""
+        product = next(p for p in self.catalog if p["id"] == product_id)
+        product["updated_at"] = updated_at
+        return product
+
+    def _variant(self, url: str) -> Optional[Dict[str, Any]]:
+        match = _VARIANT_URL.search(url)
+        if not match:
+            return None
+        product_id, variant_id = int(match.group(1)), int(match.group(2))
+        for product in self.catalog:
+            if product["id"] == product_id:
+                return next((v for v in product["variants"] if v["id"] == variant_id), None)
+        return None
+
+    def get(self, url: str, params: Optional[Dict[str, Any]] = None, **kwargs: Any) -> MagicMock:
+        self.calls["GET"] += 1
+        if self.latency:
+            self.sleep(self.latency)
+        variant = self._variant(url)
+        if variant is not None:
+            return self._response(variant)
+        params = params or {}
+        page, per_page = int(params.get("page", 1)), int(params.get("per_page", 30))
+        products = self.catalog
+        if params.get("updated_at_min"):
+            products = [p for p in products if p.get("updated_at", "") >= params["updated_at_min"]]
+        response = self._response(products[(page - 1) * per_page: page * per_page])
+        response.headers = {"x-total-count": str(len(products))}
+        return response
+
+    def put(self, url: str, json: Optional[Dict[str, Any]] = None, **kwargs: Any) -> MagicMock:
+        self.calls["PUT"] += 1
+        if self.latency:
+            self.sleep(self.latency)
+        variant = self._variant(url)
+        if variant is not None and json:
+            variant.update(json)
+        return self._response(variant or {})
+
+    def request(self, method: str, url: str, **kwargs: Any) -> MagicMock:
+        """Punto de entrada de la sesión HTTP del cliente: despacha por método."""
+        if method == "PUT":
+            return self.put(url, **kwargs)
+        return self.get(url, **kwargs)
+
+    @contextmanager
+    def installed(self):
+        """Instala un TiendaNubeClient cuya sesión HTTP es este fake."""
+        from services import tiendanube_client
+        client = tiendanube_client.TiendaNubeClient(1, "fake-token", session=self)
+        with patch.object(tiendanube_client, "_client", client):
+            yield self
@@ -0,0 +1,21 @@
+# tests/helpers/sheet_helpers.py
+"""
+Reusable helpers for asserting on batched Google Sheets reads/writes.
+"""
+from gspread.utils import a1_to_rowcol
+
+
+def rows_reader(rows_by_number):
+    """Builds a batch_get side effect that serves whole rows ('3:3') from a dict."""
+    def batch_get(ranges, **kwargs):
+        return [[rows_by_number[int(r.split(":")[0])]] for r in ranges]
+    return batch_get
+
+
+def patched_cells(mock_ws):
+    """Collects every cell written through batch_update as {(row, col): value}."""
+    cells = {}
+    for call in mock_ws.batch_update.call_args_list:
+        for update in call.args[0]:
+            cells[a1_to_rowcol(update["range"])] = update["values"][0][0]
+    return cells
@@ -8,6 +8,7 @@ Create → partial pay → verify Activa → pay remainder → verify Saldada.
 Create → increase → pay all.
 """
 from unittest.mock import patch, MagicMock
+from tests.helpers.sheet_helpers import rows_reader, patched_cells
 
 DEBTS_HEADERS = [
     "ID Deuda", "Nombre", "Monto Inicial", "Monto Pagado",
@@ -39,20 +40,20 @@ class TestDebtCreateAndPayLifecycle:
         """After partial payment, status stays Activa with updated balance."""
         mock_ws = MagicMock()
         mock_ws.find.return_value = MagicMock(row=3)
-        mock_ws.row_values.side_effect = lambda r: {
+        mock_ws.batch_get.side_effect = rows_reader({
             1: DEBTS_HEADERS,
             3: ["DEUDA-1", "Proveedor Z", "100000", "0", "100000",
                 "Activa", "2026-01-01", "2026-01-01"],
-        }[r]
+        })
         mock_get_sheet.return_value = mock_ws
 
         from services.debts_service import register_debt_payment
         result = register_debt_payment("DEUDA-1", 30000.0)
 
         # Verify updated cells
-        mock_ws.update_cell.assert_any_call(3, 4, 30000.0)    # paid
-        mock_ws.update_cell.assert_any_call(3, 5, 70000.0)    # pending
-        mock_ws.update_cell.assert_any_call(3, 6, "Activa")   # still active
+        assert patched_cells(mock_ws)[(3, 4)] == 30000.0    # paid
+        assert patched_cells(mock_ws)[(3, 5)] == 70000.0    # pending
+        assert patched_cells(mock_ws)[(3, 6)] == "Activa"   # still active
         assert result["Saldo Pendiente"] == 70000.0
 
     @patch("services.debts_service.get_or_create_debts_sheet")
@@ -60,19 +61,19 @@ class TestDebtCreateAndPayLifecycle:
         """Paying remaining balance sets status to Saldada."""
         mock_ws = MagicMock()
         mock_ws.find.return_value = MagicMock(row=3)
-        mock_ws.row_values.side_effect = lambda r: {
+        mock_ws.batch_get.side_effect = rows_reader({
             1: DEBTS_HEADERS,
             3: ["DEUDA-1", "Proveedor Z", "100000", "30000", "70000",
                 "Activa", "2026-01-01", "2026-01-15"],
-        }[r]
+        })
         mock_get_sheet.return_value = mock_ws
 
         from services.debts_service import register_debt_payment
         result = register_debt_payment("DEUDA-1", 70000.0)
 
-        mock_ws.update_cell.assert_any_call(3, 4, 100000.0)   # fully paid
-        mock_ws.update_cell.assert_any_call(3, 5, 0.0)        # no pending
-        mock_ws.update_cell.assert_any_call(3, 6, "Saldada")
+        assert patched_cells(mock_ws)[(3, 4)] == 100000.0   # fully paid
+        assert patched_cells(mock_ws)[(3, 5)] == 0.0        # no pending
+        assert patched_cells(mock_ws)[(3, 6)] == "Saldada"
         assert result["Saldo Pendiente"] == 0.0
 
 
@@ -84,18 +85,18 @@ class TestDebtIncreaseAndPayLifecycle:
         """increase_debt_amount adds to Monto Inicial and Saldo Pendiente."""
         mock_ws = MagicMock()
         mock_ws.find.return_value = MagicMock(row=2)
-        mock_ws.row_values.side_effect = lambda r: {
+        mock_ws.batch_get.side_effect = rows_reader({
             1: DEBTS_HEADERS,
             2: ["DEUDA-1", "Vendor A", "50000", "10000", "40000",
                 "Activa", "2026-01-01", "2026-01-01"],
-        }[r]
+        })
         mock_get_sheet.return_value = mock_ws
 
         from services.debts_service import increase_debt_amount
         result = increase_debt_amount("DEUDA-1", 20000.0)
 
-        mock_ws.update_cell.assert_any_call(2, 3, 70000.0)    # initial increased
-        mock_ws.update_cell.assert_any_call(2, 5, 60000.0)    # pending increased
+        assert patched_cells(mock_ws)[(2, 3)] == 70000.0    # initial increased
+        assert patched_cells(mock_ws)[(2, 5)] == 60000.0    # pending increased
         assert result["Saldo Pendiente"] == 60000.0
 
     @patch("services.debts_service.get_or_create_debts_sheet")
@@ -103,18 +104,18 @@ class TestDebtIncreaseAndPayLifecycle:
         """After increase, paying full new balance sets Saldada."""
         mock_ws = MagicMock()
         mock_ws.find.return_value = MagicMock(row=2)
-        mock_ws.row_values.side_effect = lambda r: {
+        mock_ws.batch_get.side_effect = rows_reader({
             1: DEBTS_HEADERS,
             2: ["DEUDA-1", "Vendor A", "70000", "10000", "60000",
                 "Activa", "2026-01-01", "2026-01-15"],
-        }[r]
+        })
         mock_get_sheet.return_value = mock_ws
 
         from services.debts_service import register_debt_payment
         result = register_debt_payment("DEUDA-1", 60000.0)
 
-        mock_ws.update_cell.assert_any_call(2, 5, 0.0)
-        mock_ws.update_cell.assert_any_call(2, 6, "Saldada")
+        assert patched_cells(mock_ws)[(2, 5)] == 0.0
+        assert patched_cells(mock_ws)[(2, 6)] == "Saldada"
         assert result["Saldo Pendiente"] == 0.0
 
 
@@ -30,12 +30,11 @@ class TestFullSaleFlow:
             "ID Producto": product_id, "ID Variante": variant_id,
         }
 
-    @patch("services.sales_service.update_tiendanube_stock")
-    @patch("services.sales_service.invalidate_products_cache")
+    @patch("services.sales_service.enqueue_stock_push")
     @patch("services.sales_service.update_product_stock", return_value=True)
     @patch("services.sales_service.get_or_create_monthly_sheet")
     def test_sale_records_to_sheet_and_syncs_stock(
-        self, mock_sheet, mock_update_stock, mock_invalidate, mock_tn
+        self, mock_sheet, mock_update_stock, mock_tn
     ):
         """Verify real add_sale logic: row appended, stock decremented, TN synced."""
         mock_ws = MagicMock()
@@ -52,10 +51,9 @@ class TestFullSaleFlow:
 
         # Stock updated on sheet: 10 - 3 = 7
         mock_update_stock.assert_called_once_with(5, 7)
-        mock_invalidate.assert_called_once()
 
-        # TiendaNube synced with new stock
-        mock_tn.assert_called_once_with(100, 200, 7)
+        # Sold quantity queued for TiendaNube as a variation
+        mock_tn.assert_called_once_with(100, 200, -3)
 
         # Return value has all expected fields
         assert result["quantity"] == 3
@@ -90,11 +88,10 @@ class TestFullSaleFlow:
         call_args = mock_add_sale.call_args
         assert call_args[1].get("client_name", call_args[0][2] if len(call_args[0]) > 2 else None) == "Ana" or "Ana" in str(call_args)
 
-    @patch("services.sales_service.update_tiendanube_stock")
-    @patch("services.sales_service.invalidate_products_cache")
+    @patch("services.sales_service.enqueue_stock_push")
     @patch("services.sales_service.update_product_stock", return_value=True)
     @patch("services.sales_service.get_or_create_monthly_sheet")
-    def test_variant_description_built_correctly(self, mock_sheet, mock_stock, mock_inv, mock_tn):
+    def test_variant_description_built_correctly(self, mock_sheet, mock_stock, mock_tn):
         """Multi-option variants produce comma-separated description."""
         mock_ws = MagicMock()
         mock_ws.title = "Ventas Enero 2026"
@@ -109,11 +106,10 @@ class TestFullSaleFlow:
 
         assert result["variant_description"] == "Azul, L, Algodón"
 
-    @patch("services.sales_service.update_tiendanube_stock")
-    @patch("services.sales_service.invalidate_products_cache")
+    @patch("services.sales_service.enqueue_stock_push")
     @patch("services.sales_service.update_product_stock", return_value=False)
     @patch("services.sales_service.get_or_create_monthly_sheet")
-    def test_sheet_stock_failure_still_records_sale(self, mock_sheet, mock_stock, mock_inv, mock_tn):
+    def test_sheet_stock_failure_still_records_sale(self, mock_sheet, mock_stock, mock_tn):
         """Sale is recorded even if sheet stock update fails."""
         mock_ws = MagicMock()
         mock_ws.title = "Ventas Enero 2026"
@@ -124,6 +120,4 @@ class TestFullSaleFlow:
 
         # Sale recorded
         mock_ws.append_row.assert_called_once()
-        # Cache not invalidated since stock update failed
-        mock_inv.assert_not_called()
         assert result["remaining_stock"] == "Error al actualizar"
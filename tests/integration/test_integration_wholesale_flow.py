@@ -7,6 +7,7 @@ Integration tests for the wholesale flow:
 Record Seña → modify payment → verify remaining → complete → verify PAGO.
 """
 from unittest.mock import patch, MagicMock
+from tests.helpers.sheet_helpers import rows_reader, patched_cells
 
 from config import WHOLESALE_HEADERS
 
@@ -45,19 +46,18 @@ class TestWholesaleRecordAndModify:
         paid_col = WHOLESALE_HEADERS.index("Monto Pagado") + 1
         remaining_col = WHOLESALE_HEADERS.index("Monto Restante") + 1
 
-        def cell_reader(row, col):
-            values = {paid_col: MagicMock(value="30000"), remaining_col: MagicMock(value="20000")}
-            return values.get(col, MagicMock(value="0"))
-        mock_ws.cell = cell_reader
+        row = ["0"] * len(WHOLESALE_HEADERS)
+        row[paid_col - 1], row[remaining_col - 1] = "30000", "20000"
+        mock_ws.batch_get.side_effect = rows_reader({5: row})
         mock_sheet.return_value = mock_ws
 
         from services.wholesale_service import modify_wholesale_payment
         result = modify_wholesale_payment(row_number=5, payment_amount=10000.0)
 
         # New paid = 30000 + 10000 = 40000
-        mock_ws.update_cell.assert_any_call(5, paid_col, 40000.0)
+        assert patched_cells(mock_ws)[(5, paid_col)] == 40000.0
         # New remaining = 20000 - 10000 = 10000
-        mock_ws.update_cell.assert_any_call(5, remaining_col, 10000.0)
+        assert patched_cells(mock_ws)[(5, remaining_col)] == 10000.0
         assert result["remaining_balance"] == 10000.0
 
     @patch("services.wholesale_service.get_or_create_monthly_sheet")
@@ -69,18 +69,17 @@ class TestWholesaleRecordAndModify:
         remaining_col = WHOLESALE_HEADERS.index("Monto Restante") + 1
         category_col = WHOLESALE_HEADERS.index("Categoría") + 1
 
-        def cell_reader(row, col):
-            values = {paid_col: MagicMock(value="30000"), remaining_col: MagicMock(value="20000")}
-            return values.get(col, MagicMock(value="0"))
-        mock_ws.cell = cell_reader
+        row = ["0"] * len(WHOLESALE_HEADERS)
+        row[paid_col - 1], row[remaining_col - 1] = "30000", "20000"
+        mock_ws.batch_get.side_effect = rows_reader({5: row})
         mock_sheet.return_value = mock_ws
 
         from services.wholesale_service import modify_wholesale_payment
         result = modify_wholesale_payment(row_number=5, payment_amount=20000.0)
 
         # Remaining = 0 → category updated to PAGO
-        mock_ws.update_cell.assert_any_call(5, remaining_col, 0.0)
-        mock_ws.update_cell.assert_any_call(5, category_col, "PAGO")
+        assert patched_cells(mock_ws)[(5, remaining_col)] == 0.0
+        assert patched_cells(mock_ws)[(5, category_col)] == "PAGO"
         assert result["remaining_balance"] == 0.0
 
     @patch("services.wholesale_service.get_or_create_monthly_sheet")
@@ -90,10 +89,9 @@ class TestWholesaleRecordAndModify:
         paid_col = WHOLESALE_HEADERS.index("Monto Pagado") + 1
         remaining_col = WHOLESALE_HEADERS.index("Monto Restante") + 1
 
-        def cell_reader(row, col):
-            values = {paid_col: MagicMock(value="30000"), remaining_col: MagicMock(value="5000")}
-            return values.get(col, MagicMock(value="0"))
-        mock_ws.cell = cell_reader
+        row = ["0"] * len(WHOLESALE_HEADERS)
+        row[paid_col - 1], row[remaining_col - 1] = "30000", "5000"
+        mock_ws.batch_get.side_effect = rows_reader({5: row})
         mock_sheet.return_value = mock_ws
 
         from services.wholesale_service import modify_wholesale_payment
@@ -0,0 +1,84 @@
+# tests/perf/conftest.py
+"""
+Fixtures for the performance suite: every flow runs against the in-memory
+Sheets and TiendaNube fakes with injected latency, and is measured for wall
+time, API calls and peak memory against the budgets in budgets.json.
+"""
+import json
+import os
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+import pytest
+
+from tests.helpers.fake_spreadsheet import FakeSpreadsheet
+from tests.helpers.fake_tiendanube import FakeTiendaNube
+
+BUDGETS_PATH = os.path.join(os.path.dirname(__file__), "budgets.json")
+# Latencia por llamada: suficiente para que serializar llamadas se note en el tiempo de pared.
+SHEETS_LATENCY_SECONDS = 0.005
+TIENDANUBE_LATENCY_SECONDS = 0.005
+
+_results = {}
+
+
+def _load_budgets():
+    with open(BUDGETS_PATH, encoding="utf-8") as f:
+        return json.load(f)
+
+
+class PerfEnvironment:
+    """Fakes instalados más la medición de un flujo contra su presupuesto."""
+
+    def __init__(self, sheets: FakeSpreadsheet, tiendanube: FakeTiendaNube):
+        self.sheets = sheets
+        self.tiendanube = tiendanube
+        self.budgets = _load_budgets()
+
+    @contextmanager
+    def measure(self, flow: str):
+        """Mide el bloque y falla si excede el presupuesto del flujo."""
+        self.sheets.reset_calls()
+        self.tiendanube.reset_calls()
+        tracemalloc.start()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            wall_ms = (time.perf_counter() - start) * 1000
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+        result = {
+            "wall_ms": round(wall_ms, 1),
+            "sheets_calls": self.sheets.total_calls,
+            "tiendanube_calls": self.tiendanube.total_calls,
+            "peak_kib": round(peak / 1024, 1),
+        }
+        _results[flow] = result
+        budget = self.budgets[flow]
+        over = {key: (result[key], limit) for key, limit in budget.items() if result[key] > limit}
+        assert not over, (
+            f"Flujo '{flow}' excede su presupuesto: "
+            + ", ".join(f"{key}={value} > {limit}" for key, (value, limit) in over.items())
+            + f" (llamadas Sheets: {dict(self.sheets.calls)})"
+        )
+
+
+@pytest.fixture
+def perf_env():
+    sheets = FakeSpreadsheet(default_latency=SHEETS_LATENCY_SECONDS)
+    tiendanube = FakeTiendaNube(latency=TIENDANUBE_LATENCY_SECONDS)
+    with sheets.installed(), tiendanube.installed():
+        yield PerfEnvironment(sheets, tiendanube)
+
+
+def pytest_terminal_summary(terminalreporter):
+    if not _results:
+        return
+    terminalreporter.section("perf budgets")
+    terminalreporter.write_line(f"{'flujo':<32}{'ms':>9}{'sheets':>8}{'tn':>5}{'KiB':>10}")
+    for flow, r in _results.items():
+        terminalreporter.write_line(
+            f"{flow:<32}{r['wall_ms']:>9}{r['sheets_calls']:>8}{r['tiendanube_calls']:>5}{r['peak_kib']:>10}"
+        )
@@ -0,0 +1,195 @@
+# tests/perf/test_perf_flows.py
+"""
+End-to-end bot flows measured against the budgets in tests/perf/budgets.json:
+wall time, Sheets/TiendaNube calls and peak memory. A regression in any of
+them fails the suite; update the budget in the same commit when a change
+legitimately costs more. Deselected by default; run with `pytest -m perf`.
+"""
+import pytest
+pytestmark = pytest.mark.perf
+
+from datetime import datetime, timedelta
+from unittest.mock import patch, AsyncMock
+
+from config import (
+    SALES_SHEET_BASE_NAME, SALES_HEADERS, EXPENSES_SHEET_BASE_NAME, EXPENSES_HEADERS,
+    WHOLESALE_SHEET_BASE_NAME, WHOLESALE_HEADERS, DEBTS_SHEET_NAME, DEBTS_HEADERS,
+    CHECKS_SHEET_NAME, CHECKS_HEADERS, FUTURE_PAYMENTS_SHEET_NAME, FUTURE_PAYMENTS_HEADERS,
+    PRODUCTOS_SHEET_NAME, PRODUCTOS_HEADERS, get_sheet_name_for_month,
+)
+
+NOW = datetime.now()
+
+
+def _monthly(base_name):
+    return get_sheet_name_for_month(base_name, NOW.year, NOW.month)
+
+
+def _seed_month(sheets, rows=200):
+    today = NOW.strftime("%Y-%m-%d")
+    sheets.seed(_monthly(SALES_SHEET_BASE_NAME), [SALES_HEADERS] + [
+        [today, f"Producto {i}", "M", "Cliente", f"CAT {i % 8}", 1, 15000, 0, 0, 15000] for i in range(rows)
+    ])
+    sheets.seed(_monthly(EXPENSES_SHEET_BASE_NAME), [EXPENSES_HEADERS] + [
+        [today, ["INSUMOS", "PERSONALES", "CANJES"][i % 3], f"SUB {i % 4}", "Gasto", "", 1200] for i in range(rows // 2)
+    ])
+    sheets.seed(_monthly(WHOLESALE_SHEET_BASE_NAME), [WHOLESALE_HEADERS] + [
+        [today, f"Mayorista {i % 10}", "Buzos", 10, 50000, 10000, 40000, "Seña"] for i in range(rows // 10)
+    ])
+
+
+def _seed_products(sheets, products=100):
+    rows = [PRODUCTOS_HEADERS]
+    for p in range(1, products + 1):
+        for v, size in enumerate(["S", "M", "L"]):
+            rows.append([f"Producto {p}", p, p * 100 + v, f"SKU-{p}-{v}", "Talle", size, "", "", "", "",
+                         f"Categoría {p % 5}", 10, 15000, 0, 0, 15000])
+    sheets.seed(PRODUCTOS_SHEET_NAME, rows)
+
+
+def test_sale_flow(perf_env):
+    from services.products_service import get_variant_details, invalidate_products_cache
+    from services.sales_service import add_sale
+    from services.stock_outbox import flush_stock_outbox
+    from tests.helpers.fake_tiendanube import build_catalog
+    perf_env.tiendanube.catalog = build_catalog(100)
+    _seed_month(perf_env.sheets)
+    _seed_products(perf_env.sheets)
+    invalidate_products_cache()
+
+    with perf_env.measure("sale"):
+        variant = get_variant_details("Producto 42", {"Opción 1: Valor": "M"})
+        result = add_sale(variant, 2, "Cliente Perf")
+        # The next sale step reads the patched cache, not the Productos sheet
+        after = get_variant_details("Producto 42", {"Opción 1: Valor": "M"})
+
+    assert after["Stock"] == 8
+    assert result["sheet_title"] == _monthly(SALES_SHEET_BASE_NAME)
+    assert perf_env.sheets.values(PRODUCTOS_SHEET_NAME)[42 * 3 - 1][11] == "8"
+    # The confirmation does not wait on TiendaNube: the stock push leaves with the outbox
+    assert perf_env.tiendanube.calls["PUT"] == 0
+    assert flush_stock_outbox() == 1
+    assert perf_env.tiendanube.calls["PUT"] == 1
+    # The -2 is applied to TiendaNube's own level (11 for the M variant), not the sheet's
+    assert perf_env.tiendanube.catalog[41]["variants"][1]["stock"] == 9
+
+
+def test_wholesale_sena_flow(perf_env):
+    from services.wholesale_service import (
+        add_wholesale_record, get_pending_wholesale_payments, modify_wholesale_payment,
+    )
+    _seed_month(perf_env.sheets)
+
+    with perf_env.measure("wholesale_sena"):
+        add_wholesale_record("Mayorista Perf", "Remeras", 20, 30000.0, 100000.0, "Seña")
+        pending = get_pending_wholesale_payments(NOW.year, NOW.month)
+        result = modify_wholesale_payment(pending[-1]["row_number"], 70000.0)
+
+    assert result["remaining_balance"] == 0.0
+
+
+def test_debt_payment_flow(perf_env):
+    from services.debts_service import get_active_debts, register_debt_payment
+    perf_env.sheets.seed(DEBTS_SHEET_NAME, [DEBTS_HEADERS] + [
+        [f"DEUDA-{i}", f"Cliente {i}", 10000, 0, 10000, "Activa", "2026-01-01", "2026-01-01"] for i in range(100)
+    ])
+
+    with perf_env.measure("debt_payment"):
+        debts = get_active_debts()
+        result = register_debt_payment(debts[57]["ID Deuda"], 2500.0)
+
+    assert result["Saldo Pendiente"] == 7500.0
+
+
+def test_balance_pdf_flow(perf_env):
+    from services.balance_service import get_net_balance_for_month
+    from services.report_generator import generate_balance_pdf
+    _seed_month(perf_env.sheets)
+
+    with perf_env.measure("balance_pdf"):
+        balance = get_net_balance_for_month(NOW.year, NOW.month)
+        pdf = generate_balance_pdf(balance)
+
+    assert pdf is not None and pdf.getvalue().startswith(b"%PDF")
+
+
+@pytest.mark.asyncio
+async def test_daily_scheduler_flow(perf_env):
+    from lambdas import scheduler_handler
+    from services.unit_of_work import unit_of_work
+    today = NOW.strftime("%d/%m/%Y")
+    yesterday = (NOW - timedelta(days=1)).strftime("%d/%m/%Y")
+    soon = (NOW + timedelta(days=2)).strftime("%d/%m/%Y")
+    _seed_month(perf_env.sheets, rows=50)
+    perf_env.sheets.seed(CHECKS_SHEET_NAME, [CHECKS_HEADERS] + [
+        [f"CHK-{i}", [today, yesterday, soon][i % 3], f"Banco {i}", 1000, 12, 10, 1022, "Pendiente"] for i in range(30)
+    ])
+    perf_env.sheets.seed(FUTURE_PAYMENTS_SHEET_NAME, [FUTURE_PAYMENTS_HEADERS] + [
+        [f"FP-{i}", [yesterday, soon][i % 2], f"Cliente {i}", "Buzos", 2, 5000, 100, 4900, "Pendiente"] for i in range(20)
+    ])
+
+    with patch.object(scheduler_handler, "BOT_TOKEN", "perf-token"), \
+            patch.object(scheduler_handler, "CHAT_ID", 12345), \
+            patch.object(scheduler_handler, "Bot") as bot_cls, \
+            patch.object(scheduler_handler, "traced_request"), \
+            patch.object(scheduler_handler, "connect_globally_to_sheets", return_value=True):
+        bot_cls.return_value = AsyncMock()
+        with perf_env.measure("daily_scheduler"), unit_of_work():
+            await scheduler_handler.daily_tasks()
+
+    checks = perf_env.sheets.values(CHECKS_SHEET_NAME)
+    assert all(row[7] != "Pendiente" for row in checks[1:] if row[1] != soon)
+
+
+def test_tiendanube_sync_flow(perf_env):
+    # /sync_products: full diff sync over a sheet whose rows no longer match the catalog
+    from services.products_service import sync_products_from_tiendanube
+    from tests.helpers.fake_tiendanube import build_catalog
+    perf_env.tiendanube.catalog = build_catalog(20)
+    _seed_products(perf_env.sheets, products=20)
+
+    with perf_env.measure("tiendanube_sync"):
+        success, _ = sync_products_from_tiendanube(full=True)
+
+    assert success
+    assert len(perf_env.sheets.values(PRODUCTOS_SHEET_NAME)) == 20 * 3 + 1
+
+
+def test_tiendanube_incremental_sync_flow(perf_env):
+    from services.products_service import sync_products_from_tiendanube
+    from tests.helpers.fake_tiendanube import build_catalog
+    perf_env.tiendanube.catalog = build_catalog(200)
+    assert sync_products_from_tiendanube(full=True)[0]
+    perf_env.tiendanube.touch(17)["variants"][1]["stock"] = 0
+    perf_env.tiendanube.touch(180)["variants"].pop()
+
+    with perf_env.measure("tiendanube_incremental_sync"):
+        success, message = sync_products_from_tiendanube()
+
+    assert success and "1 modificaciones" in message and "1 bajas" in message
+    assert len(perf_env.sheets.values(PRODUCTOS_SHEET_NAME)) == 200 * 3
+
+
+def test_tiendanube_catalog_download_flow(perf_env):
+    from services.tiendanube_service import get_tiendanube_products
+    from tests.helpers.fake_tiendanube import build_catalog
+    perf_env.tiendanube.catalog = build_catalog(1000)
+
+    with perf_env.measure("tiendanube_catalog_download"):
+        rows = get_tiendanube_products()
+
+    assert len(rows) == 3000
+    assert [r[1] for r in rows[::3]] == list(range(1, 1001))
+
+
+def test_tiendanube_streaming_full_sync_flow(perf_env):
+    from services.tiendanube_service import iter_tiendanube_products
+    from services.products_service import update_products_from_tiendanube
+    from tests.helpers.fake_tiendanube import build_catalog
+    perf_env.tiendanube.catalog = build_catalog(1000)
+
+    with perf_env.measure("tiendanube_streaming_full_sync"):
+        success, message = update_products_from_tiendanube(iter_tiendanube_products())
+
+    assert success and "3000 variantes" in message
+    assert len(perf_env.sheets.values(PRODUCTOS_SHEET_NAME)) == 3001
@@ -0,0 +1,65 @@
+import pytest
+pytestmark = pytest.mark.unit
+
+# tests/test_fake_spreadsheet.py
+"""Unit tests for tests/helpers/fake_spreadsheet.py — in-memory Sheets stand-in with call counting and latency."""
+import gspread
+
+from config import DEBTS_HEADERS, DEBTS_SHEET_NAME
+from tests.helpers.fake_spreadsheet import FakeSpreadsheet
+
+
+class TestFakeSpreadsheet:
+    """The fake keeps real state and counts one request per API call."""
+
+    def test_roundtrip_and_call_counts(self):
+        fake = FakeSpreadsheet()
+        ws = fake.add_worksheet("Ventas Enero 2026", rows=1, cols=2)
+        ws.append_row(["Producto", "Monto"])
+        ws.append_rows([["Remera", 5000], ["Buzo", 8000]])
+        cell = ws.find("Buzo")
+        ws.update_cell(cell.row, 2, 8500)
+
+        assert fake.worksheet("Ventas Enero 2026").get_all_records() == [
+            {"Producto": "Remera", "Monto": 5000}, {"Producto": "Buzo", "Monto": 8500},
+        ]
+        assert fake.calls == {"add_worksheet": 1, "append_row": 1, "append_rows": 1, "find": 1,
+                              "update_cell": 1, "worksheet": 1, "get_all_records": 1}
+        assert fake.log[-1] == ("Ventas Enero 2026", "get_all_records")
+
+    def test_missing_sheet_raises_worksheet_not_found(self):
+        with pytest.raises(gspread.exceptions.WorksheetNotFound):
+            FakeSpreadsheet().worksheet("Deudas")
+
+    def test_injects_per_method_latency(self):
+        slept = []
+        fake = FakeSpreadsheet(latency={"get_all_records": 0.3}, default_latency=0.1, sleep=slept.append)
+        fake.seed("Deudas", [["ID"], ["D1"]])
+
+        fake.worksheet("Deudas").get_all_records()
+
+        assert slept == [0.1, 0.3]
+
+    def test_seed_and_values_are_not_counted(self):
+        fake = FakeSpreadsheet()
+        fake.seed("Deudas", [["ID", "Monto"], ["D1", 100.0]])
+
+        assert fake.values("Deudas") == [["ID", "Monto"], ["D1", "100"]]
+        assert fake.total_calls == 0
+
+
+class TestFakeSpreadsheetWithServices:
+    """Services run unchanged against the installed fake."""
+
+    def test_debt_payment_flow(self, fake_spreadsheet):
+        from services.debts_service import register_debt_payment
+        fake_spreadsheet.seed(DEBTS_SHEET_NAME, [
+            DEBTS_HEADERS,
+            ["D1", "Ana", 1000, 0, 1000, "Activa", "2026-01-01", "2026-01-01"],
+        ])
+
+        result = register_debt_payment("D1", 400.0)
+
+        assert result["Saldo Pendiente"] == 600.0
+        assert fake_spreadsheet.values(DEBTS_SHEET_NAME)[1][3:6] == ["400", "600", "Activa"]
+        assert fake_spreadsheet.calls["batch_update"] == 1
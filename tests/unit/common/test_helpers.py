@@ -3,7 +3,8 @@ pytestmark = pytest.mark.unit
 
 # tests/test_helpers.py
 """Unit tests for shared helpers in sheets_connection.py."""
-from services.sheets_connection import find_column_index, safe_row_value
+from unittest.mock import MagicMock
+from services.sheets_connection import find_column_index, safe_row_value, HeaderIndex, read_rows, patch_row
 
 
 # ── find_column_index ────────────────────────────────────────
@@ -71,3 +72,75 @@ class TestSafeRowValue:
         """Index 0 is not valid 1-based, but Python -1 indexing wraps to last element.
         This is a known edge case — callers should never pass 0."""
         assert safe_row_value(self.SAMPLE_ROW, 0) == "PAGO"  # wraps to [-1]
+
+
+# ── HeaderIndex ──────────────────────────────────────────────
+
+class TestHeaderIndex:
+    """Tests for HeaderIndex — headers normalized once, O(1) lookups afterwards."""
+
+    RECORDS = [
+        {"Nombre": "Juan", "Categoría": "Seña", "Monto Pagado": 100},
+        {"Nombre": "Ana", "Categoría": "PAGO", "Monto Pagado": 250},
+    ]
+
+    def test_key_resolves_accent_variants(self):
+        index = HeaderIndex.from_records(self.RECORDS)
+        assert index.key("Categoria") == "Categoría"
+        assert index.key("CATEGORÍA") == "Categoría"
+
+    def test_key_first_matching_candidate(self):
+        index = HeaderIndex.from_records(self.RECORDS)
+        assert index.key("Monto", "Monto Pagado") == "Monto Pagado"
+        assert index.key("NoExiste") is None
+
+    def test_position_is_1_based(self):
+        index = HeaderIndex(["Fecha", "Nombre", "Categoría"])
+        assert index.position("categoria") == 3
+        assert index.position("NoExiste") is None
+
+    def test_get_matches_insensitive_lookup(self):
+        index = HeaderIndex.from_records(self.RECORDS)
+        assert index.get(self.RECORDS[0], "categoria") == "Seña"
+        assert index.get(self.RECORDS[0], "Apellido") is None
+        assert index.get(self.RECORDS[0], "Apellido", default="N/A") == "N/A"
+
+    def test_project_returns_positional_tuples(self):
+        index = HeaderIndex.from_records(self.RECORDS)
+        rows = index.project(self.RECORDS, "Nombre", "monto pagado", "NoExiste")
+        assert rows == [("Juan", 100, None), ("Ana", 250, None)]
+
+    def test_from_records_uses_union_of_keys(self):
+        index = HeaderIndex.from_records([{"A": 1}, {"B": 2}])
+        assert index.key("b") == "B"
+
+
+# ── read_rows / patch_row ────────────────────────────────────
+
+class TestRowBatchHelpers:
+    """Tests for read_rows and patch_row — one API call per row read/patch."""
+
+    def test_read_rows_single_batch_get(self):
+        mock_ws = MagicMock()
+        mock_ws.batch_get.return_value = [[["Fecha", "Nombre"]], []]
+
+        headers, row = read_rows(mock_ws, 1, 7)
+
+        mock_ws.batch_get.assert_called_once_with(["1:1", "7:7"])
+        assert headers == ["Fecha", "Nombre"]
+        assert row == []
+
+    def test_patch_row_single_batch_update(self):
+        mock_ws = MagicMock()
+
+        patch_row(mock_ws, 3, {4: 25000.0, 6: "Activa"})
+
+        mock_ws.batch_update.assert_called_once_with(
+            [{"range": "D3", "values": [[25000.0]]}, {"range": "F3", "values": [["Activa"]]}],
+            value_input_option='USER_ENTERED'
+        )
+
+    def test_patch_row_noop_without_updates(self):
+        mock_ws = MagicMock()
+        patch_row(mock_ws, 3, {})
+        mock_ws.batch_update.assert_not_called()
@@ -0,0 +1,129 @@
+import pytest
+pytestmark = pytest.mark.unit
+
+# tests/test_tracing.py
+"""Unit tests for common/tracing.py — per-update span trees emitted as JSON lines."""
+import asyncio
+import contextvars
+import json
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch, MagicMock, AsyncMock
+
+from common import tracing
+from common.tracing import trace, span, traced_call, record_call, sheets_operation, TracedHTTPXRequest
+
+
+def _emitted(mock_info):
+    """Parses the single JSON line passed to trace_logger.info."""
+    mock_info.assert_called_once()
+    return json.loads(mock_info.call_args[0][0])
+
+
+class TestTrace:
+    """trace()/span() build the tree and emit it once, at the root."""
+
+    @patch.object(tracing.trace_logger, "info")
+    def test_emits_span_tree_with_aggregated_calls(self, mock_info):
+        with trace("telegram_update", update_id=7):
+            record_call("telegram.getMe", 0.010)
+            with span("balance"):
+                record_call("sheets.values.get Ventas Enero 2026", 0.200)
+                record_call("sheets.values.get Ventas Enero 2026", 0.100)
+                record_call("sheets.metadata", 0.050)
+
+        payload = _emitted(mock_info)
+        assert payload["type"] == "trace"
+        assert payload["name"] == "telegram_update"
+        assert payload["span"]["attrs"] == {"update_id": 7}
+        balance = payload["span"]["children"][0]
+        assert balance["name"] == "balance"
+        assert balance["calls"]["sheets.values.get Ventas Enero 2026"] == {"count": 2, "ms": 300.0}
+        assert payload["calls"]["sheets"] == {"count": 3, "ms": 350.0}
+        assert payload["calls"]["telegram"] == {"count": 1, "ms": 10.0}
+
+    @patch.object(tracing.trace_logger, "info")
+    def test_nested_trace_becomes_child_span(self, mock_info):
+        with trace("scheduler.daily_tasks"):
+            with trace("sync_products"):
+                pass
+
+        payload = _emitted(mock_info)
+        assert payload["span"]["children"][0]["name"] == "sync_products"
+
+    @patch.object(tracing.trace_logger, "info")
+    def test_records_error_type(self, mock_info):
+        with pytest.raises(ValueError):
+            with trace("tiendanube_webhook"):
+                raise ValueError("boom")
+
+        assert _emitted(mock_info)["span"]["attrs"]["error"] == "ValueError"
+
+    @patch.object(tracing.trace_logger, "info")
+    def test_disabled_tracing_emits_nothing(self, mock_info):
+        with patch.object(tracing, "TRACING_ENABLED", False):
+            with trace("telegram_update") as root:
+                record_call("sheets.metadata", 0.1)
+
+        assert root is None
+        mock_info.assert_not_called()
+
+    def test_calls_outside_a_trace_are_noops(self):
+        with span("orphan") as orphan, traced_call("tiendanube.GET /products"):
+            record_call("sheets.metadata", 0.1)
+        assert orphan is None
+
+    @patch.object(tracing.trace_logger, "info")
+    def test_copied_context_reaches_worker_threads(self, mock_info):
+        with trace("balance"):
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                futures = [executor.submit(contextvars.copy_context().run, record_call, "sheets.values.get X", 0.01)
+                           for _ in range(2)]
+                [f.result() for f in futures]
+
+        assert _emitted(mock_info)["calls"]["sheets"]["count"] == 2
+
+
+class TestSheetsOperation:
+    """gspread URLs map to stable operation names."""
+
+    BASE = "https://sheets.googleapis.com/v4/spreadsheets/abc123"
+
+    @pytest.mark.parametrize("method, url, expected", [
+        ("get", BASE, "sheets.metadata"),
+        ("post", BASE + ":batchUpdate", "sheets.batchUpdate"),
+        ("get", BASE + "/values:batchGet", "sheets.values.batchGet"),
+        ("post", BASE + "/values:batchUpdate", "sheets.values.batchUpdate"),
+        ("get", BASE + "/values/%27Ventas%20Enero%202026%27", "sheets.values.get Ventas Enero 2026"),
+        ("get", BASE + "/values/%27Deudas%27%21A1%3AH2", "sheets.values.get Deudas"),
+        ("post", BASE + "/values/%27Deudas%27%21A1:append", "sheets.values.append Deudas"),
+        ("post", BASE + "/values/Productos:clear", "sheets.values.clear Productos"),
+    ])
+    def test_operation_names(self, method, url, expected):
+        assert sheets_operation(method, url) == expected
+
+
+class TestInstrumentedClients:
+    """gspread and Telegram transports report their calls to the active span."""
+
+    @patch.object(tracing.trace_logger, "info")
+    def test_quota_client_records_sheets_call(self, mock_info):
+        from services.request_scheduler import QuotaAwareHTTPClient
+        client = QuotaAwareHTTPClient.__new__(QuotaAwareHTTPClient)
+        client.bucket = MagicMock()
+        with patch("gspread.http_client.HTTPClient.request", return_value="ok"):
+            with trace("telegram_update"):
+                assert client.request("get", "https://sheets.googleapis.com/v4/spreadsheets/abc") == "ok"
+
+        assert _emitted(mock_info)["span"]["calls"]["sheets.metadata"]["count"] == 1
+
+    @patch.object(tracing.trace_logger, "info")
+    def test_telegram_request_records_bot_method(self, mock_info):
+        request = TracedHTTPXRequest()
+        with patch("telegram.request.HTTPXRequest.do_request", new_callable=AsyncMock, return_value=(200, b"{}")):
+            async def send():
+                with trace("telegram_update"):
+                    await request.do_request("https://api.telegram.org/botTOKEN/sendMessage", "POST")
+            asyncio.run(send())
+
+        assert _emitted(mock_info)["calls"]["telegram"]["count"] == 1
+        assert "telegram.sendMessage" in _emitted(mock_info)["span"]["calls"]
@@ -206,12 +206,10 @@ class TestSyncProductsCommand:
 
     @pytest.mark.asyncio
     @patch("handlers.core.ALLOWED_USER_IDS", [12345])
-    @patch("handlers.core.get_tiendanube_products")
-    @patch("handlers.core.update_products_from_tiendanube")
-    async def test_sync_success(self, mock_update, mock_get_tn):
+    @patch("handlers.core.sync_products_from_tiendanube")
+    async def test_sync_success(self, mock_sync):
         from handlers.core import sync_products_command
-        mock_get_tn.return_value = [{"id": 1}]
-        mock_update.return_value = (True, "Datos actualizados")
+        mock_sync.return_value = (True, "Datos actualizados")
         
         update = make_update(text="/sync_products")
         context = make_context()
@@ -223,11 +221,12 @@ class TestSyncProductsCommand:
         assert update.message.reply_text.call_count == 2
         args, _ = update.message.reply_text.call_args
         assert "Sincronización completada" in args[0]
+        mock_sync.assert_called_once_with(full=True)
 
     @pytest.mark.asyncio
     @patch("handlers.core.ALLOWED_USER_IDS", [12345])
-    @patch("handlers.core.get_tiendanube_products", side_effect=Exception("API Down"))
-    async def test_sync_exception(self, mock_get_tn):
+    @patch("handlers.core.sync_products_from_tiendanube", side_effect=Exception("API Down"))
+    async def test_sync_exception(self, mock_sync):
         from handlers.core import sync_products_command
         update = make_update(text="/sync_products")
         context = make_context()
@@ -126,6 +126,31 @@ class TestPayDebtChooseDebt:
         assert "Juan" in args[0]
         assert "5,000.00" in args[0]
 
+    @pytest.mark.asyncio
+    @patch("handlers.debts.get_active_debts")
+    async def test_reuses_debts_listed_by_menu(self, mock_get):
+        from handlers.debts import pay_debt_choose_debt
+        update = make_update(callback_data="pay_debt_id_100")
+        context = make_context(user_data={"pay_debts": [{"ID Deuda": "100", "Nombre": "Juan", "Saldo Pendiente": 5000}]})
+
+        state = await pay_debt_choose_debt(update, context)
+
+        assert state == PAY_DEBT_GET_AMOUNT
+        assert context.user_data['selected_debt']['Nombre'] == "Juan"
+        assert 'pay_debts' not in context.user_data
+        mock_get.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_back_to_menu_drops_listed_debts(self):
+        from handlers.debts import pay_debt_choose_debt
+        update = make_update(callback_data="debt_back_to_menu")
+        context = make_context(user_data={"pay_debts": [{"ID Deuda": "100", "Nombre": "Juan", "Saldo Pendiente": 5000}]})
+
+        state = await pay_debt_choose_debt(update, context)
+
+        assert state == DEBT_MENU
+        assert 'pay_debts' not in context.user_data
+
 class TestPayDebtGetAmount:
     """Tests for entering payment amount."""
 
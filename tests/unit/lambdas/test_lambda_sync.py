@@ -9,13 +9,11 @@ class TestLambdaHandlerSync:
     """Tests for sync products lambda."""
 
     @patch("lambdas.lambda_sync.connect_globally_to_sheets", return_value=True)
-    @patch("lambdas.lambda_sync.get_tiendanube_products")
-    @patch("lambdas.lambda_sync.update_products_from_tiendanube")
+    @patch("lambdas.lambda_sync.sync_products_from_tiendanube")
     @patch("lambdas.lambda_sync.send_telegram_notification")
-    def test_sync_success(self, mock_notify, mock_update, mock_get, mock_connect):
+    def test_sync_success(self, mock_notify, mock_update, mock_connect):
         from lambdas.lambda_sync import lambda_handler
         
-        mock_get.return_value = [{"id": 1, "name": "Prod"}]
         mock_update.return_value = (True, "Updated 1 product")
         
         result = lambda_handler({}, {})
@@ -25,13 +23,11 @@ class TestLambdaHandlerSync:
         mock_notify.assert_called_once()
 
     @patch("lambdas.lambda_sync.connect_globally_to_sheets", return_value=True)
-    @patch("lambdas.lambda_sync.get_tiendanube_products")
-    @patch("lambdas.lambda_sync.update_products_from_tiendanube")
+    @patch("lambdas.lambda_sync.sync_products_from_tiendanube")
     @patch("lambdas.lambda_sync.send_telegram_notification")
-    def test_sync_partial_failure(self, mock_notify, mock_update, mock_get, mock_connect):
+    def test_sync_partial_failure(self, mock_notify, mock_update, mock_connect):
         from lambdas.lambda_sync import lambda_handler
         
-        mock_get.return_value = []
         mock_update.return_value = (False, "Sheet error")
         
         result = lambda_handler({}, {})
@@ -48,7 +44,7 @@ class TestLambdaHandlerSync:
         assert "Failed to connect" in result['body']
 
     @patch("lambdas.lambda_sync.connect_globally_to_sheets", return_value=True)
-    @patch("lambdas.lambda_sync.get_tiendanube_products", side_effect=ValueError("Bad Config"))
+    @patch("lambdas.lambda_sync.sync_products_from_tiendanube", side_effect=ValueError("Bad Config"))
     @patch("lambdas.lambda_sync.send_telegram_notification")
     def test_handles_value_error(self, mock_notify, mock_get, mock_connect):
         from lambdas.lambda_sync import lambda_handler
@@ -60,7 +56,7 @@ class TestLambdaHandlerSync:
         mock_notify.assert_called_once()
 
     @patch("lambdas.lambda_sync.connect_globally_to_sheets", return_value=True)
-    @patch("lambdas.lambda_sync.get_tiendanube_products", side_effect=ConnectionError("Timeout"))
+    @patch("lambdas.lambda_sync.sync_products_from_tiendanube", side_effect=ConnectionError("Timeout"))
     @patch("lambdas.lambda_sync.send_telegram_notification")
     def test_handles_connection_error(self, mock_notify, mock_get, mock_connect):
         from lambdas.lambda_sync import lambda_handler
@@ -72,7 +68,7 @@ class TestLambdaHandlerSync:
         mock_notify.assert_called_once()
 
     @patch("lambdas.lambda_sync.connect_globally_to_sheets", return_value=True)
-    @patch("lambdas.lambda_sync.get_tiendanube_products", side_effect=Exception("Unknown"))
+    @patch("lambdas.lambda_sync.sync_products_from_tiendanube", side_effect=Exception("Unknown"))
     @patch("lambdas.lambda_sync.send_telegram_notification")
     def test_handles_unexpected_error(self, mock_notify, mock_get, mock_connect):
         from lambdas.lambda_sync import lambda_handler
@@ -39,9 +39,9 @@ class TestProcessWebhookEvent:
 class TestProcessOrderPaid:
     """Tests logic for recording a paid order."""
 
+    @patch("services.products_service.invalidate_products_cache")
     @patch("lambdas.webhook_handler.add_sale")
-    @patch("lambdas.webhook_handler.invalidate_products_cache")
-    def test_records_sale_correctly(self, mock_invalidate, mock_add_sale):
+    def test_records_sale_correctly(self, mock_add_sale, mock_invalidate):
         from lambdas.webhook_handler import process_order_paid
         order_data = {
             "id": 1001,
@@ -62,8 +62,8 @@ class TestProcessOrderPaid:
         assert kwargs['variant_details']['Precio Final'] == 5000.0
         assert "Prod A, Prod B" in kwargs['variant_details']['Producto']
         
-        # Verify cache invalidation
-        mock_invalidate.assert_called_once()
+        # The Productos sheet is untouched, so the product cache stays warm
+        mock_invalidate.assert_not_called()
 
 
 class TestLambdaHandler:
@@ -50,15 +50,22 @@ class TestGetMonthlySummary:
 class TestGetNetBalanceForMonth:
     """Tests for get_net_balance_for_month — the main balance calculation."""
 
+    @staticmethod
+    def _expenses(by_category, personales=None, canjes=None):
+        return {
+            "total": sum(by_category.values()), "count": len(by_category), "by_category": by_category,
+            "personales_by_subcategory": personales or {}, "canjes_by_subcategory": canjes or {},
+        }
+
+    @patch("services.balance_service.get_expenses_breakdown")
     @patch("services.balance_service.get_wholesale_summary")
     @patch("services.balance_service.get_monthly_summary")
-    def test_basic_balance_calculation(self, mock_summary, mock_wholesale):
+    def test_basic_balance_calculation(self, mock_summary, mock_wholesale, mock_expenses):
         """Tests the core formula: saldo_pg = (sales + wholesale) - gastos_pg."""
         # Sales: 50000
-        mock_summary.side_effect = [
-            {"total": 50000.0, "count": 5, "by_category": {"REMERAS": 50000.0}},  # Sales
-            {"total": 20000.0, "count": 3, "by_category": {"INSUMOS": 15000.0, "MARKETING": 5000.0}},  # Expenses (all PG)
-        ]
+        mock_summary.return_value = {"total": 50000.0, "count": 5, "by_category": {"REMERAS": 50000.0}}
+        # Expenses (all PG): 20000
+        mock_expenses.return_value = self._expenses({"INSUMOS": 15000.0, "MARKETING": 5000.0})
         # Wholesale: 30000
         mock_wholesale.return_value = {"total": 30000.0, "count": 2, "by_client": {}}
 
@@ -73,45 +80,35 @@ class TestGetNetBalanceForMonth:
         assert result["month_name"] == "Enero"
         assert result["year"] == 2026
 
+    @patch("services.balance_service.get_expenses_breakdown")
     @patch("services.balance_service.get_wholesale_summary")
     @patch("services.balance_service.get_monthly_summary")
-    def test_separates_personal_expenses(self, mock_summary, mock_wholesale):
+    def test_separates_personal_expenses(self, mock_summary, mock_wholesale, mock_expenses):
         """Personal expenses are tracked separately from PG expenses."""
-        mock_summary.side_effect = [
-            {"total": 50000.0, "count": 5, "by_category": {"REMERAS": 50000.0}},  # Sales
-            {"total": 30000.0, "count": 3, "by_category": {"INSUMOS": 10000.0, "PERSONALES": 20000.0}},  # Expenses
-        ]
+        mock_summary.return_value = {"total": 50000.0, "count": 5, "by_category": {"REMERAS": 50000.0}}
+        mock_expenses.return_value = self._expenses(
+            {"INSUMOS": 10000.0, "PERSONALES": 20000.0},
+            personales={"ALQUILER": 15000.0, "LUZ": 5000.0},
+        )
         mock_wholesale.return_value = {"total": 0.0, "count": 0, "by_client": {}}
 
         from services.balance_service import get_net_balance_for_month
-
-        # Need to also mock the spreadsheet for the PERSONALES subcategory lookup
-        with patch("services.balance_service.get_spreadsheet") as mock_get_ss:
-            mock_ss = MagicMock()
-            mock_get_ss.return_value = mock_ss
-            mock_ws = MagicMock()
-            mock_ws.get_all_records.return_value = [
-                {"Categoría": "PERSONALES", "Subcategoría": "ALQUILER", "Monto": 15000},
-                {"Categoría": "PERSONALES", "Subcategoría": "LUZ", "Monto": 5000},
-                {"Categoría": "INSUMOS", "Subcategoría": "GENERAL", "Monto": 10000},
-            ]
-            mock_ss.worksheet.return_value = mock_ws
-
-            result = get_net_balance_for_month(2026, 1)
+        result = get_net_balance_for_month(2026, 1)
 
         # PG expenses = INSUMOS (10000), not PERSONALES
         assert result["gastos_pg_summary"]["total"] == 10000.0
         # saldo_pg = (50000 + 0) - 10000 = 40000
         assert result["saldo_pg"] == 40000.0
+        assert result["gastos_personales_summary"]["by_category"] == {"ALQUILER": 15000.0, "LUZ": 5000.0}
+        assert result["saldo_neto"] == 20000.0
 
+    @patch("services.balance_service.get_expenses_breakdown")
     @patch("services.balance_service.get_wholesale_summary")
     @patch("services.balance_service.get_monthly_summary")
-    def test_zero_everything(self, mock_summary, mock_wholesale):
+    def test_zero_everything(self, mock_summary, mock_wholesale, mock_expenses):
         """All zeros should produce a clean zero balance."""
-        mock_summary.side_effect = [
-            {"total": 0.0, "count": 0, "by_category": {}},
-            {"total": 0.0, "count": 0, "by_category": {}},
-        ]
+        mock_summary.return_value = {"total": 0.0, "count": 0, "by_category": {}}
+        mock_expenses.return_value = self._expenses({})
         mock_wholesale.return_value = {"total": 0.0, "count": 0, "by_client": {}}
 
         from services.balance_service import get_net_balance_for_month
@@ -120,3 +117,164 @@ class TestGetNetBalanceForMonth:
         assert result["saldo_pg"] == 0.0
         assert result["saldo_neto"] == 0.0
         assert result["month_name"] == "Junio"
+
+
+class TestGetExpensesBreakdown:
+    """Tests for get_expenses_breakdown — one read of the Gastos sheet for every breakdown."""
+
+    @patch("services.balance_service.is_connected", return_value=True)
+    @patch("services.balance_service.get_spreadsheet")
+    def test_single_pass_breakdown(self, mock_get_spreadsheet, mock_is_connected, sample_expense_records):
+        mock_spreadsheet = MagicMock()
+        mock_get_spreadsheet.return_value = mock_spreadsheet
+        mock_worksheet = MagicMock()
+        mock_worksheet.get_all_records.return_value = sample_expense_records
+        mock_spreadsheet.worksheet.return_value = mock_worksheet
+
+        from services.balance_service import get_expenses_breakdown
+        result = get_expenses_breakdown(2026, 1)
+
+        assert result["total"] == 103000.0
+        assert result["by_category"] == {"INSUMOS": 5000.0, "PERSONALES": 95000.0, "CANJES": 3000.0}
+        assert result["personales_by_subcategory"] == {"ALQUILER": 80000.0, "LUZ": 15000.0}
+        assert result["canjes_by_subcategory"] == {"Promo": 3000.0}
+        mock_spreadsheet.worksheet.assert_called_once()
+        mock_worksheet.get_all_records.assert_called_once()
+
+    @patch("services.balance_service.is_connected", return_value=True)
+    @patch("services.balance_service.get_spreadsheet")
+    def test_missing_sheet_returns_empty(self, mock_get_spreadsheet, mock_is_connected):
+        import gspread
+        mock_spreadsheet = MagicMock()
+        mock_get_spreadsheet.return_value = mock_spreadsheet
+        mock_spreadsheet.worksheet.side_effect = gspread.exceptions.WorksheetNotFound
+
+        from services.balance_service import get_expenses_breakdown
+        result = get_expenses_breakdown(2026, 1)
+
+        assert result["total"] == 0.0
+        assert result["personales_by_subcategory"] == {}
+
+
+class TestConcurrentBalanceFetch:
+    """The three monthly sheets are fetched concurrently, not one after another."""
+
+    def test_fetches_overlap(self):
+        import threading
+        barrier = threading.Barrier(3, timeout=2)
+
+        def wait_for_all(result):
+            def fetch(*args):
+                barrier.wait()  # only passes if all three fetches are in flight at once
+                return result
+            return fetch
+
+        with patch("services.balance_service.get_monthly_summary",
+                   side_effect=wait_for_all({"total": 100.0, "count": 1, "by_category": {}})), \
+             patch("services.balance_service.get_wholesale_summary",
+                   side_effect=wait_for_all({"total": 50.0, "count": 1, "by_client": {}})), \
+             patch("services.balance_service.get_expenses_breakdown",
+                   side_effect=wait_for_all(TestGetNetBalanceForMonth._expenses({"INSUMOS": 30.0}))):
+            from services.balance_service import get_net_balance_for_month
+            result = get_net_balance_for_month(2026, 1)
+
+        assert result["saldo_pg"] == 120.0
+
+    def test_fetch_errors_propagate(self):
+        with patch("services.balance_service.get_monthly_summary", side_effect=ConnectionError("sin conexion")), \
+             patch("services.balance_service.get_wholesale_summary", return_value={"total": 0.0}), \
+             patch("services.balance_service.get_expenses_breakdown",
+                   return_value=TestGetNetBalanceForMonth._expenses({})):
+            from services.balance_service import get_net_balance_for_month
+            with pytest.raises(ConnectionError):
+                get_net_balance_for_month(2026, 1)
+
+
+class TestMaterializedBalanceSnapshots:
+    """Closed months are served from a snapshot while their sheets' fingerprint is unchanged."""
+
+    FINGERPRINT = {"modified": "2026-02-01T10:00:00.000Z",
+                   "sheets": [["Ventas Enero 2026", 1, 40], ["Mayoristas Enero 2026", 2, 5], ["Gastos Enero 2026", 3, 12]]}
+
+    @patch("services.balance_service._compute_net_balance")
+    @patch("services.balance_service._balance_fingerprint")
+    def test_closed_month_computed_once(self, mock_fingerprint, mock_compute):
+        mock_fingerprint.return_value = self.FINGERPRINT
+        mock_compute.return_value = {"saldo_pg": 100.0, "month_name": "Enero", "year": 2026}
+
+        from services.balance_service import get_net_balance_for_month
+        first = get_net_balance_for_month(2020, 1)
+        second = get_net_balance_for_month(2020, 1)
+
+        assert first == second == {"saldo_pg": 100.0, "month_name": "Enero", "year": 2026}
+        mock_compute.assert_called_once_with(2020, 1)
+
+    @patch("services.balance_service._compute_net_balance")
+    @patch("services.balance_service._balance_fingerprint")
+    def test_fingerprint_change_recomputes(self, mock_fingerprint, mock_compute):
+        mock_compute.side_effect = [{"saldo_pg": 100.0}, {"saldo_pg": 150.0}]
+        mock_fingerprint.return_value = self.FINGERPRINT
+
+        from services.balance_service import get_net_balance_for_month
+        get_net_balance_for_month(2020, 1)
+        # A corrected Gastos cell moves the spreadsheet's Drive modifiedTime
+        mock_fingerprint.return_value = {**self.FINGERPRINT, "modified": "2026-03-05T09:30:00.000Z"}
+        result = get_net_balance_for_month(2020, 1)
+
+        assert result["saldo_pg"] == 150.0
+        assert mock_compute.call_count == 2
+
+    @patch("services.balance_service._compute_net_balance")
+    @patch("services.balance_service._balance_fingerprint")
+    def test_invalidate_forces_recompute(self, mock_fingerprint, mock_compute):
+        mock_fingerprint.return_value = self.FINGERPRINT
+        mock_compute.side_effect = [{"saldo_pg": 100.0}, {"saldo_pg": 90.0}]
+
+        from services.balance_service import get_net_balance_for_month, invalidate_balance_snapshot
+        get_net_balance_for_month(2020, 1)
+        invalidate_balance_snapshot(2020, 1)
+
+        assert get_net_balance_for_month(2020, 1)["saldo_pg"] == 90.0
+
+    @patch("services.balance_service._compute_net_balance")
+    @patch("services.balance_service._balance_fingerprint")
+    def test_current_month_always_live(self, mock_fingerprint, mock_compute):
+        from datetime import datetime
+        now = datetime.now()
+        mock_compute.return_value = {"saldo_pg": 1.0}
+
+        from services.balance_service import get_net_balance_for_month
+        get_net_balance_for_month(now.year, now.month)
+        get_net_balance_for_month(now.year, now.month)
+
+        assert mock_compute.call_count == 2
+        mock_fingerprint.assert_not_called()
+
+    @patch("services.balance_service.is_connected", return_value=True)
+    @patch("services.balance_service.get_spreadsheet")
+    def test_fingerprint_from_cached_metadata_without_values_reads(self, mock_get_spreadsheet, mock_is_connected):
+        spreadsheet = mock_get_spreadsheet.return_value
+        spreadsheet.get_lastUpdateTime.return_value = "2026-02-01T10:00:00.000Z"
+        spreadsheet.worksheets.return_value = [MagicMock(title="Ventas Enero 2026", id=11, row_count=12, col_count=8)]
+
+        from services.balance_service import _balance_fingerprint
+        fingerprint = _balance_fingerprint(2026, 1)
+        assert _balance_fingerprint(2026, 1) == fingerprint
+
+        spreadsheet.worksheets.assert_called_once()  # served from the metadata cache afterwards
+        spreadsheet.values_batch_get.assert_not_called()
+        spreadsheet.worksheet.assert_not_called()
+        assert fingerprint["modified"] == "2026-02-01T10:00:00.000Z"
+        assert fingerprint["sheets"][0] == ["Ventas Enero 2026", 11, 12]
+        assert fingerprint["sheets"][1] == ["Mayoristas Enero 2026", None, None]
+
+    def test_fingerprint_changes_when_a_cell_is_edited(self, fake_spreadsheet):
+        from config import EXPENSES_HEADERS
+        from services.balance_service import _balance_fingerprint
+        fake_spreadsheet.seed("Gastos Enero 2020", [EXPENSES_HEADERS, ["05/01/2020", "INSUMOS", "", "Tela", "", 5000]])
+        before = _balance_fingerprint(2020, 1)
+
+        fake_spreadsheet.seed("Gastos Enero 2020", [EXPENSES_HEADERS, ["05/01/2020", "INSUMOS", "", "Tela", "", 5500]])
+
+        assert _balance_fingerprint(2020, 1) != before
+        assert fake_spreadsheet.calls["values_batch_get"] == 0
@@ -4,6 +4,7 @@ pytestmark = pytest.mark.unit
 # tests/test_debts_service.py
 """Unit tests for services/debts_service.py — Risk R3: debt payment correctness."""
 from unittest.mock import patch, MagicMock
+from tests.helpers.sheet_helpers import rows_reader, patched_cells
 
 
 # The actual DEBTS_HEADERS from config.py
@@ -96,11 +97,11 @@ class TestRegisterDebtPayment:
         """Sets up a mock sheet with proper headers for find_column_index."""
         mock_ws = MagicMock()
         mock_ws.find.return_value = MagicMock(row=3)
-        mock_ws.row_values.side_effect = lambda row: {
+        mock_ws.batch_get.side_effect = rows_reader({
             1: DEBTS_HEADERS,
             3: ["DEUDA-1", "Proveedor X", "50000", current_paid, current_pending,
                 "Activa", "2026-01-01", "2026-01-01"],
-        }[row]
+        })
         mock_get_sheet.return_value = mock_ws
         return mock_ws
 
@@ -112,10 +113,14 @@ class TestRegisterDebtPayment:
         result = register_debt_payment("DEUDA-1", 15000.0)
 
         # find_column_index finds: Monto Pagado=4, Saldo Pendiente=5, Estado=6, Fecha Ultimo Pago=8
-        mock_ws.update_cell.assert_any_call(3, 4, 25000.0)   # paid
-        mock_ws.update_cell.assert_any_call(3, 5, 25000.0)   # pending
-        mock_ws.update_cell.assert_any_call(3, 6, "Activa")  # status
+        assert patched_cells(mock_ws)[(3, 4)] == 25000.0   # paid
+        assert patched_cells(mock_ws)[(3, 5)] == 25000.0   # pending
+        assert patched_cells(mock_ws)[(3, 6)] == "Activa"  # status
         assert result["Saldo Pendiente"] == 25000.0
+        # Headers and row come back in one read; all four cells go out in one write
+        mock_ws.batch_get.assert_called_once_with(["1:1", "3:3"])
+        mock_ws.batch_update.assert_called_once()
+        mock_ws.update_cell.assert_not_called()
 
     @patch("services.debts_service.get_or_create_debts_sheet")
     def test_full_payment_marks_saldada(self, mock_get_sheet):
@@ -124,8 +129,8 @@ class TestRegisterDebtPayment:
         from services.debts_service import register_debt_payment
         result = register_debt_payment("DEUDA-1", 50000.0)
 
-        mock_ws.update_cell.assert_any_call(3, 5, 0.0)         # pending = 0
-        mock_ws.update_cell.assert_any_call(3, 6, "Saldada")   # status
+        assert patched_cells(mock_ws)[(3, 5)] == 0.0         # pending = 0
+        assert patched_cells(mock_ws)[(3, 6)] == "Saldada"   # status
         assert result["Saldo Pendiente"] == 0.0
 
     @patch("services.debts_service.get_or_create_debts_sheet")
@@ -152,19 +157,19 @@ class TestIncreaseDebtAmount:
     def test_increases_both_initial_and_pending(self, mock_get_sheet):
         mock_ws = MagicMock()
         mock_ws.find.return_value = MagicMock(row=2)
-        mock_ws.row_values.side_effect = lambda row: {
+        mock_ws.batch_get.side_effect = rows_reader({
             1: DEBTS_HEADERS,
             2: ["DEUDA-1", "Vendor A", "50000", "10000", "40000", "Activa", "2026-01-01", "2026-01-01"],
-        }[row]
+        })
         mock_get_sheet.return_value = mock_ws
 
         from services.debts_service import increase_debt_amount
         result = increase_debt_amount("DEUDA-1", 20000.0)
 
         # find_column_index: Monto Inicial=3, Saldo Pendiente=5, Estado=6
-        mock_ws.update_cell.assert_any_call(2, 3, 70000.0)   # initial
-        mock_ws.update_cell.assert_any_call(2, 5, 60000.0)   # pending
-        mock_ws.update_cell.assert_any_call(2, 6, "Activa")  # status stays Activa
+        assert patched_cells(mock_ws)[(2, 3)] == 70000.0   # initial
+        assert patched_cells(mock_ws)[(2, 5)] == 60000.0   # pending
+        assert patched_cells(mock_ws)[(2, 6)] == "Activa"  # status stays Activa
         assert result["Saldo Pendiente"] == 60000.0
 
     @patch("services.debts_service.get_or_create_debts_sheet")
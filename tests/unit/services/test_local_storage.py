@@ -0,0 +1,329 @@
+import pytest
+pytestmark = pytest.mark.unit
+
+# tests/test_local_storage.py
+"""Unit tests for services/local_storage.py — SQLite local-first tables and Sheets replication."""
+from unittest.mock import patch, MagicMock
+
+import gspread
+
+from services.local_storage import (
+    LocalStore, LocalFirstSpreadsheet, SheetsReplicator, MAX_PUSH_ATTEMPTS, is_local_table,
+)
+
+
+def _remote_ws(title, col_count=8):
+    ws = MagicMock()
+    ws.title = title
+    ws.col_count = col_count
+    return ws
+
+
+@pytest.fixture
+def remote():
+    remote = MagicMock()
+    remote.worksheets.return_value = []
+    return remote
+
+
+@pytest.fixture
+def local(remote):
+    return LocalFirstSpreadsheet(LocalStore(":memory:"), remote)
+
+
+class TestIsLocalTable:
+    """Only the business tables are served from SQLite."""
+
+    @pytest.mark.parametrize("title", ["Ventas Enero 2026", "Gastos Marzo 2025", "Mayoristas Mayo 2026",
+                                       "Deudas", "Cheques", "Pagos Futuros", "Productos"])
+    def test_business_tables_are_local(self, title):
+        assert is_local_table(title)
+
+    @pytest.mark.parametrize("title", ["Processed_Events", "Webhook_Logs Enero 2026", "Ventas", "Notas"])
+    def test_other_sheets_stay_remote(self, title):
+        assert not is_local_table(title)
+
+
+class TestLocalWorksheet:
+    """The SQLite worksheet mirrors the gspread calls the services make."""
+
+    def test_reads_back_like_sheets(self, local):
+        ws = local.add_worksheet("Ventas Enero 2026", rows="1", cols="3")
+        ws.append_row(["Fecha", "Producto", "Monto"])
+        ws.append_rows([["2026-01-01", "Remera", 5000.0], ["2026-01-02", "Buzo", 12.5]])
+
+        assert ws.get_all_records() == [
+            {"Fecha": "2026-01-01", "Producto": "Remera", "Monto": 5000},
+            {"Fecha": "2026-01-02", "Producto": "Buzo", "Monto": 12.5},
+        ]
+        assert ws.row_values(2) == ["2026-01-01", "Remera", "5000"]
+        assert ws.col_values(2) == ["Producto", "Remera", "Buzo"]
+        assert ws.batch_get(["1:1", "3:3"]) == [[["Fecha", "Producto", "Monto"]], [["2026-01-02", "Buzo", "12.5"]]]
+        assert ws.get("A2:A") == [["2026-01-01"], ["2026-01-02"]]
+
+    def test_find_and_update_cell(self, local):
+        ws = local.add_worksheet("Deudas", cols="3")
+        ws.append_rows([["ID", "Nombre", "Estado"], ["D1", "Ana", "Pendiente"], ["D2", "Luis", "Pendiente"]])
+
+        cell = ws.find("D2", in_column=1)
+        ws.update_cell(cell.row, 3, "Pagada")
+
+        assert (cell.row, cell.col) == (3, 1)
+        assert ws.row_values(3) == ["D2", "Luis", "Pagada"]
+        assert ws.find("D9") is None
+
+    def test_batch_update_and_header_rewrite(self, local):
+        ws = local.add_worksheet("Cheques", cols="3")
+        ws.append_rows([["ID", "Monto"], ["C1", "100"]])
+
+        ws.batch_update([{"range": "B2", "values": [[250.0]]}])
+        ws.update("1:1", [["ID", "Monto", "Estado"]])
+
+        assert ws.get_all_records() == [{"ID": "C1", "Monto": 250, "Estado": ""}]
+
+    def test_clear_empties_sheet(self, local):
+        ws = local.add_worksheet("Productos", cols="2")
+        ws.append_rows([["Producto", "Stock"], ["Remera", 3]])
+
+        ws.clear()
+
+        assert ws.get_all_values() == []
+        assert ws.get_all_records() == []
+
+    def test_delete_rows_shifts_up_and_is_replayed(self, local, remote):
+        remote_sheet = _remote_ws("Productos")
+        remote.worksheet.return_value = remote_sheet
+        ws = local.add_worksheet("Productos", cols="2")
+        ws.append_rows([["Producto", "Stock"], ["Remera", 3], ["Buzo", 1], ["Gorra", 5]])
+        SheetsReplicator(local.store, remote).push()
+
+        remote_sheet.get_all_values.return_value = [["Producto", "Stock"], ["Remera", "3"], ["Buzo", "1"], ["Gorra", "5"]]
+
+        ws.delete_rows(2, 3)
+        SheetsReplicator(local.store, remote).push()
+
+        assert ws.get_all_values() == [["Producto", "Stock"], ["Gorra", "5"]]
+        remote_sheet.delete_rows.assert_called_once_with(2, 3)
+
+
+class TestLocalFirstSpreadsheet:
+    """Routing between SQLite and the remote spreadsheet."""
+
+    def test_missing_local_table_raises_worksheet_not_found(self, local):
+        with pytest.raises(gspread.exceptions.WorksheetNotFound):
+            local.worksheet("Ventas Enero 2026")
+
+    def test_non_business_sheets_go_to_remote(self, local, remote):
+        local.worksheet("Processed_Events")
+        local.add_worksheet("Webhook_Logs Enero 2026", rows=1, cols=4)
+
+        remote.worksheet.assert_called_once_with("Processed_Events")
+        remote.add_worksheet.assert_called_once()
+
+    def test_worksheets_lists_local_tables_and_remote_others(self, local, remote):
+        remote.worksheets.return_value = [_remote_ws("Ventas Enero 2026"), _remote_ws("Processed_Events")]
+        local.add_worksheet("Ventas Enero 2026", cols="3")
+
+        titles = [ws.title for ws in local.worksheets()]
+
+        assert titles == ["Ventas Enero 2026", "Processed_Events"]
+
+    def test_writes_do_not_touch_remote(self, local, remote):
+        ws = local.add_worksheet("Gastos Enero 2026", cols="2")
+        ws.append_row(["Fecha", "Monto"])
+
+        remote.add_worksheet.assert_not_called()
+        assert len(local.store.pending()) == 2
+
+
+class TestSheetsReplicator:
+    """Batched push of the outbox and pull of manual edits."""
+
+    def test_push_coalesces_appends_and_updates(self, local, remote):
+        remote.worksheet.side_effect = gspread.exceptions.WorksheetNotFound("Ventas Enero 2026")
+        remote_sheet = _remote_ws("Ventas Enero 2026")
+        remote.add_worksheet.return_value = remote_sheet
+        ws = local.add_worksheet("Ventas Enero 2026", rows="1", cols="2")
+        ws.append_row(["Producto", "Monto"])
+        ws.append_row(["Remera", 5000])
+        ws.append_row(["Buzo", 8000])
+        ws.update_cell(2, 2, 5500)
+        ws.update_cell(3, 2, 8500)
+
+        pushed = SheetsReplicator(local.store, remote).push()
+
+        assert pushed == 6
+        remote.add_worksheet.assert_called_once_with(title="Ventas Enero 2026", rows=1, cols=2)
+        remote_sheet.append_rows.assert_called_once_with(
+            [["Producto", "Monto"], ["Remera", "5000"], ["Buzo", "8000"]], value_input_option="USER_ENTERED")
+        remote_sheet.batch_update.assert_called_once_with(
+            [{"range": "B2", "values": [["5500"]]}, {"range": "B3", "values": [["8500"]]}],
+            value_input_option="USER_ENTERED")
+        assert local.store.pending() == []
+
+    def test_update_targets_row_by_key_after_remote_rows_shift(self, local, remote):
+        remote_sheet = _remote_ws("Deudas")
+        remote.worksheet.return_value = remote_sheet
+        ws = local.add_worksheet("Deudas", cols="3")
+        ws.append_rows([["ID Deuda", "Nombre", "Monto Pagado"], ["D1", "Ana", "0"], ["D2", "Luis", "100"]])
+        SheetsReplicator(local.store, remote).push()
+        # A row inserted by hand above D2 since the last pull
+        remote_sheet.get_all_values.return_value = [
+            ["ID Deuda", "Nombre", "Monto Pagado"], ["D1", "Ana", "0"], ["D9", "Eva", "5"], ["D2", "Luis", "$ 100,00"]]
+
+        ws.update_cell(3, 3, 150)
+        SheetsReplicator(local.store, remote).push()
+
+        remote_sheet.batch_update.assert_called_once_with(
+            [{"range": "C4", "values": [["150"]]}], value_input_option="USER_ENTERED")
+        assert local.store.failed() == []
+
+    def test_update_over_a_changed_amount_is_set_aside(self, local, remote):
+        remote_sheet = _remote_ws("Deudas")
+        remote.worksheet.return_value = remote_sheet
+        ws = local.add_worksheet("Deudas", cols="3")
+        ws.append_rows([["ID Deuda", "Nombre", "Monto Pagado"], ["D1", "Ana", "100"]])
+        replicator = SheetsReplicator(local.store, remote, clock=lambda: 1000.0)
+        replicator.push()
+        local.store.set_meta("last_pull", "1000.0")
+        # Another instance registered a payment the local copy has not seen yet
+        remote_sheet.get_all_values.return_value = [["ID Deuda", "Nombre", "Monto Pagado"], ["D1", "Ana", "300"]]
+
+        ws.update_cell(2, 3, 150)
+        replicator.push()
+
+        remote_sheet.batch_update.assert_not_called()
+        assert local.store.pending() == []
+        assert [(title, entry["row"]) for title, _, entry, _ in local.store.failed()] == [("Deudas", 2)]
+        assert replicator.last_pull() == 0  # the next sync pulls right away
+
+    def test_update_already_applied_remotely_is_not_a_conflict(self, local, remote):
+        remote_sheet = _remote_ws("Deudas")
+        remote.worksheet.return_value = remote_sheet
+        ws = local.add_worksheet("Deudas", cols="3")
+        ws.append_rows([["ID Deuda", "Nombre", "Monto Pagado"], ["D1", "Ana", "100"]])
+        SheetsReplicator(local.store, remote).push()
+        remote_sheet.get_all_values.return_value = [["ID Deuda", "Nombre", "Monto Pagado"], ["D1", "Ana", "150"]]
+
+        ws.update_cell(2, 3, 150)
+        SheetsReplicator(local.store, remote).push()
+
+        remote_sheet.batch_update.assert_called_once()
+        assert local.store.failed() == []
+
+    def test_delete_skips_rows_already_gone_remotely(self, local, remote):
+        remote_sheet = _remote_ws("Productos")
+        remote.worksheet.return_value = remote_sheet
+        ws = local.add_worksheet("Productos", cols="3")
+        ws.append_rows([["Producto", "ID Producto", "ID Variante"], ["Remera", "1", "101"], ["Buzo", "2", "201"]])
+        SheetsReplicator(local.store, remote).push()
+        remote_sheet.get_all_values.return_value = [["Producto", "ID Producto", "ID Variante"], ["Buzo", "2", "201"]]
+
+        ws.delete_rows(2, 3)
+        SheetsReplicator(local.store, remote).push()
+
+        remote_sheet.delete_rows.assert_called_once_with(2, 2)
+
+    def test_push_keeps_outbox_on_failure(self, local, remote):
+        remote_sheet = _remote_ws("Deudas")
+        remote_sheet.append_rows.side_effect = Exception("API error")
+        remote.worksheet.return_value = remote_sheet
+        local.store.create_sheet("Deudas", 3)
+        local.worksheet("Deudas").append_row(["ID", "Nombre", "Estado"])
+
+        assert SheetsReplicator(local.store, remote).push() == 0
+        assert len(local.store.pending()) == 1
+
+    def test_op_that_keeps_failing_is_set_aside_without_stalling_other_sheets(self, local, remote):
+        failing, healthy = _remote_ws("Deudas"), _remote_ws("Cheques")
+        failing.append_rows.side_effect = Exception("API error")
+        remote.worksheet.side_effect = lambda title: {"Deudas": failing, "Cheques": healthy}[title]
+        local.store.create_sheet("Deudas", 3)
+        local.store.create_sheet("Cheques", 2)
+        local.worksheet("Deudas").append_row(["ID", "Nombre", "Estado"])
+        local.worksheet("Deudas").append_row(["D1", "Ana", "Activa"])
+        local.worksheet("Cheques").append_row(["ID", "Estado"])
+        replicator = SheetsReplicator(local.store, remote)
+
+        assert replicator.push() == 1  # Cheques goes through while Deudas waits
+        for _ in range(MAX_PUSH_ATTEMPTS - 1):
+            replicator.push()
+
+        assert local.store.pending() == []
+        assert [(title, op) for title, op, _, _ in local.store.failed()] == [("Deudas", "append_rows")] * 2
+        healthy.append_rows.assert_called_once()
+
+    def test_push_waits_while_another_container_holds_the_lease(self, local, remote):
+        local.add_worksheet("Cheques", cols="2")
+        local.store.acquire_lease("push_lease", "otro-contenedor", 120, 1000.0)
+
+        assert SheetsReplicator(local.store, remote, clock=lambda: 1010.0).push() == 0
+        assert len(local.store.pending()) == 1
+        assert SheetsReplicator(local.store, remote, clock=lambda: 1200.0).push() == 1
+
+    def test_pull_loads_remote_values_with_one_batch_read(self, local, remote):
+        remote.worksheets.return_value = [_remote_ws("Deudas"), _remote_ws("Processed_Events")]
+        remote.values_batch_get.return_value = {"valueRanges": [
+            {"values": [["ID", "Monto"], ["D1", "1500"]]},
+        ]}
+
+        SheetsReplicator(local.store, remote).pull()
+
+        remote.values_batch_get.assert_called_once_with(["'Deudas'"])
+        assert local.worksheet("Deudas").get_all_records() == [{"ID": "D1", "Monto": 1500}]
+
+    def test_pull_does_not_overwrite_pending_local_writes(self, local, remote):
+        ws = local.add_worksheet("Cheques", cols="2")
+        ws.append_rows([["ID", "Estado"], ["C1", "Pendiente"]])
+        remote.worksheets.return_value = [_remote_ws("Cheques")]
+
+        SheetsReplicator(local.store, remote).pull()
+
+        remote.values_batch_get.assert_not_called()
+        assert ws.row_values(2) == ["C1", "Pendiente"]
+
+    def test_sync_pulls_only_when_interval_elapsed(self, local, remote):
+        now = [1000.0]
+        replicator = SheetsReplicator(local.store, remote, clock=lambda: now[0])
+        replicator.pull()
+        remote.worksheets.reset_mock()
+
+        assert replicator.sync(pull_interval=300) == (0, 0)
+        remote.worksheets.assert_not_called()
+
+        now[0] += 301
+        replicator.sync(pull_interval=300)
+        remote.worksheets.assert_called_once()
+
+
+class TestStorageBackendWiring:
+    """connect_globally_to_sheets installs the local-first spreadsheet when configured."""
+
+    def test_sqlite_backend_replaces_global_spreadsheet(self, tmp_path, remote):
+        from services import sheets_connection
+        with patch.object(sheets_connection, "STORAGE_BACKEND", "sqlite"), \
+                patch.object(sheets_connection, "LOCAL_DB_PATH", str(tmp_path / "db" / "pombot.sqlite3")), \
+                patch.object(sheets_connection, "_EPHEMERAL_DIRS", ()), \
+                patch.object(sheets_connection, "local_replicator", None):
+            result = sheets_connection._open_storage_backend(remote)
+            assert isinstance(result, LocalFirstSpreadsheet)
+            assert sheets_connection.local_replicator is not None
+            remote.worksheets.assert_called_once()  # pull inicial
+
+    def test_sqlite_backend_refuses_container_local_disk(self, remote):
+        from services import sheets_connection
+        with patch.object(sheets_connection, "STORAGE_BACKEND", "sqlite"), \
+                patch.object(sheets_connection, "LOCAL_DB_PATH", "/tmp/pombot_cache/pombot.sqlite3"), \
+                patch.object(sheets_connection, "local_replicator", None):
+            assert sheets_connection._open_storage_backend(remote) is remote
+            assert sheets_connection.local_replicator is None
+
+    def test_sheets_backend_returns_remote(self, remote):
+        from services import sheets_connection
+        with patch.object(sheets_connection, "STORAGE_BACKEND", "sheets"):
+            assert sheets_connection._open_storage_backend(remote) is remote
+
+    def test_flush_is_noop_without_local_backend(self):
+        from services import sheets_connection
+        with patch.object(sheets_connection, "local_replicator", None):
+            assert sheets_connection.flush_local_storage() == 0
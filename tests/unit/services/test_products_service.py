@@ -205,6 +205,85 @@ class TestUpdateProductStock:
         assert result is False
 
 
+class TestPatchCachedStock:
+    """Tests for the write-through stock patch applied after a successful update_product_stock."""
+
+    RECORDS = [
+        {"Producto": "Remera", "Categoría": "REMERAS", "Opción 1: Nombre": "Talle", "Opción 1: Valor": "S",
+         "Stock": 3, "row_number": 2},
+        {"Producto": "Remera", "Categoría": "REMERAS", "Opción 1: Nombre": "Talle", "Opción 1: Valor": "M",
+         "Stock": 5, "row_number": 3},
+    ]
+
+    def _warm_cache(self, ps):
+        records = [dict(r) for r in self.RECORDS]
+        ps.products_cache.update({'data': records, 'timestamp': datetime.now()})
+        ps._catalog = ps.ProductCatalog(records)
+        return records
+
+    @patch("services.products_service.get_product_sheet")
+    def test_successful_update_patches_cache_in_place(self, mock_get_sheet):
+        import services.products_service as ps
+        mock_get_sheet.return_value = MagicMock()
+        records = self._warm_cache(ps)
+        catalog = ps._catalog
+
+        assert ps.update_product_stock(3, 4) is True
+
+        assert ps.products_cache['data'] is records
+        assert ps._catalog is catalog
+        assert ps.get_variant_details("Remera", {"Opción 1: Valor": "M"})["Stock"] == 4
+        assert ps.get_variant_details("Remera", {"Opción 1: Valor": "S"})["Stock"] == 3
+
+    @patch("services.products_service.get_product_sheet")
+    def test_failed_update_leaves_cache_untouched(self, mock_get_sheet):
+        import services.products_service as ps
+        mock_ws = MagicMock()
+        mock_ws.update_cell.side_effect = Exception("API Error")
+        mock_get_sheet.return_value = mock_ws
+        records = self._warm_cache(ps)
+
+        assert ps.update_product_stock(2, 0) is False
+        assert records[0]["Stock"] == 3
+
+    def test_unknown_row_falls_back_to_invalidation(self):
+        import services.products_service as ps
+        self._warm_cache(ps)
+
+        ps.patch_cached_stock(99, 1)
+
+        assert ps.products_cache['data'] is None
+        assert ps._catalog is None
+
+    def test_cold_cache_is_a_noop(self):
+        import services.products_service as ps
+        ps.invalidate_products_cache()
+
+        ps.patch_cached_stock(2, 1)
+
+        assert ps.products_cache['data'] is None
+
+    @patch("services.products_service.get_product_sheet")
+    @patch("services.products_service.datetime")
+    def test_frequent_sales_do_not_extend_the_ttl(self, mock_datetime, mock_get_sheet):
+        import services.products_service as ps
+        ps.invalidate_products_cache()
+        sheet = mock_get_sheet.return_value
+        sheet.get_all_records.side_effect = lambda: [
+            {k: v for k, v in r.items() if k != "row_number"} for r in self.RECORDS
+        ]
+        start = datetime(2026, 1, 1, 10)
+
+        # A sale every 50s for 500s: each one patches the cache, none of them renews it
+        for elapsed in range(0, 500, 50):
+            mock_datetime.now.return_value = start + timedelta(seconds=elapsed)
+            ps.get_variant_details("Remera", {"Opción 1: Valor": "M"})
+            ps.patch_cached_stock(3, 4)
+
+        assert ps.CACHE_TTL_SECONDS == 60
+        assert sheet.get_all_records.call_count == 5  # refetched at 0, 100, 200, 300 and 400s
+
+
 class TestUpdateProductsFromTiendanube:
     """Tests for full sheet replacement from TiendaNube data (Sync)."""
 
@@ -245,6 +324,168 @@ class TestUpdateProductsFromTiendanube:
         assert "API Error" in msg
 
 
+    @patch("services.products_service.PRODUCTS_WRITE_CHUNK_ROWS", 2)
+    def test_streamed_rows_are_appended_in_chunks(self, fake_spreadsheet):
+        from config import PRODUCTOS_SHEET_NAME
+        from services.products_service import update_products_from_tiendanube
+        rows = ([f"Producto {i}", i, i * 10] + [""] * 13 for i in range(5))
+
+        success, msg = update_products_from_tiendanube(rows)
+
+        assert success and "5 variantes" in msg
+        assert fake_spreadsheet.calls["append_rows"] == 3
+        assert [r[1] for r in fake_spreadsheet.values(PRODUCTOS_SHEET_NAME)[1:]] == ["0", "1", "2", "3", "4"]
+
+    @patch("services.products_service.get_product_sheet")
+    @patch("services.products_service.is_connected", return_value=True)
+    def test_source_failure_before_first_chunk_keeps_the_sheet(self, mock_is_connected, mock_get_sheet):
+        from services.products_service import update_products_from_tiendanube
+
+        def failing_stream():
+            raise ConnectionError("Error de conexión con TiendaNube.")
+            yield
+
+        with pytest.raises(ConnectionError):
+            update_products_from_tiendanube(failing_stream())
+        mock_get_sheet.return_value.clear.assert_not_called()
+
+
+class TestApplyProductChanges:
+    """Diff-based sync of Productos keyed by ID Variante (no clear + rewrite)."""
+
+    @staticmethod
+    def _row(product_id, variant_id, stock=10, name=None):
+        return [name or f"Producto {product_id}", product_id, variant_id, f"SKU-{variant_id}", "Talle", "M",
+                "", "", "", "", "General", stock, 15000.0, 0.0, 0.0, 15000.0]
+
+    def _seed(self, sheets, rows):
+        from config import PRODUCTOS_SHEET_NAME
+        sheets.seed(PRODUCTOS_SHEET_NAME, [PRODUCTOS_HEADERS] + rows)
+
+    def _sheet(self, sheets):
+        from config import PRODUCTOS_SHEET_NAME
+        return sheets.values(PRODUCTOS_SHEET_NAME)[1:]
+
+    def test_only_changed_rows_are_written(self, fake_spreadsheet):
+        from services.products_service import apply_product_changes
+        self._seed(fake_spreadsheet, [self._row(1, 101), self._row(1, 102), self._row(2, 201)])
+
+        success, msg = apply_product_changes([self._row(1, 101), self._row(1, 102, stock=4), self._row(2, 201)])
+
+        assert success and "1 modificaciones" in msg
+        assert fake_spreadsheet.calls["batch_update"] == 1
+        assert fake_spreadsheet.calls["clear"] == 0
+        assert [r[11] for r in self._sheet(fake_spreadsheet)] == ["10", "4", "10"]
+
+    def test_unchanged_catalog_writes_nothing(self, fake_spreadsheet):
+        from services.products_service import apply_product_changes
+        rows = [self._row(1, 101), self._row(2, 201)]
+        self._seed(fake_spreadsheet, rows)
+        fake_spreadsheet.reset_calls()
+
+        with patch("services.products_service.invalidate_products_cache") as mock_invalidate:
+            assert apply_product_changes(rows)[0]
+
+        assert fake_spreadsheet.calls["batch_update"] == fake_spreadsheet.calls["append_rows"] == 0
+        mock_invalidate.assert_not_called()
+
+    def test_inserts_reuse_deleted_rows(self, fake_spreadsheet):
+        from services.products_service import apply_product_changes
+        self._seed(fake_spreadsheet, [self._row(1, 101), self._row(2, 201), self._row(3, 301)])
+
+        apply_product_changes([self._row(1, 101), self._row(3, 301), self._row(4, 401), self._row(4, 402)])
+
+        assert [r[2] for r in self._sheet(fake_spreadsheet)] == ["101", "401", "301", "402"]
+        assert fake_spreadsheet.calls["append_rows"] == 1
+
+    def test_deletions_compact_and_trim_the_tail(self, fake_spreadsheet):
+        from services.products_service import apply_product_changes
+        self._seed(fake_spreadsheet, [self._row(1, 101), self._row(2, 201), self._row(3, 301), self._row(4, 401)])
+
+        success, msg = apply_product_changes([self._row(1, 101), self._row(4, 401, stock=2)])
+
+        assert success and "2 bajas" in msg
+        assert [(r[2], r[11]) for r in self._sheet(fake_spreadsheet)] == [("101", "10"), ("401", "2")]
+
+    def test_incremental_scope_keeps_other_products(self, fake_spreadsheet):
+        from services.products_service import apply_product_changes
+        self._seed(fake_spreadsheet, [self._row(1, 101), self._row(1, 102), self._row(2, 201)])
+
+        apply_product_changes([self._row(1, 101, stock=0)], changed_product_ids=[1])
+
+        assert [(r[2], r[11]) for r in self._sheet(fake_spreadsheet)] == [("101", "0"), ("201", "10")]
+
+    @patch("services.products_service.PRODUCTS_WRITE_CHUNK_ROWS", 1)
+    def test_streamed_changes_are_flushed_per_chunk(self, fake_spreadsheet):
+        from services.products_service import apply_product_changes
+        self._seed(fake_spreadsheet, [self._row(1, 101), self._row(2, 201), self._row(3, 301)])
+
+        success, msg = apply_product_changes(iter([self._row(1, 101, stock=1), self._row(3, 301, stock=3),
+                                                   self._row(4, 401)]))
+
+        assert success and "1 altas, 2 modificaciones, 1 bajas" in msg
+        assert fake_spreadsheet.calls["batch_update"] == 3
+        assert [(r[2], r[11]) for r in self._sheet(fake_spreadsheet)] == [("101", "1"), ("401", "10"), ("301", "3")]
+
+    @patch("services.products_service.update_products_from_tiendanube", return_value=(True, "ok"))
+    def test_other_headers_fall_back_to_full_rewrite(self, mock_full, fake_spreadsheet):
+        from config import PRODUCTOS_SHEET_NAME
+        from services.products_service import apply_product_changes
+        fake_spreadsheet.seed(PRODUCTOS_SHEET_NAME, [["Producto", "Stock"], ["Remera", 3]])
+        rows = [self._row(1, 101)]
+
+        assert apply_product_changes(rows) == (True, "ok")
+        mock_full.assert_called_once_with(rows)
+
+
+class TestSyncProductsFromTiendanube:
+    """Watermark handling for the incremental sync."""
+
+    def test_first_run_is_full_then_incremental(self, fake_spreadsheet):
+        from config import PRODUCTOS_SHEET_NAME
+        from services.products_service import sync_products_from_tiendanube
+        from tests.helpers.fake_tiendanube import FakeTiendaNube
+        tiendanube = FakeTiendaNube()
+        with tiendanube.installed():
+            assert sync_products_from_tiendanube()[0]
+            assert len(fake_spreadsheet.values(PRODUCTOS_SHEET_NAME)) == 61
+
+            tiendanube.touch(7)["variants"][0]["stock"] = 0
+            fake_spreadsheet.reset_calls()
+            tiendanube.reset_calls()
+            success, msg = sync_products_from_tiendanube()
+
+        assert success and "1 modificaciones" in msg
+        assert tiendanube.calls["GET"] == 1
+        assert fake_spreadsheet.calls["batch_update"] == 1
+        assert fake_spreadsheet.values(PRODUCTOS_SHEET_NAME)[(7 - 1) * 3 + 1][11] == "0"
+
+    @patch("services.products_service.apply_product_changes")
+    @patch("services.products_service.get_tiendanube_products_updated_since", return_value=([], []))
+    def test_no_changes_skips_the_sheet(self, mock_changes, mock_apply):
+        import services.products_service as ps
+        ps.products_snapshot_store.save(ps.SYNC_STATE_KEY, 0, {"watermark": "2026-01-01T00:00:00+00:00",
+                                                               "full_sync_at": __import__("time").time()})
+
+        success, msg = ps.sync_products_from_tiendanube()
+
+        assert success and "Sin cambios" in msg
+        mock_changes.assert_called_once_with("2026-01-01T00:00:00+00:00")
+        mock_apply.assert_not_called()
+
+    @patch("services.products_service.apply_product_changes", return_value=(True, "ok"))
+    @patch("services.products_service.iter_tiendanube_products", return_value=[])
+    def test_stale_full_sync_forces_full_pass(self, mock_full, mock_apply):
+        import services.products_service as ps
+        ps.products_snapshot_store.save(ps.SYNC_STATE_KEY, 0, {"watermark": "2026-01-01T00:00:00+00:00",
+                                                               "full_sync_at": 0})
+
+        ps.sync_products_from_tiendanube()
+
+        mock_full.assert_called_once()
+        mock_apply.assert_called_once_with([])
+
+
 class TestGetVariantDetailsNormalization:
     """Tests for Fuzzy/Normalization matching in get_variant_details."""
 
@@ -349,3 +590,71 @@ class TestGetProductOptions:
         assert name == "Talle"
         assert "S" in options
 
+
+
+class TestProductCatalog:
+    """Tests for the in-memory catalog index shared by the sale-flow lookups."""
+
+    RECORDS = [
+        {"Producto": "Remera", "Categoría": "REMERAS", "Opción 1: Nombre": "Color", "Opción 1: Valor": "Rojo",
+         "Opción 2: Nombre": "Talle", "Opción 2: Valor": "S", "Stock": 3, "row_number": 2},
+        {"Producto": "Remera", "Categoría": "REMERAS", "Opción 1: Nombre": "Color", "Opción 1: Valor": "Rojo",
+         "Opción 2: Nombre": "Talle", "Opción 2: Valor": "M", "Stock": 5, "row_number": 3},
+        {"Producto": "Remera", "Categoría": "REMERAS", "Opción 1: Nombre": "Color", "Opción 1: Valor": "Azul",
+         "Opción 2: Nombre": "Talle", "Opción 2: Valor": "L", "Stock": 7, "row_number": 4},
+        {"Producto": "Buzo", "Categoría": "BUZOS", "Opción 1: Nombre": "Talle", "Opción 1: Valor": "Único",
+         "Stock": 1, "row_number": 5},
+    ]
+
+    @patch("services.products_service.get_all_products_data_cached")
+    def test_index_built_once_for_same_records(self, mock_cached):
+        import services.products_service as ps
+        mock_cached.return_value = list(self.RECORDS)
+
+        with patch("services.products_service.ProductCatalog", wraps=ps.ProductCatalog) as mock_catalog:
+            ps.get_product_categories()
+            ps.get_products_by_category("REMERAS")
+            ps.get_product_options("Remera", 1)
+            ps.get_variant_details("Remera", {"Opción 1: Valor": "Rojo", "Opción 2: Valor": "M"})
+
+        mock_catalog.assert_called_once()
+
+    @patch("services.products_service.get_all_products_data_cached")
+    def test_index_rebuilt_when_records_change(self, mock_cached):
+        import services.products_service as ps
+        mock_cached.return_value = list(self.RECORDS)
+        assert ps.get_products_by_category("BUZOS") == ["Buzo"]
+
+        mock_cached.return_value = [{"Producto": "Gorra", "Categoría": "BUZOS"}]
+        assert ps.get_products_by_category("BUZOS") == ["Gorra"]
+
+    @patch("services.products_service.get_all_products_data_cached")
+    def test_option_tree_and_variant_lookup(self, mock_cached):
+        import services.products_service as ps
+        mock_cached.return_value = list(self.RECORDS)
+
+        assert ps.get_product_options("remera", 1) == ("Color", ["Azul", "Rojo"])
+        assert ps.get_product_options("Remera", 2, {"Opción 1: Valor": "ROJO"}) == ("Talle", ["M", "S"])
+        variant = ps.get_variant_details("Remera", {"Opción 1: Valor": "Rojo", "Opción 2: Valor": "M"})
+        assert variant["row_number"] == 3
+        assert variant["Stock"] == 5
+        assert ps.get_variant_details("Buzo", {"Opción 1: Valor": "unico"})["row_number"] == 5
+
+    @patch("services.products_service.get_all_products_data_cached")
+    def test_returned_lists_are_copies(self, mock_cached):
+        import services.products_service as ps
+        mock_cached.return_value = list(self.RECORDS)
+
+        ps.get_product_categories().append("MUTADA")
+        ps.get_product_options("Remera", 1)[1].append("Verde")
+
+        assert ps.get_product_categories() == ["BUZOS", "REMERAS"]
+        assert ps.get_product_options("Remera", 1) == ("Color", ["Azul", "Rojo"])
+
+    def test_invalidate_drops_catalog(self):
+        import services.products_service as ps
+        ps._catalog = ps.ProductCatalog(list(self.RECORDS))
+
+        ps.invalidate_products_cache()
+
+        assert ps._catalog is None
@@ -3,9 +3,10 @@ pytestmark = pytest.mark.unit
 
 # tests/test_report_generator.py
 """Unit tests for services/report_generator.py — Risk R9: PDF generation edge cases."""
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch
 import io
-import os
+import re
+import zlib
 
 
 class TestHexToRgb:
@@ -65,26 +66,21 @@ class TestGenerateBalancePdf:
         }
 
     @patch("services.report_generator._create_bar_chart")
-    def test_produces_valid_file_path(self, mock_chart, full_balance_data):
+    def test_returns_named_in_memory_pdf(self, mock_chart, full_balance_data):
         from services.report_generator import generate_balance_pdf
         result = generate_balance_pdf(full_balance_data)
 
         assert result is not None
-        assert result.endswith(".pdf")
-        assert "Enero" in result
-        assert "2026" in result
-        if result and os.path.exists(result):
-            os.remove(result)
+        assert result.name == "Balance_Enero_2026.pdf"
+        assert result.getvalue().startswith(b"%PDF")
 
     @patch("services.report_generator._create_bar_chart")
-    def test_pdf_file_is_non_empty(self, mock_chart, full_balance_data):
+    def test_pdf_is_non_empty(self, mock_chart, full_balance_data):
         from services.report_generator import generate_balance_pdf
         result = generate_balance_pdf(full_balance_data)
 
         assert result is not None
-        assert os.path.getsize(result) > 0
-        if result and os.path.exists(result):
-            os.remove(result)
+        assert result.getbuffer().nbytes > 0
 
     @patch("services.report_generator._create_bar_chart")
     def test_handles_empty_balance_data(self, mock_chart, empty_balance_data):
@@ -92,9 +88,17 @@ class TestGenerateBalancePdf:
         result = generate_balance_pdf(empty_balance_data)
 
         assert result is not None
-        assert os.path.getsize(result) > 0
-        if result and os.path.exists(result):
-            os.remove(result)
+        assert result.getbuffer().nbytes > 0
+
+    @patch("services.report_generator._create_bar_chart")
+    def test_each_call_stamps_its_own_generation_time(self, mock_chart, full_balance_data):
+        from services.report_generator import generate_balance_pdf
+        with patch("services.report_generator.datetime") as mock_datetime:
+            mock_datetime.now.return_value.strftime.return_value = "01/02/2026 10:00:00"
+            generate_balance_pdf(full_balance_data)
+            mock_datetime.now.return_value.strftime.return_value = "01/02/2026 11:00:00"
+            generate_balance_pdf(full_balance_data)
+        assert mock_datetime.now.call_count == 2
 
     def test_returns_none_on_error(self):
         from services.report_generator import generate_balance_pdf
@@ -103,36 +107,80 @@ class TestGenerateBalancePdf:
 
 
 class TestCreateBarChart:
-    """Tests for _create_bar_chart — produces chart image via QuickChart."""
-
-    @patch("services.report_generator.requests.post")
-    def test_writes_to_buffer(self, mock_post):
-        mock_response = MagicMock()
-        mock_response.content = b"\x89PNG\r\n\x1a\n"  # PNG header bytes
-        mock_response.status_code = 200
-        mock_post.return_value = mock_response
+    """Tests for _create_bar_chart — renders the chart PNG locally with Pillow."""
 
+    def test_writes_png_to_buffer(self):
+        from PIL import Image
         from services.report_generator import _create_bar_chart
         buffer = io.BytesIO()
-        _create_bar_chart({"INSUMOS": 20000, "MARKETING": 10000}, "Test Chart", buffer)
+        _create_bar_chart({"INSUMOS": 20000, "MARKETING": 10000}, "Test Chart", buffer, width=800, height=200)
 
-        assert buffer.getbuffer().nbytes > 0
+        assert buffer.getvalue().startswith(b"\x89PNG")
+        assert Image.open(buffer).size == (800, 200)
 
-    @patch("services.report_generator.requests.post")
-    def test_handles_empty_data(self, mock_post):
+    def test_handles_empty_data(self):
         from services.report_generator import _create_bar_chart
         buffer = io.BytesIO()
         _create_bar_chart({}, "Empty Chart", buffer)
-
-        mock_post.assert_not_called()
         assert buffer.getbuffer().nbytes == 0
 
-    @patch("services.report_generator.requests.post")
-    def test_handles_api_error(self, mock_post):
-        import requests as req_lib
-        mock_post.side_effect = req_lib.exceptions.ConnectionError("timeout")
-
+    @patch("requests.post")
+    def test_no_network_round_trip(self, mock_post):
         from services.report_generator import _create_bar_chart
         buffer = io.BytesIO()
-        _create_bar_chart({"A": 100}, "Fail Chart", buffer)
-        assert buffer.getbuffer().nbytes == 0
+        _create_bar_chart({"A": 100, "Distribución": 0}, "Gráfico", buffer)
+
+        mock_post.assert_not_called()
+        assert buffer.getbuffer().nbytes > 0
+
+    def test_deterministic_output(self):
+        from services.report_generator import _create_bar_chart
+        first, second = io.BytesIO(), io.BytesIO()
+        _create_bar_chart({"INSUMOS": 20000, "MARKETING": 10000}, "Test", first)
+        _create_bar_chart({"INSUMOS": 20000, "MARKETING": 10000}, "Test", second)
+        assert first.getvalue() == second.getvalue()
+
+    def test_format_amount_es(self):
+        from services.report_generator import _format_amount_es
+        assert _format_amount_es(20000) == "20.000"
+        assert _format_amount_es(1234.5) == "1.234,5"
+
+
+def _page_content(pdf_bytes):
+    """Concatena los content streams del PDF, descomprimiendo los que vienen con FlateDecode."""
+    content = b""
+    for stream in re.findall(rb"stream\r?\n(.*?)\r?\nendstream", pdf_bytes, re.S):
+        try:
+            content += zlib.decompress(stream)
+        except zlib.error:
+            content += stream
+    return content
+
+
+class TestReportAssets:
+    """Tests for the cached report assets — logo decoded once, palette precomputed."""
+
+    def test_brand_palette_precomputed(self):
+        from config import BRAND_COLORS
+        from services.report_generator import BRAND_RGB, hex_to_rgb
+        assert BRAND_RGB == {name: hex_to_rgb(color) for name, color in BRAND_COLORS.items()}
+
+    @patch("services.report_generator._create_bar_chart")
+    def test_logo_decoded_once_per_process(self, mock_chart):
+        import services.report_generator as rg
+        rg._logo_image = None
+        data = {"month_name": "Enero", "year": 2026,
+                "sales_summary": {"by_category": {"REMERAS": 1.0}},
+                "gastos_pg_summary": {"by_category": {"INSUMOS": 1.0}}}
+        with patch("services.report_generator.Image.open", wraps=rg.Image.open) as mock_open:
+            first = rg.generate_balance_pdf(data)
+            second = rg.generate_balance_pdf(data)
+
+        # Multi-page reports, but the PNG is read and decoded a single time across both documents
+        logo_opens = [c for c in mock_open.call_args_list if c.args and c.args[0] == rg._LOGO_PATH]
+        assert len(logo_opens) == 1
+        # ...and every page still draws it
+        for pdf in (first, second):
+            pages = len(re.findall(rb"/Type /Page\b", pdf.getvalue()))
+            assert pages > 1
+            assert _page_content(pdf.getvalue()).count(b"/I1 Do") == pages
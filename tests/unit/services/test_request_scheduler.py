@@ -0,0 +1,160 @@
+import pytest
+pytestmark = pytest.mark.unit
+
+# tests/test_request_scheduler.py
+"""Unit tests for services/request_scheduler.py — Sheets quota pacing and 429 backoff."""
+from unittest.mock import patch, MagicMock
+
+from gspread.exceptions import APIError
+
+
+def make_api_error(code, errors=None):
+    response = MagicMock()
+    response.json.return_value = {"error": {"code": code, "message": "quota", "status": "X", **({"errors": errors} if errors else {})}}
+    return APIError(response)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class TestTokenBucket:
+    """Tests for TokenBucket — per-minute pacing with a reserve for interactive traffic."""
+
+    def test_burst_up_to_capacity_then_waits(self):
+        from services.request_scheduler import TokenBucket
+        clock = FakeClock()
+        bucket = TokenBucket(60, clock=clock, sleep=clock.sleep)
+
+        for _ in range(60):
+            assert bucket.acquire() == 0.0
+        waited = bucket.acquire()
+
+        assert waited == pytest.approx(1.0)  # 60/min refills one token per second
+
+    def test_background_leaves_reserve_for_interactive(self):
+        from services.request_scheduler import TokenBucket, PRIORITY_BACKGROUND
+        clock = FakeClock()
+        bucket = TokenBucket(60, background_reserve=0.25, clock=clock, sleep=clock.sleep)
+
+        for _ in range(45):
+            assert bucket.acquire(PRIORITY_BACKGROUND) == 0.0
+        # Background must now wait, interactive still has 15 immediate tokens
+        for _ in range(15):
+            assert bucket.acquire() == 0.0
+        assert bucket.acquire(PRIORITY_BACKGROUND) > 0
+
+
+class TestPriorityContext:
+    """Tests for background_priority — marks requests made inside the block."""
+
+    def test_context_switches_and_restores(self):
+        from services.request_scheduler import background_priority, current_priority, PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE
+        assert current_priority() == PRIORITY_INTERACTIVE
+        with background_priority():
+            assert current_priority() == PRIORITY_BACKGROUND
+        assert current_priority() == PRIORITY_INTERACTIVE
+
+
+class TestRetryPolicy:
+    """Tests for is_retryable_error and backoff_delay."""
+
+    @pytest.mark.parametrize("code,expected", [(429, True), (500, True), (503, True), (408, True), (400, False), (404, False)])
+    def test_retryable_codes(self, code, expected):
+        from services.request_scheduler import is_retryable_error
+        assert is_retryable_error(make_api_error(code)) is expected
+
+    def test_drive_usage_limits_403_is_retryable(self):
+        from services.request_scheduler import is_retryable_error
+        assert is_retryable_error(make_api_error(403, [{"domain": "usageLimits"}])) is True
+        assert is_retryable_error(make_api_error(403, [{"domain": "global"}])) is False
+
+    @pytest.mark.parametrize("code,expected", [(429, True), (408, False), (500, False), (503, False)])
+    def test_rate_limit_codes(self, code, expected):
+        from services.request_scheduler import is_rate_limit_error
+        assert is_rate_limit_error(make_api_error(code)) is expected
+        assert is_rate_limit_error(make_api_error(403, [{"domain": "usageLimits"}])) is True
+
+    def test_backoff_is_jittered_and_capped(self):
+        from services.request_scheduler import backoff_delay, BACKOFF_MAX_SECONDS
+        for attempt in range(10):
+            cap = min(BACKOFF_MAX_SECONDS, 2 ** attempt)
+            assert cap / 2 <= backoff_delay(attempt) <= cap
+
+
+class TestQuotaAwareHTTPClient:
+    """Tests for QuotaAwareHTTPClient — every request takes a token and 429s are retried."""
+
+    def _client(self):
+        from services.request_scheduler import QuotaAwareHTTPClient
+        client = QuotaAwareHTTPClient.__new__(QuotaAwareHTTPClient)
+        client.bucket = MagicMock()
+        client.sleep = MagicMock()
+        return client
+
+    @patch("gspread.http_client.HTTPClient.request")
+    def test_retries_429_then_succeeds(self, mock_request):
+        ok = MagicMock()
+        mock_request.side_effect = [make_api_error(429), make_api_error(503), ok]
+        client = self._client()
+
+        assert client.request("get", "https://sheets") is ok
+        assert mock_request.call_count == 3
+        assert client.bucket.acquire.call_count == 3
+        assert client.sleep.call_count == 2
+
+    @patch("gspread.http_client.HTTPClient.request")
+    def test_non_retryable_raises_immediately(self, mock_request):
+        mock_request.side_effect = make_api_error(400)
+        client = self._client()
+
+        with pytest.raises(APIError):
+            client.request("get", "https://sheets")
+        client.sleep.assert_not_called()
+
+    @patch("gspread.http_client.HTTPClient.request")
+    def test_gives_up_after_max_retries(self, mock_request):
+        mock_request.side_effect = make_api_error(429)
+        client = self._client()
+        client.max_retries = 2
+
+        with pytest.raises(APIError):
+            client.request("get", "https://sheets")
+        assert mock_request.call_count == 3
+
+    @pytest.mark.parametrize("code", [408, 500, 503])
+    @patch("gspread.http_client.HTTPClient.request")
+    def test_append_not_retried_on_timeout_or_server_error(self, mock_request, code):
+        mock_request.side_effect = make_api_error(code)
+        client = self._client()
+
+        with pytest.raises(APIError):
+            client.request("post", "https://sheets/values/Ventas:append")
+        assert mock_request.call_count == 1
+        client.sleep.assert_not_called()
+
+    @patch("gspread.http_client.HTTPClient.request")
+    def test_append_retried_when_rate_limited(self, mock_request):
+        ok = MagicMock()
+        mock_request.side_effect = [make_api_error(429), make_api_error(403, [{"domain": "usageLimits"}]), ok]
+        client = self._client()
+
+        assert client.request("post", "https://sheets/values/Ventas:append") is ok
+        assert mock_request.call_count == 3
+
+    @patch("gspread.http_client.HTTPClient.request")
+    def test_uses_caller_priority(self, mock_request):
+        from services.request_scheduler import background_priority, PRIORITY_BACKGROUND
+        client = self._client()
+        with background_priority():
+            client.request("get", "https://sheets")
+        client.bucket.acquire.assert_called_once_with(PRIORITY_BACKGROUND)
@@ -64,12 +64,11 @@ class TestAddSale:
             "ID Variante": variant_id,
         }
 
-    @patch("services.sales_service.update_tiendanube_stock")
-    @patch("services.sales_service.invalidate_products_cache")
+    @patch("services.sales_service.enqueue_stock_push")
     @patch("services.sales_service.update_product_stock", return_value=True)
     @patch("services.sales_service.add_transaction_generic")
     def test_records_sale_and_updates_stock(self, mock_add_tx, mock_update_stock,
-                                            mock_invalidate, mock_tn_stock):
+                                            mock_tn_stock):
         mock_add_tx.return_value = {"sheet_title": "Ventas Enero 2026", "data": []}
 
         from services.sales_service import add_sale
@@ -85,38 +84,31 @@ class TestAddSale:
         # Verify stock was updated on Sheets
         mock_update_stock.assert_called_once_with(5, 8)  # 10 - 2 = 8
 
-        # Verify cache was invalidated
-        mock_invalidate.assert_called_once()
-
-        # Verify TiendaNube was synced
-        mock_tn_stock.assert_called_once_with(100, 200, 8)
+        # Verify the sold quantity was queued for TiendaNube as a variation
+        mock_tn_stock.assert_called_once_with(100, 200, -2)
 
         # Verify return value
         assert result["quantity"] == 2
         assert result["total_sale_price"] == 10000.0
         assert result["remaining_stock"] == 8
 
-    @patch("services.sales_service.update_tiendanube_stock")
-    @patch("services.sales_service.invalidate_products_cache")
+    @patch("services.sales_service.enqueue_stock_push")
     @patch("services.sales_service.update_product_stock", return_value=False)
     @patch("services.sales_service.add_transaction_generic")
-    def test_stock_update_failure_does_not_invalidate_cache(
-            self, mock_add_tx, mock_update_stock, mock_invalidate, mock_tn_stock):
+    def test_stock_update_failure_reports_error(
+            self, mock_add_tx, mock_update_stock, mock_tn_stock):
         mock_add_tx.return_value = {"sheet_title": "Ventas", "data": []}
 
         from services.sales_service import add_sale
         result = add_sale(self._make_variant(), quantity=1, client_name="Ana")
 
-        # Stock update failed → cache should NOT be invalidated
-        mock_invalidate.assert_not_called()
         assert result["remaining_stock"] == "Error al actualizar"
 
-    @patch("services.sales_service.update_tiendanube_stock")
-    @patch("services.sales_service.invalidate_products_cache")
+    @patch("services.sales_service.enqueue_stock_push")
     @patch("services.sales_service.update_product_stock", return_value=True)
     @patch("services.sales_service.add_transaction_generic")
     def test_missing_tiendanube_ids_logs_error_but_succeeds(
-            self, mock_add_tx, mock_update_stock, mock_invalidate, mock_tn_stock):
+            self, mock_add_tx, mock_update_stock, mock_tn_stock):
         mock_add_tx.return_value = {"sheet_title": "Ventas", "data": []}
         variant = self._make_variant()
         variant["ID Producto"] = None
@@ -125,17 +117,16 @@ class TestAddSale:
         from services.sales_service import add_sale
         result = add_sale(variant, quantity=1, client_name="Luis")
 
-        # TiendaNube should NOT be called
+        # Nothing should be queued for TiendaNube
         mock_tn_stock.assert_not_called()
         # Sale itself should still succeed
         assert result["product_name"] == "Remera Test"
 
-    @patch("services.sales_service.update_tiendanube_stock")
-    @patch("services.sales_service.invalidate_products_cache")
+    @patch("services.sales_service.enqueue_stock_push")
     @patch("services.sales_service.update_product_stock", return_value=True)
     @patch("services.sales_service.add_transaction_generic")
     def test_variant_description_joins_non_empty_options(
-            self, mock_add_tx, mock_update_stock, mock_invalidate, mock_tn_stock):
+            self, mock_add_tx, mock_update_stock, mock_tn_stock):
         mock_add_tx.return_value = {"sheet_title": "Ventas", "data": []}
         variant = self._make_variant()
         variant["Opción 1: Valor"] = "Rojo"
@@ -28,7 +28,8 @@ class TestConnectGloballyToSheets:
 
         assert result is True
         assert sc.IS_SHEET_CONNECTED is True
-        mock_authorize.assert_called_once_with(mock_creds)
+        from services.request_scheduler import QuotaAwareHTTPClient
+        mock_authorize.assert_called_once_with(mock_creds, http_client=QuotaAwareHTTPClient)
 
     @patch("services.sheets_connection.google_credentials", None)
     def test_returns_false_without_credentials(self):
@@ -172,13 +173,78 @@ class TestGetOrCreateMonthlySheet:
         assert get_or_create_monthly_sheet("Ventas", ["H1"]) is None
 
 
+class TestWorksheetMetadataCache:
+    """Tests for the worksheet metadata cache — one listing, then free lookups."""
+
+    @staticmethod
+    def _sheet(title):
+        ws = MagicMock()
+        ws.title = title
+        return ws
+
+    @patch("services.sheets_connection.IS_SHEET_CONNECTED", True)
+    @patch("services.sheets_connection.spreadsheet")
+    def test_repeated_lookups_use_single_listing(self, mock_spreadsheet):
+        ventas = self._sheet("Ventas Enero 2026")
+        mock_spreadsheet.worksheets.return_value = [ventas, self._sheet("Productos")]
+
+        from services.sheets_connection import get_or_create_monthly_sheet
+        from datetime import datetime
+        for _ in range(3):
+            assert get_or_create_monthly_sheet("Ventas", ["H1"], date_override=datetime(2026, 1, 15)) is ventas
+
+        mock_spreadsheet.worksheets.assert_called_once()
+        mock_spreadsheet.worksheet.assert_not_called()
+
+    @patch("services.sheets_connection.apply_table_formatting")
+    @patch("services.sheets_connection.IS_SHEET_CONNECTED", True)
+    @patch("services.sheets_connection.spreadsheet")
+    def test_created_sheet_is_remembered(self, mock_spreadsheet, mock_format):
+        mock_spreadsheet.worksheets.return_value = []
+        mock_spreadsheet.worksheet.side_effect = gspread.exceptions.WorksheetNotFound
+        new_ws = self._sheet("Gastos Marzo 2026")
+        mock_spreadsheet.add_worksheet.return_value = new_ws
+
+        from services.sheets_connection import get_or_create_monthly_sheet, get_sheet_month_index
+        from datetime import datetime
+        get_or_create_monthly_sheet("Gastos", ["H1"], date_override=datetime(2026, 3, 10))
+        again = get_or_create_monthly_sheet("Gastos", ["H1"], date_override=datetime(2026, 3, 10))
+
+        assert again is new_ws
+        mock_spreadsheet.add_worksheet.assert_called_once()
+        assert ("Gastos", 2026, 3) in get_sheet_month_index()
+
+    @patch("services.sheets_connection.spreadsheet")
+    def test_unknown_title_falls_back_to_direct_lookup(self, mock_spreadsheet):
+        mock_spreadsheet.worksheets.return_value = []
+        external = self._sheet("Ventas Abril 2026")
+        mock_spreadsheet.worksheet.return_value = external
+
+        from services.sheets_connection import find_worksheet
+        assert find_worksheet("Ventas Abril 2026") is external
+        assert find_worksheet("Ventas Abril 2026") is external
+        mock_spreadsheet.worksheet.assert_called_once_with("Ventas Abril 2026")
+
+    @patch("services.sheets_connection.spreadsheet")
+    def test_month_index_parses_titles(self, mock_spreadsheet):
+        mock_spreadsheet.worksheets.return_value = [
+            self._sheet("Ventas Enero 2026"), self._sheet("Mayoristas Diciembre 2025"),
+            self._sheet("Productos"), self._sheet("Gastos Foo 2026"),
+        ]
+
+        from services.sheets_connection import get_sheet_month_index
+        assert get_sheet_month_index() == {("Ventas", 2026, 1), ("Mayoristas", 2025, 12)}
+        get_sheet_month_index()
+        mock_spreadsheet.worksheets.assert_called_once()
+
+
 class TestCheckAndSetEventProcessed:
     """Tests for check_and_set_event_processed — deduplication logic."""
 
     @patch("services.sheets_connection._get_or_create_worksheet")
     def test_new_event_returns_true(self, mock_get_ws):
         mock_ws = MagicMock()
-        mock_ws.find.return_value = None  # not found = new event
+        mock_ws.col_values.return_value = ["ID Evento", "event-1"]  # not found = new event
         mock_get_ws.return_value = mock_ws
 
         from services.sheets_connection import check_and_set_event_processed
@@ -186,11 +252,12 @@ class TestCheckAndSetEventProcessed:
 
         assert result is True
         mock_ws.append_row.assert_called_once()
+        mock_ws.find.assert_not_called()
 
     @patch("services.sheets_connection._get_or_create_worksheet")
     def test_duplicate_event_returns_false(self, mock_get_ws):
         mock_ws = MagicMock()
-        mock_ws.find.return_value = MagicMock()  # found = duplicate
+        mock_ws.col_values.return_value = ["ID Evento", "event-123"]  # found = duplicate
         mock_get_ws.return_value = mock_ws
 
         from services.sheets_connection import check_and_set_event_processed
@@ -199,6 +266,48 @@ class TestCheckAndSetEventProcessed:
         assert result is False
         mock_ws.append_row.assert_not_called()
 
+    @patch("services.sheets_connection._get_or_create_worksheet")
+    def test_column_read_once_per_container(self, mock_get_ws):
+        mock_ws = MagicMock()
+        mock_ws.col_values.return_value = ["ID Evento", "event-1"]
+        mock_ws.get.return_value = []
+        mock_get_ws.return_value = mock_ws
+
+        from services.sheets_connection import check_and_set_event_processed
+        assert check_and_set_event_processed("event-2") is True
+        assert check_and_set_event_processed("event-2") is False  # served from the local index
+        assert check_and_set_event_processed("event-3") is True
+
+        mock_ws.col_values.assert_called_once_with(1)
+        # Only rows after the last read are fetched; our own append is re-read, not assumed
+        mock_ws.get.assert_called_once_with("A3:A")
+
+    @patch("services.sheets_connection._get_or_create_worksheet")
+    def test_sees_events_logged_by_other_instances(self, mock_get_ws):
+        mock_ws = MagicMock()
+        mock_ws.col_values.return_value = ["ID Evento"]
+        mock_ws.get.return_value = [["event-remote", "2026-01-01 10:00:00"]]
+        mock_get_ws.return_value = mock_ws
+
+        from services.sheets_connection import check_and_set_event_processed
+        assert check_and_set_event_processed("event-local") is True
+        assert check_and_set_event_processed("event-remote") is False
+        mock_ws.get.assert_called_once_with("A2:A")
+
+    @patch("services.sheets_connection._get_or_create_worksheet")
+    def test_remote_append_landing_before_ours_is_not_skipped(self, mock_get_ws):
+        mock_ws = MagicMock()
+        mock_ws.col_values.return_value = ["ID Evento"]
+        # Another container appended first, so our row ended up at row 3
+        mock_ws.get.side_effect = [[["event-remote"], ["event-local"]], []]
+        mock_get_ws.return_value = mock_ws
+
+        from services.sheets_connection import check_and_set_event_processed
+        assert check_and_set_event_processed("event-local") is True
+        assert check_and_set_event_processed("event-remote") is False
+        assert check_and_set_event_processed("event-other") is True
+        assert [c.args[0] for c in mock_ws.get.call_args_list] == ["A2:A", "A4:A"]
+
     def test_empty_event_id_returns_false(self):
         from services.sheets_connection import check_and_set_event_processed
         assert check_and_set_event_processed("") is False
@@ -215,13 +324,20 @@ class TestCheckAndSetEventProcessed:
 
 
 class TestLogWebhookEvent:
-    """Tests for log_webhook_event — webhook dedup log."""
+    """Tests for log_webhook_event — webhook dedup log, partitioned by month."""
 
-    @patch("services.sheets_connection.spreadsheet")
-    def test_new_webhook_returns_true(self, mock_spreadsheet):
+    @pytest.fixture(autouse=True)
+    def no_legacy_sheet(self):
+        """By default there is no unpartitioned Webhook_Logs sheet left over."""
+        with patch("services.sheets_connection.find_worksheet",
+                   side_effect=gspread.exceptions.WorksheetNotFound) as mock_find:
+            yield mock_find
+
+    @patch("services.sheets_connection._get_or_create_worksheet")
+    def test_new_webhook_returns_true(self, mock_get_ws):
         mock_ws = MagicMock()
-        mock_ws.find.return_value = None  # new
-        mock_spreadsheet.worksheet.return_value = mock_ws
+        mock_ws.col_values.return_value = ["EventID"]  # new
+        mock_get_ws.return_value = mock_ws
 
         from services.sheets_connection import log_webhook_event
         result = log_webhook_event("webhook-1", "order/created", 12345)
@@ -232,23 +348,131 @@ class TestLogWebhookEvent:
         assert row[0] == "webhook-1"
         assert row[1] == "order/created"
         assert row[2] == 12345
+        mock_ws.find.assert_not_called()
 
-    @patch("services.sheets_connection.spreadsheet")
-    def test_duplicate_webhook_returns_false(self, mock_spreadsheet):
+    @patch("services.sheets_connection._get_or_create_worksheet")
+    def test_duplicate_webhook_returns_false(self, mock_get_ws):
         mock_ws = MagicMock()
-        mock_ws.find.return_value = MagicMock()  # found
-        mock_spreadsheet.worksheet.return_value = mock_ws
+        mock_ws.col_values.return_value = ["EventID", "webhook-1"]  # found
+        mock_get_ws.return_value = mock_ws
 
         from services.sheets_connection import log_webhook_event
         result = log_webhook_event("webhook-1", "order/created", 12345)
 
         assert result is False
+        mock_ws.append_row.assert_not_called()
 
-    @patch("services.sheets_connection.spreadsheet")
-    def test_returns_false_on_missing_sheet(self, mock_spreadsheet):
-        mock_spreadsheet.worksheet.side_effect = gspread.exceptions.WorksheetNotFound
-
+    @patch("services.sheets_connection._get_or_create_worksheet", return_value=None)
+    def test_returns_false_on_missing_sheet(self, mock_get_ws):
         from services.sheets_connection import log_webhook_event
         result = log_webhook_event("webhook-1", "order/created", 12345)
 
         assert result is False
+
+    @patch("services.sheets_connection._get_or_create_worksheet")
+    def test_writes_to_current_month_partition(self, mock_get_ws):
+        from datetime import datetime
+        mock_ws = MagicMock()
+        mock_ws.col_values.return_value = ["EventID"]
+        mock_get_ws.return_value = mock_ws
+
+        from services.sheets_connection import log_webhook_event
+        from config import get_sheet_name_for_month, WEBHOOK_LOGS_HEADERS
+        log_webhook_event("webhook-1", "order/paid", 1)
+
+        now = datetime.now()
+        mock_get_ws.assert_called_once_with(get_sheet_name_for_month("Webhook_Logs", now.year, now.month), WEBHOOK_LOGS_HEADERS)
+
+    def test_partitions_include_previous_month_inside_retry_window(self):
+        from datetime import datetime
+        from services.sheets_connection import _webhook_log_partitions
+        assert _webhook_log_partitions(datetime(2026, 3, 1, 10)) == ["Webhook_Logs Marzo 2026", "Webhook_Logs Febrero 2026"]
+        assert _webhook_log_partitions(datetime(2026, 3, 15, 10)) == ["Webhook_Logs Marzo 2026"]
+
+    @patch("services.sheets_connection.find_worksheet")
+    @patch("services.sheets_connection._get_or_create_worksheet")
+    @patch("services.sheets_connection.datetime")
+    def test_duplicate_in_previous_partition(self, mock_datetime, mock_get_ws, mock_find):
+        from datetime import datetime
+        mock_datetime.now.return_value = datetime(2026, 3, 1, 10)
+        current, previous = MagicMock(), MagicMock()
+        current.col_values.return_value = ["EventID"]
+        previous.col_values.return_value = ["EventID", "webhook-1"]
+        mock_get_ws.return_value = current
+        mock_find.return_value = previous
+
+        from services.sheets_connection import log_webhook_event
+        assert log_webhook_event("webhook-1", "order/paid", 1) is False
+        mock_find.assert_called_once_with("Webhook_Logs Febrero 2026")
+        current.append_row.assert_not_called()
+
+    @patch("services.sheets_connection.find_worksheet")
+    @patch("services.sheets_connection._get_or_create_worksheet")
+    @patch("services.sheets_connection.datetime")
+    def test_duplicate_in_legacy_sheet_inside_retry_window(self, mock_datetime, mock_get_ws, mock_find):
+        from datetime import datetime
+        mock_datetime.now.return_value = datetime(2026, 3, 15, 10)
+        mock_datetime.strptime.side_effect = datetime.strptime
+        current, legacy = MagicMock(), MagicMock()
+        current.col_values.return_value = ["EventID"]
+        legacy.col_values.side_effect = lambda col: {
+            1: ["EventID", "webhook-1"],
+            4: ["Timestamp", "2026-03-14 09:00:00"],  # last row before the cutover, 25h ago
+        }[col]
+        mock_get_ws.return_value = current
+        mock_find.return_value = legacy
+
+        from services.sheets_connection import log_webhook_event
+        assert log_webhook_event("webhook-1", "order/paid", 1) is False
+        mock_find.assert_called_once_with("Webhook_Logs")
+        current.append_row.assert_not_called()
+
+    @patch("services.sheets_connection.find_worksheet")
+    @patch("services.sheets_connection._get_or_create_worksheet")
+    @patch("services.sheets_connection.datetime")
+    def test_legacy_sheet_retired_after_retry_window(self, mock_datetime, mock_get_ws, mock_find):
+        from datetime import datetime
+        mock_datetime.now.return_value = datetime(2026, 3, 15, 10)
+        mock_datetime.strptime.side_effect = datetime.strptime
+        current, legacy = MagicMock(), MagicMock()
+        current.col_values.return_value = ["EventID"]
+        legacy.col_values.side_effect = lambda col: {
+            1: ["EventID", "webhook-1"],
+            4: ["Timestamp", "2026-03-10 09:00:00"],  # older than the 48h retry window
+        }[col]
+        mock_get_ws.return_value = current
+        mock_find.return_value = legacy
+
+        from services.sheets_connection import log_webhook_event
+        assert log_webhook_event("webhook-1", "order/paid", 1) is True
+        assert log_webhook_event("webhook-2", "order/paid", 2) is True
+
+        # Only the timestamp column was read, once; the legacy sheet is no longer looked up
+        legacy.col_values.assert_called_once_with(4)
+        mock_find.assert_called_once_with("Webhook_Logs")
+
+
+class TestCompactWebhookLogs:
+    """Tests for compact_webhook_logs — drops partitions outside the retry window."""
+
+    @patch("services.sheets_connection.IS_SHEET_CONNECTED", True)
+    @patch("services.sheets_connection.spreadsheet")
+    def test_deletes_only_expired_partitions(self, mock_spreadsheet):
+        from datetime import datetime
+        sheets = {}
+        for title in ["Webhook_Logs Enero 2026", "Webhook_Logs Febrero 2026", "Webhook_Logs Marzo 2026",
+                      "Webhook_Logs", "Ventas Enero 2026"]:
+            sheets[title] = MagicMock()
+            sheets[title].title = title
+        mock_spreadsheet.worksheets.return_value = list(sheets.values())
+
+        from services.sheets_connection import compact_webhook_logs
+        deleted = compact_webhook_logs(now=datetime(2026, 3, 1, 10))
+
+        assert deleted == ["Webhook_Logs Enero 2026"]
+        mock_spreadsheet.del_worksheet.assert_called_once_with(sheets["Webhook_Logs Enero 2026"])
+
+    @patch("services.sheets_connection.IS_SHEET_CONNECTED", False)
+    def test_noop_without_connection(self):
+        from services.sheets_connection import compact_webhook_logs
+        assert compact_webhook_logs() == []
@@ -0,0 +1,36 @@
+import pytest
+pytestmark = pytest.mark.unit
+
+# tests/test_snapshot_store.py
+"""Unit tests for services/snapshot_store.py — versioned persistent snapshots."""
+from services.snapshot_store import LocalFileSnapshotStore
+
+
+class TestLocalFileSnapshotStore:
+    """Tests for the local-file snapshot backend."""
+
+    def test_version_starts_at_zero_and_bumps(self, tmp_path):
+        store = LocalFileSnapshotStore(str(tmp_path))
+        assert store.get_version("productos") == 0
+        assert store.bump_version("productos") == 1
+        assert store.bump_version("productos") == 2
+        assert store.get_version("productos") == 2
+
+    def test_save_and_load_roundtrip(self, tmp_path):
+        store = LocalFileSnapshotStore(str(tmp_path))
+        data = [{"Producto": "Algodón", "Stock": 5, "row_number": 2}]
+
+        store.save("productos", 3, data)
+        snapshot = store.load("productos")
+
+        assert snapshot["version"] == 3
+        assert snapshot["data"] == data
+
+    def test_load_missing_returns_none(self, tmp_path):
+        assert LocalFileSnapshotStore(str(tmp_path)).load("productos") is None
+
+    def test_load_corrupt_returns_none(self, tmp_path):
+        store = LocalFileSnapshotStore(str(tmp_path))
+        (tmp_path / "productos.snapshot.json.gz").write_bytes(b"not gzip")
+        assert store.load("productos") is None
+
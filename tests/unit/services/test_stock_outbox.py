@@ -0,0 +1,129 @@
+import pytest
+pytestmark = pytest.mark.unit
+
+# tests/test_stock_outbox.py
+"""Unit tests for services/stock_outbox.py — coalesced TiendaNube stock variations."""
+import threading
+from unittest.mock import patch
+
+from services import stock_outbox
+from services.stock_outbox import StockOutbox, StockPushWorker, enqueue_stock_push, flush_stock_outbox
+
+
+class _Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class TestStockOutbox:
+    """SQLite queue: one entry per variant, variations add up, failures are rescheduled."""
+
+    def test_enqueue_coalesces_per_variant(self):
+        outbox = StockOutbox(":memory:")
+        outbox.enqueue(1, 100, -2)
+        outbox.enqueue(1, 100, -1)
+        outbox.enqueue(2, 200, -3)
+
+        due = {variant_id: delta for variant_id, _, delta, _, _ in outbox.due()}
+        assert due == {100: -3, 200: -3}
+
+    def test_entries_survive_reopening_the_database(self, tmp_path):
+        path = str(tmp_path / "outbox.sqlite3")
+        StockOutbox(path).enqueue(1, 100, -2)
+
+        assert StockOutbox(path).pending_count() == 1
+
+    def test_acknowledge_keeps_only_a_newer_variation(self):
+        outbox = StockOutbox(":memory:")
+        outbox.enqueue(1, 100, -2)
+        (variant_id, _, delta, version, _), = outbox.due()
+        outbox.enqueue(1, 100, -3)  # sold again while the first push was in flight
+
+        outbox.acknowledge(variant_id, version, delta)
+
+        assert [row[2] for row in outbox.due()] == [-3]
+
+    def test_stale_entries_are_reported(self):
+        clock = _Clock()
+        outbox = StockOutbox(":memory:", clock=clock)
+        outbox.enqueue(1, 100, -2)
+        clock.now += 30
+        outbox.enqueue(2, 200, -1)
+
+        clock.now += 3590  # 3620s for the first entry, 3590s for the second
+        assert outbox.stale(3600) == [(100, -2, None)]
+
+    @patch("services.stock_outbox.backoff_delay", return_value=4.0)
+    def test_retry_later_delays_the_entry(self, mock_backoff):
+        clock = _Clock()
+        outbox = StockOutbox(":memory:", clock=clock)
+        outbox.enqueue(1, 100, -2)
+        (variant_id, _, _, version, _), = outbox.due()
+
+        outbox.retry_later(variant_id, version, attempts=1)
+
+        assert outbox.due() == []
+        assert outbox.next_due_in() == pytest.approx(4.0)
+        clock.now += 4.0
+        assert [row[4] for row in outbox.due()] == [1]
+
+
+class TestFlushStockOutbox:
+    """flush_stock_outbox pushes due entries and keeps failures queued."""
+
+    @patch("services.stock_outbox.adjust_tiendanube_stock", return_value=True)
+    def test_pushes_combined_variation_once(self, mock_push, isolated_stock_outbox):
+        enqueue_stock_push(1, 100, -2)
+        enqueue_stock_push(1, 100, -1)
+
+        assert flush_stock_outbox() == 1
+        mock_push.assert_called_once_with(1, 100, -3)
+        assert isolated_stock_outbox.pending_count() == 0
+
+    @patch("services.stock_outbox.adjust_tiendanube_stock", return_value=False)
+    def test_failed_push_stays_queued(self, mock_push, isolated_stock_outbox):
+        enqueue_stock_push(1, 100, -2)
+
+        assert flush_stock_outbox() == 0
+        assert isolated_stock_outbox.pending_count() == 1
+        assert isolated_stock_outbox.due() == []
+
+    @patch("services.stock_outbox.adjust_tiendanube_stock", return_value=False)
+    def test_old_pending_variation_is_logged_as_error(self, mock_push, isolated_stock_outbox, caplog):
+        clock = _Clock()
+        isolated_stock_outbox.clock = clock
+        enqueue_stock_push(1, 100, -2)
+        clock.now += stock_outbox.STOCK_OUTBOX_ALERT_AGE_SECONDS + 1
+
+        with caplog.at_level("ERROR", logger="services.stock_outbox"):
+            flush_stock_outbox()
+
+        assert any("variante 100" in r.getMessage() and r.levelname == "ERROR" for r in caplog.records)
+        assert isolated_stock_outbox.pending_count() == 1
+
+
+class TestStockPushWorker:
+    """The background worker drains the outbox when woken by an enqueue."""
+
+    def test_worker_pushes_enqueued_variations(self, isolated_stock_outbox):
+        pushed = threading.Event()
+
+        def push(product_id, variant_id, delta):
+            pushed.set()
+            return True
+
+        with patch("services.stock_outbox.adjust_tiendanube_stock", side_effect=push):
+            worker = StockPushWorker(isolated_stock_outbox)
+            with patch.object(stock_outbox, "_worker", worker):
+                worker.start()
+                try:
+                    enqueue_stock_push(1, 100, -2)
+                    assert pushed.wait(timeout=2)
+                finally:
+                    worker.stop()
+                    worker.join(timeout=2)
+
+        assert isolated_stock_outbox.pending_count() == 0
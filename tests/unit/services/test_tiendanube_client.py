@@ -0,0 +1,111 @@
+import pytest
+pytestmark = pytest.mark.unit
+
+# tests/test_tiendanube_client.py
+"""Unit tests for services/tiendanube_client.py — pooled session, timeouts, retries and throttling."""
+from unittest.mock import MagicMock, patch
+import requests
+
+from services.tiendanube_client import TiendaNubeClient, ENDPOINT_TIMEOUTS, DEFAULT_TIMEOUT, MAX_RETRIES
+
+
+def _response(status=200, headers=None):
+    response = MagicMock()
+    response.status_code = status
+    response.headers = dict(headers or {})
+    if status >= 400:
+        response.raise_for_status.side_effect = requests.exceptions.HTTPError(f"{status}")
+    return response
+
+
+@pytest.fixture
+def client():
+    with patch("services.tiendanube_client.backoff_delay", return_value=0.5):
+        yield TiendaNubeClient(12345, " token ", user_agent="Pombot (test)", session=MagicMock(), sleep=MagicMock())
+
+
+class TestRequest:
+    """TiendaNubeClient.request — URL, headers, timeouts and retry policy."""
+
+    def test_builds_store_url_and_auth_headers(self, client):
+        client.session.request.return_value = _response()
+
+        client.get("orders/9", "GET /orders")
+
+        method, url = client.session.request.call_args.args
+        headers = client.session.request.call_args.kwargs["headers"]
+        assert (method, url) == ("GET", "https://api.tiendanube.com/v1/12345/orders/9")
+        assert headers["Authentication"] == "bearer token"
+        assert headers["User-Agent"] == "Pombot (test)"
+
+    @pytest.mark.parametrize("operation", ["GET /products", "GET /variants", "PUT /variants"])
+    def test_applies_endpoint_timeout(self, client, operation):
+        client.session.request.return_value = _response()
+        client.request("GET", "x", operation)
+        assert client.session.request.call_args.kwargs["timeout"] == ENDPOINT_TIMEOUTS[operation]
+
+    def test_unknown_operation_uses_default_timeout(self, client):
+        client.session.request.return_value = _response()
+        client.request("DELETE", "webhooks/1", "DELETE /webhooks")
+        assert client.session.request.call_args.kwargs["timeout"] == DEFAULT_TIMEOUT
+
+    def test_retries_5xx_with_backoff_then_succeeds(self, client):
+        ok = _response()
+        client.session.request.side_effect = [_response(503), ok]
+
+        assert client.get("products", "GET /products") is ok
+        assert client.session.request.call_count == 2
+        client.sleep.assert_called_once_with(0.5)
+
+    def test_client_errors_are_not_retried(self, client):
+        client.session.request.return_value = _response(404)
+
+        with pytest.raises(requests.exceptions.HTTPError):
+            client.get("products/1/variants/2", "GET /variants")
+        assert client.session.request.call_count == 1
+
+    def test_connection_errors_retry_until_exhausted(self, client):
+        client.session.request.side_effect = requests.exceptions.ConnectionError("reset")
+
+        with pytest.raises(requests.exceptions.ConnectionError):
+            client.put("products/1/variants/2", "PUT /variants", json={"stock": 1})
+        assert client.session.request.call_count == MAX_RETRIES + 1
+
+    def test_post_is_not_retried_after_5xx(self, client):
+        client.session.request.return_value = _response(502)
+
+        with pytest.raises(requests.exceptions.HTTPError):
+            client.post("webhooks", "POST /webhooks", json={"event": "order/paid"})
+        assert client.session.request.call_count == 1
+        client.sleep.assert_not_called()
+
+    def test_post_is_not_retried_after_connection_error(self, client):
+        client.session.request.side_effect = requests.exceptions.ReadTimeout("slow")
+
+        with pytest.raises(requests.exceptions.ReadTimeout):
+            client.post("webhooks", "POST /webhooks", json={"event": "order/paid"})
+        assert client.session.request.call_count == 1
+
+    def test_post_still_retries_429(self, client):
+        ok = _response(201)
+        client.session.request.side_effect = [_response(429), ok]
+
+        assert client.post("webhooks", "POST /webhooks", json={"event": "order/paid"}) is ok
+
+    def test_429_waits_for_rate_limit_reset_instead_of_backoff(self, client):
+        throttled = _response(429, {"x-rate-limit-remaining": "0", "x-rate-limit-reset": "2000"})
+        client.session.request.side_effect = [throttled, _response()]
+
+        client.get("products", "GET /products")
+
+        assert client.sleep.call_count == 1
+        assert client.sleep.call_args.args[0] == pytest.approx(2.0, abs=0.1)
+
+    def test_low_remaining_quota_pauses_next_request(self, client):
+        client.session.request.return_value = _response(200, {"x-rate-limit-remaining": "1",
+                                                              "x-rate-limit-reset": "700"})
+        client.get("orders/1", "GET /orders")
+        client.sleep.assert_not_called()
+
+        client.get("orders/2", "GET /orders")
+        assert client.sleep.call_args.args[0] == pytest.approx(0.7, abs=0.1)
@@ -6,6 +6,8 @@ pytestmark = pytest.mark.unit
 from unittest.mock import patch, MagicMock
 import requests
 
+from services.tiendanube_client import TiendaNubeClient
+
 
 class TestGetLocalizedName:
     """Tests for _get_localized_name — locale fallback chain."""
@@ -45,10 +47,7 @@ class TestGetLocalizedName:
 class TestGetTiendanubeProducts:
     """Tests for get_tiendanube_products — pagination, validation, errors."""
 
-    @patch("services.tiendanube_service.TIENDANUBE_ACCESS_TOKEN", "valid_token")
-    @patch("services.tiendanube_service.TIENDANUBE_STORE_ID", 12345)
-    @patch("services.tiendanube_service.requests.get")
-    def test_happy_path_single_page(self, mock_get):
+    def test_happy_path_single_page(self, tn_session):
         mock_response = MagicMock()
         mock_response.status_code = 200
         mock_response.json.return_value = [
@@ -71,7 +70,7 @@ class TestGetTiendanubeProducts:
             }
         ]
         # First call returns data, second returns empty (end of pages)
-        mock_get.side_effect = [mock_response, MagicMock(json=MagicMock(return_value=[]), status_code=200, raise_for_status=MagicMock())]
+        tn_session.request.side_effect = [mock_response, MagicMock(json=MagicMock(return_value=[]), status_code=200, raise_for_status=MagicMock())]
 
         from services.tiendanube_service import get_tiendanube_products
         result = get_tiendanube_products()
@@ -86,10 +85,7 @@ class TestGetTiendanubeProducts:
         assert row[12] == 5000.0        # unit price
         assert row[15] == 5000.0        # final price (no promo)
 
-    @patch("services.tiendanube_service.TIENDANUBE_ACCESS_TOKEN", "valid_token")
-    @patch("services.tiendanube_service.TIENDANUBE_STORE_ID", 12345)
-    @patch("services.tiendanube_service.requests.get")
-    def test_promo_price_calculates_discount(self, mock_get):
+    def test_promo_price_calculates_discount(self, tn_session):
         mock_response = MagicMock()
         mock_response.json.return_value = [
             {
@@ -100,7 +96,7 @@ class TestGetTiendanubeProducts:
                 }]
             }
         ]
-        mock_get.side_effect = [mock_response, MagicMock(json=MagicMock(return_value=[]), status_code=200, raise_for_status=MagicMock())]
+        tn_session.request.side_effect = [mock_response, MagicMock(json=MagicMock(return_value=[]), status_code=200, raise_for_status=MagicMock())]
 
         from services.tiendanube_service import get_tiendanube_products
         result = get_tiendanube_products()
@@ -111,33 +107,27 @@ class TestGetTiendanubeProducts:
         assert row[14] == 2000.0             # fixed discount
         assert row[13] == pytest.approx(20.0) # 20% discount
 
-    @patch("services.tiendanube_service.TIENDANUBE_STORE_ID", None)
+    @patch("services.tiendanube_client._client", TiendaNubeClient(None, "valid_token", session=MagicMock()))
     def test_raises_on_no_store_id(self):
         from services.tiendanube_service import get_tiendanube_products
         with pytest.raises(ValueError, match="Store ID"):
             get_tiendanube_products()
 
-    @patch("services.tiendanube_service.TIENDANUBE_STORE_ID", 12345)
-    @patch("services.tiendanube_service.TIENDANUBE_ACCESS_TOKEN", "your_tiendanube_access_token")
+    @patch("services.tiendanube_client._client",
+           TiendaNubeClient(12345, "your_tiendanube_access_token", session=MagicMock()))
     def test_raises_on_placeholder_token(self):
         from services.tiendanube_service import get_tiendanube_products
         with pytest.raises(ValueError, match="Token"):
             get_tiendanube_products()
 
-    @patch("services.tiendanube_service.TIENDANUBE_ACCESS_TOKEN", "valid_token")
-    @patch("services.tiendanube_service.TIENDANUBE_STORE_ID", 12345)
-    @patch("services.tiendanube_service.requests.get")
-    def test_raises_connection_error_on_http_failure(self, mock_get):
-        mock_get.side_effect = requests.exceptions.ConnectionError("timeout")
+    def test_raises_connection_error_on_http_failure(self, tn_session):
+        tn_session.request.side_effect = requests.exceptions.ConnectionError("timeout")
 
         from services.tiendanube_service import get_tiendanube_products
         with pytest.raises(ConnectionError):
             get_tiendanube_products()
 
-    @patch("services.tiendanube_service.TIENDANUBE_ACCESS_TOKEN", "valid_token")
-    @patch("services.tiendanube_service.TIENDANUBE_STORE_ID", 12345)
-    @patch("services.tiendanube_service.requests.get")
-    def test_unmanaged_stock_returns_999(self, mock_get):
+    def test_unmanaged_stock_returns_999(self, tn_session):
         mock_response = MagicMock()
         mock_response.json.return_value = [
             {
@@ -148,7 +138,7 @@ class TestGetTiendanubeProducts:
                 }]
             }
         ]
-        mock_get.side_effect = [mock_response, MagicMock(json=MagicMock(return_value=[]), status_code=200, raise_for_status=MagicMock())]
+        tn_session.request.side_effect = [mock_response, MagicMock(json=MagicMock(return_value=[]), status_code=200, raise_for_status=MagicMock())]
 
         from services.tiendanube_service import get_tiendanube_products
         result = get_tiendanube_products()
@@ -156,30 +146,115 @@ class TestGetTiendanubeProducts:
         assert result[0][11] == 999  # stock = 999 for unmanaged
 
 
+class TestCatalogPager:
+    """Concurrent /products pager: page size, ordering, rate-limit headers and 429 retries."""
+
+    @staticmethod
+    def _page(products, total=None, status=200, headers=None):
+        response = MagicMock()
+        response.status_code = status
+        response.json.return_value = products
+        response.headers = dict(headers or {})
+        if total is not None:
+            response.headers["x-total-count"] = str(total)
+        return response
+
+    @staticmethod
+    def _products(start, count):
+        return [{"id": i, "name": {"es": f"P{i}"}, "variants": [{"id": i * 10, "price": "1"}]}
+                for i in range(start, start + count)]
+
+    def test_remaining_pages_fetched_in_parallel_and_in_order(self, tn_session):
+        from services.tiendanube_service import get_tiendanube_products, PRODUCTS_PAGE_SIZE
+        pages = {1: self._products(0, 200), 2: self._products(200, 200), 3: self._products(400, 50)}
+        tn_session.request.side_effect = lambda method, url, params, **kw: self._page(pages[params["page"]], total=450)
+
+        rows = get_tiendanube_products()
+
+        assert [r[1] for r in rows] == list(range(450))
+        assert tn_session.request.call_count == 3
+        assert {c.kwargs["params"]["per_page"] for c in tn_session.request.call_args_list} == {PRODUCTS_PAGE_SIZE}
+
+    def test_without_total_header_walks_pages_sequentially(self, tn_session):
+        from services.tiendanube_service import get_tiendanube_products
+        tn_session.request.side_effect = [self._page(self._products(0, 200)), self._page(self._products(200, 10))]
+
+        assert len(get_tiendanube_products()) == 210
+        assert [c.kwargs["params"]["page"] for c in tn_session.request.call_args_list] == [1, 2]
+
+    def test_429_waits_for_reset_and_retries(self, tn_session):
+        from services.tiendanube_service import get_tiendanube_products
+        from services.tiendanube_client import get_tiendanube_client
+        throttled = self._page([], status=429, headers={"x-rate-limit-remaining": "0", "x-rate-limit-reset": "1500"})
+        tn_session.request.side_effect = [throttled, self._page(self._products(0, 3))]
+
+        rows = get_tiendanube_products()
+
+        assert len(rows) == 3
+        assert get_tiendanube_client().sleep.call_args[0][0] == pytest.approx(1.5, abs=0.1)
+
+
+    def test_stream_keeps_a_bounded_window_of_pages_ahead(self, tn_session):
+        from services.tiendanube_service import iter_tiendanube_products
+        pages = {p: self._products((p - 1) * 200, 200) for p in range(1, 11)}
+        tn_session.request.side_effect = lambda method, url, params, **kw: self._page(pages[params["page"]], total=2000)
+
+        with patch("services.tiendanube_service.TIENDANUBE_MAX_CONCURRENCY", 2):
+            rows = iter_tiendanube_products()
+            streamed = [next(rows) for _ in range(200)]
+            assert tn_session.request.call_count == 1
+            streamed.append(next(rows))
+            assert tn_session.request.call_count <= 4
+            streamed.extend(rows)
+
+        assert [r[1] for r in streamed] == list(range(2000))
+        assert tn_session.request.call_count == 10
+
+    @patch("services.tiendanube_client._client", TiendaNubeClient(None, "valid_token", session=MagicMock()))
+    def test_stream_checks_credentials_before_iterating(self):
+        from services.tiendanube_service import iter_tiendanube_products
+        with pytest.raises(ValueError, match="Store ID"):
+            iter_tiendanube_products()
+
+
+class TestRateLimitGate:
+    """The gate pauses every worker once the bucket is nearly empty."""
+
+    def test_pauses_until_reset_when_remaining_is_low(self):
+        from services.tiendanube_client import RateLimitGate
+        sleep = MagicMock()
+        gate = RateLimitGate(reserve=2, sleep=sleep, clock=lambda: 100.0)
+
+        gate.observe({"x-rate-limit-remaining": "10", "x-rate-limit-reset": "800"})
+        gate.wait()
+        sleep.assert_not_called()
+
+        gate.observe({"x-rate-limit-remaining": "1", "x-rate-limit-reset": "800"})
+        gate.wait()
+        sleep.assert_called_once_with(pytest.approx(0.8))
+
+
 class TestGetRealtimeStock:
     """Tests for get_realtime_stock — queries API for variant stock."""
 
-    @patch("services.tiendanube_service.requests.get")
-    def test_returns_stock_for_managed_variant(self, mock_get):
+    def test_returns_stock_for_managed_variant(self, tn_session):
         mock_response = MagicMock()
         mock_response.json.return_value = {"stock_management": True, "stock": 15}
-        mock_get.return_value = mock_response
+        tn_session.request.return_value = mock_response
 
         from services.tiendanube_service import get_realtime_stock
         assert get_realtime_stock(1, 100) == 15
 
-    @patch("services.tiendanube_service.requests.get")
-    def test_returns_999_for_unmanaged(self, mock_get):
+    def test_returns_999_for_unmanaged(self, tn_session):
         mock_response = MagicMock()
         mock_response.json.return_value = {"stock_management": False, "stock": None}
-        mock_get.return_value = mock_response
+        tn_session.request.return_value = mock_response
 
         from services.tiendanube_service import get_realtime_stock
         assert get_realtime_stock(1, 100) == 999
 
-    @patch("services.tiendanube_service.requests.get")
-    def test_returns_none_on_error(self, mock_get):
-        mock_get.side_effect = Exception("Network error")
+    def test_returns_none_on_error(self, tn_session):
+        tn_session.request.side_effect = Exception("Network error")
 
         from services.tiendanube_service import get_realtime_stock
         assert get_realtime_stock(1, 100) is None
@@ -188,22 +263,59 @@ class TestGetRealtimeStock:
 class TestUpdateTiendanubeStock:
     """Tests for update_tiendanube_stock — sends PUT request."""
 
-    @patch("services.tiendanube_service.requests.put")
-    def test_sends_correct_payload(self, mock_put):
+    def test_sends_correct_payload(self, tn_session):
         mock_response = MagicMock()
         mock_response.status_code = 200
-        mock_put.return_value = mock_response
+        tn_session.request.return_value = mock_response
 
         from services.tiendanube_service import update_tiendanube_stock
         result = update_tiendanube_stock(product_id=1, variant_id=100, new_stock_level=8)
 
         assert result is True
-        call_kwargs = mock_put.call_args
+        call_kwargs = tn_session.request.call_args
         assert call_kwargs[1]["json"] == {"stock": 8}
 
-    @patch("services.tiendanube_service.requests.put")
-    def test_returns_false_on_error(self, mock_put):
-        mock_put.side_effect = Exception("API error")
+    def test_returns_false_on_error(self, tn_session):
+        tn_session.request.side_effect = Exception("API error")
 
         from services.tiendanube_service import update_tiendanube_stock
         assert update_tiendanube_stock(1, 100, 8) is False
+
+
+class TestAdjustTiendanubeStock:
+    """Tests for adjust_tiendanube_stock — applies a queued variation to the current TiendaNube level."""
+
+    @staticmethod
+    def _variant_response(stock):
+        return MagicMock(status_code=200, json=MagicMock(return_value={"id": 100, "stock": stock}))
+
+    def test_applies_variation_to_current_level(self, tn_session):
+        # An online sale took TiendaNube from 10 to 7 before the queued -2 was pushed
+        tn_session.request.side_effect = [self._variant_response(7), MagicMock(status_code=200)]
+
+        from services.tiendanube_service import adjust_tiendanube_stock
+        assert adjust_tiendanube_stock(1, 100, -2) is True
+
+        methods = [c.args[0] for c in tn_session.request.call_args_list]
+        assert methods == ["GET", "PUT"]
+        assert tn_session.request.call_args.kwargs["json"] == {"stock": 5}
+
+    def test_never_writes_negative_stock(self, tn_session):
+        tn_session.request.side_effect = [self._variant_response(1), MagicMock(status_code=200)]
+
+        from services.tiendanube_service import adjust_tiendanube_stock
+        assert adjust_tiendanube_stock(1, 100, -3) is True
+        assert tn_session.request.call_args.kwargs["json"] == {"stock": 0}
+
+    def test_unmanaged_stock_is_left_alone(self, tn_session):
+        tn_session.request.return_value = self._variant_response(None)
+
+        from services.tiendanube_service import adjust_tiendanube_stock
+        assert adjust_tiendanube_stock(1, 100, -2) is True
+        assert tn_session.request.call_count == 1
+
+    def test_returns_false_when_current_level_cannot_be_read(self, tn_session):
+        tn_session.request.side_effect = Exception("Network error")
+
+        from services.tiendanube_service import adjust_tiendanube_stock
+        assert adjust_tiendanube_stock(1, 100, -2) is False
@@ -0,0 +1,97 @@
+import pytest
+pytestmark = pytest.mark.unit
+
+# tests/test_unit_of_work.py
+"""Unit tests for services/unit_of_work.py — request-scoped memo of Sheets reads."""
+from unittest.mock import patch, MagicMock
+
+from services.unit_of_work import unit_of_work, cached_read, invalidate_sheet, current_unit_of_work
+
+
+def _counting_reader():
+    loader = MagicMock(side_effect=lambda sheet_name: [{"sheet": sheet_name}])
+
+    @cached_read(tags=lambda sheet_name: [sheet_name])
+    def read(sheet_name):
+        return loader(sheet_name)
+
+    return read, loader
+
+
+class TestCachedRead:
+    """@cached_read memoizes only inside an active unit of work."""
+
+    def test_without_unit_of_work_every_call_reads(self):
+        read, loader = _counting_reader()
+        read("Deudas")
+        read("Deudas")
+        assert loader.call_count == 2
+
+    def test_repeated_reads_hit_memory(self):
+        read, loader = _counting_reader()
+        with unit_of_work() as uow:
+            assert read("Deudas") is read("Deudas")
+            read("Cheques")
+        assert loader.call_count == 2
+        assert (uow.hits, uow.misses) == (1, 2)
+
+    def test_invalidate_drops_only_tagged_entries(self):
+        read, loader = _counting_reader()
+        with unit_of_work():
+            read("Deudas")
+            read("Cheques")
+            invalidate_sheet("Deudas")
+            read("Deudas")
+            read("Cheques")
+        assert [c.args[0] for c in loader.call_args_list] == ["Deudas", "Cheques", "Deudas"]
+
+    def test_unhashable_arguments_bypass_the_cache(self):
+        loader = MagicMock(return_value=[])
+
+        @cached_read(tags=lambda headers: ["X"])
+        def read(headers):
+            return loader(headers)
+
+        with unit_of_work():
+            read(["a"])
+            read(["a"])
+        assert loader.call_count == 2
+
+    def test_nested_unit_of_work_reuses_the_active_one(self):
+        with unit_of_work() as outer:
+            with unit_of_work() as inner:
+                assert inner is outer
+            assert current_unit_of_work() is outer
+        assert current_unit_of_work() is None
+
+
+class TestServiceIntegration:
+    """Services invalidate the sheets they write to."""
+
+    @patch("services.debts_service._get_or_create_worksheet")
+    def test_new_debt_invalidates_active_debts(self, mock_ws):
+        from services.debts_service import get_active_debts, add_new_debt
+        sheet = MagicMock()
+        sheet.get_all_records.return_value = []
+        mock_ws.return_value = sheet
+
+        with unit_of_work():
+            get_active_debts()
+            get_active_debts()
+            add_new_debt("Juan", 1000.0)
+            get_active_debts()
+
+        assert sheet.get_all_records.call_count == 2
+
+    @patch("services.checks_service._get_or_create_worksheet")
+    def test_alert_scan_reads_each_sheet_once(self, mock_ws):
+        from services.checks_service import get_items_due_today, get_items_due_in_x_days
+        sheet = MagicMock()
+        sheet.get_all_records.return_value = []
+        mock_ws.return_value = sheet
+
+        with unit_of_work():
+            get_items_due_today()
+            get_items_due_in_x_days(3)
+
+        assert sheet.get_all_records.call_count == 2
@@ -4,6 +4,7 @@ pytestmark = pytest.mark.unit
 # tests/test_wholesale_service.py
 """Unit tests for services/wholesale_service.py — Risk R8: wholesale seña/payment correctness."""
 from unittest.mock import patch, MagicMock
+from tests.helpers.sheet_helpers import rows_reader, patched_cells
 from collections import defaultdict
 
 
@@ -106,50 +107,54 @@ class TestModifyWholesalePayment:
     def test_partial_payment_updates_amounts(self, mock_get_sheet):
         mock_ws = MagicMock()
         # WHOLESALE_HEADERS = ["Fecha", "Nombre", "Producto", "Cantidad", "Monto Total", "Monto Pagado", "Monto Restante", "Categoría"]
-        mock_ws.cell.side_effect = lambda row, col: MagicMock(value={
-            6: "10000",   # paid
-            7: "40000",   # remaining
-        }[col])
+        mock_ws.batch_get.side_effect = rows_reader({
+            3: ["2026-01-01", "Mayorista", "Remeras", "10", "50000", "10000", "40000", "Seña"],
+        })
         mock_get_sheet.return_value = mock_ws
 
         from services.wholesale_service import modify_wholesale_payment
         result = modify_wholesale_payment(row_number=3, payment_amount=15000.0)
 
         # new_paid = 10000 + 15000 = 25000, new_remaining = 40000 - 15000 = 25000
-        mock_ws.update_cell.assert_any_call(3, 6, 25000.0)  # paid
-        mock_ws.update_cell.assert_any_call(3, 7, 25000.0)  # remaining
+        assert patched_cells(mock_ws)[(3, 6)] == 25000.0  # paid
+        assert patched_cells(mock_ws)[(3, 7)] == 25000.0  # remaining
         assert result["remaining_balance"] == 25000.0
+        # One ranged read and one batched write instead of per-cell calls
+        mock_ws.batch_get.assert_called_once_with(["3:3"])
+        mock_ws.batch_update.assert_called_once()
+        mock_ws.cell.assert_not_called()
+        mock_ws.update_cell.assert_not_called()
 
     @patch("services.wholesale_service.get_or_create_monthly_sheet", autospec=True)
     def test_full_payment_changes_to_pago(self, mock_get_sheet):
         mock_ws = MagicMock()
-        mock_ws.cell.side_effect = lambda row, col: MagicMock(value={
-            6: "30000",   # paid
-            7: "20000",   # remaining
-        }[col])
+        # WHOLESALE_HEADERS: Monto Pagado = col 6, Monto Restante = col 7
+        mock_ws.batch_get.side_effect = rows_reader({
+            3: ["2026-01-01", "Mayorista", "Remeras", "10", "50000", "30000", "20000", "Seña"],
+        })
         mock_get_sheet.return_value = mock_ws
 
         from services.wholesale_service import modify_wholesale_payment
         result = modify_wholesale_payment(row_number=3, payment_amount=20000.0)
 
         # new_remaining = 0
-        mock_ws.update_cell.assert_any_call(3, 8, "PAGO")  # category
+        assert patched_cells(mock_ws)[(3, 8)] == "PAGO"  # category
         assert result["remaining_balance"] == 0.0
 
     @patch("services.wholesale_service.get_or_create_monthly_sheet", autospec=True)
     def test_rejects_overpayment(self, mock_get_sheet):
         mock_ws = MagicMock()
-        mock_ws.cell.side_effect = lambda row, col: MagicMock(value={
-            6: "0",       # paid
-            7: "10000",   # remaining
-        }[col])
+        # WHOLESALE_HEADERS: Monto Pagado = col 6, Monto Restante = col 7
+        mock_ws.batch_get.side_effect = rows_reader({
+            3: ["2026-01-01", "Mayorista", "Remeras", "10", "50000", "0", "10000", "Seña"],
+        })
         mock_get_sheet.return_value = mock_ws
 
         from services.wholesale_service import modify_wholesale_payment
         result = modify_wholesale_payment(row_number=3, payment_amount=15000.0)
 
         assert "error" in result
-        mock_ws.update_cell.assert_not_called()
+        mock_ws.batch_update.assert_not_called()
 
     @patch("services.wholesale_service.get_or_create_monthly_sheet", autospec=True)
     def test_returns_none_on_no_sheet(self, mock_get_sheet):